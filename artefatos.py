@@ -0,0 +1,167 @@
+import os
+import time
+import shutil
+import hashlib
+import zipfile
+from dados_comex import DIRETORIO_CACHE
+
+# --- ARMAZÉM DOS RELATÓRIOS GERADOS ---
+# Os .docx de uma geração são gravados em disco pelo próprio processo de geração,
+# num lote (uma pasta por tarefa, dentro da pasta do usuário). A sessão guarda só
+# os artefatos ({"name", "caminho", "tamanho"}) e os bytes são lidos do disco
+# quando o botão de download é clicado (ver ler). Os lotes saem por idade
+# (TEMPO_RETENCAO_ARTEFATOS) e, quando um usuário passa da cota, os mais antigos
+# dele são apagados primeiro.
+DIRETORIO_ARTEFATOS = os.path.join(DIRETORIO_CACHE, "artefatos")
+# Lotes esquecidos pelas sessões (aba fechada, servidor reiniciado) são apagados após este tempo
+TEMPO_RETENCAO_ARTEFATOS = int(os.environ.get("BRIEFINGS_RETENCAO_ARTEFATOS", 24 * 3600))
+# Espaço em disco de cada usuário, somando todos os lotes dele
+COTA_POR_USUARIO = int(os.environ.get("BRIEFINGS_COTA_ARTEFATOS_MB", "500")) * 1024 * 1024
+NOME_PACOTE = "pacote.zip"
+# Marca dos lotes cuja geração ainda não terminou: a cota não os apaga
+MARCA_EM_ANDAMENTO = ".gerando"
+# Formatos que já são compactados: entram no ZIP sem recompactar
+EXTENSOES_COMPACTADAS = (".docx", ".xlsx", ".pptx", ".zip", ".png", ".jpg")
+
+
+def _diretorio_usuario(dono):
+    # O nome exibido do usuário pode ter acentos e espaços: a pasta usa um resumo dele
+    resumo = hashlib.sha1((dono or "anonimo").encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DIRETORIO_ARTEFATOS, resumo)
+
+
+def novo_lote(dono, id_lote):
+    """Cria a pasta em que uma geração grava os seus arquivos e devolve o caminho."""
+    lote = os.path.join(_diretorio_usuario(dono), id_lote)
+    os.makedirs(lote, exist_ok=True)
+    open(os.path.join(lote, MARCA_EM_ANDAMENTO), "wb").close()
+    return lote
+
+
+def concluir_lote(lote):
+    """Tira a marca de geração em andamento e aplica a cota do usuário (ver aplicar_cota)."""
+    try:
+        os.remove(os.path.join(lote, MARCA_EM_ANDAMENTO))
+    except OSError:
+        pass
+    aplicar_cota(lote)
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+
+def gravar(lote, nome, dados):
+    """Grava um arquivo gerado no lote e devolve o artefato que vai para a sessão."""
+    # O índice evita que dois relatórios com o mesmo nome se sobrescrevam
+    indice = sum(1 for n in os.listdir(lote) if n != MARCA_EM_ANDAMENTO)
+    caminho = os.path.join(lote, f"{indice:03d}-{nome}")
+
+    def escrever(temporario):
+        with open(temporario, "wb") as f:
+            f.write(dados)
+    _gravar_atomico(caminho, escrever)
+    return {"name": nome, "caminho": caminho, "tamanho": len(dados)}
+
+
+def empacotar(lote, arquivos):
+    """
+    Grava os arquivos do lote num ZIP, uma vez por geração, lendo cada um do disco.
+    Os .docx já são zips: entram sem recompactar (ZIP_STORED), o que economiza CPU
+    sem aumentar o pacote.
+    """
+    caminho = os.path.join(lote, NOME_PACOTE)
+
+    def escrever(temporario):
+        with zipfile.ZipFile(temporario, "w") as z:
+            for arquivo in arquivos:
+                compactar = not arquivo["name"].lower().endswith(EXTENSOES_COMPACTADAS)
+                z.write(arquivo["caminho"], arcname=arquivo["name"],
+                        compress_type=zipfile.ZIP_DEFLATED if compactar else zipfile.ZIP_STORED)
+    _gravar_atomico(caminho, escrever)
+    return {"name": NOME_PACOTE, "caminho": caminho, "tamanho": os.path.getsize(caminho)}
+
+
+def disponivel(artefato):
+    return bool(artefato) and os.path.exists(artefato["caminho"])
+
+
+def ler(artefato):
+    """
+    Dados para o st.download_button: uma função que lê o arquivo do disco só quando o
+    botão é clicado, em vez de copiá-lo para a memória a cada rerun da página.
+    """
+    def ler_arquivo():
+        with open(artefato["caminho"], "rb") as f:
+            return f.read()
+    return ler_arquivo
+
+
+def remover_lote(lote):
+    shutil.rmtree(lote, ignore_errors=True)
+
+
+def descartar(artefatos):
+    """Apaga os lotes dos artefatos que a sessão descartou (novo relatório, filtros alterados)."""
+    for lote in {os.path.dirname(a["caminho"]) for a in artefatos if a}:
+        remover_lote(lote)
+
+
+def _lotes(diretorio):
+    """[(modificação, bytes, caminho, em andamento)] dos lotes de uma pasta de usuário."""
+    lotes = []
+    try:
+        entradas = list(os.scandir(diretorio))
+    except OSError:
+        return lotes
+    for entrada in entradas:
+        if not entrada.is_dir():
+            continue
+        try:
+            conteudo = [a for a in os.scandir(entrada.path) if a.is_file()]
+            arquivos = [a.stat() for a in conteudo]
+            modificacao = max([entrada.stat().st_mtime] + [a.st_mtime for a in arquivos])
+        except OSError:
+            continue
+        em_andamento = any(a.name == MARCA_EM_ANDAMENTO for a in conteudo)
+        lotes.append((modificacao, sum(a.st_size for a in arquivos), entrada.path, em_andamento))
+    return lotes
+
+
+def aplicar_cota(lote):
+    """
+    Apaga os lotes mais antigos do mesmo usuário até o total caber na cota. Roda no
+    processo de geração ao fim de cada tarefa; o lote recém-gerado e os de gerações
+    ainda em andamento nunca são apagados.
+    """
+    lotes = sorted(_lotes(os.path.dirname(lote)))
+    total = sum(tamanho for _, tamanho, _, _ in lotes)
+    for _, tamanho, caminho, em_andamento in lotes:
+        if total <= COTA_POR_USUARIO:
+            break
+        if caminho == lote or em_andamento:
+            continue
+        shutil.rmtree(caminho, ignore_errors=True)
+        total -= tamanho
+
+
+def podar():
+    """Apaga os lotes de todos os usuários mais velhos que o tempo de retenção."""
+    limite = time.time() - TEMPO_RETENCAO_ARTEFATOS
+    try:
+        usuarios = [e.path for e in os.scandir(DIRETORIO_ARTEFATOS) if e.is_dir()]
+    except OSError:
+        return
+    for diretorio in usuarios:
+        for modificacao, _, caminho, _ in _lotes(diretorio):
+            if modificacao < limite:
+                shutil.rmtree(caminho, ignore_errors=True)
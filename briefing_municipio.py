@@ -0,0 +1,381 @@
+import streamlit as st
+import pandas as pd
+from dados_comex import carregar_tabela, abrir_fontes, motor_da_pagina, pedido_cubo, pedido_resumo_municipios
+from documento import DocumentoBriefing, sanitize_filename
+import historico
+from tarefas import ErroTarefa, RoteiroDocumento, renderizar_documentos
+
+# --- GERAÇÃO DOS BRIEFINGS DE MUNICÍPIO ---
+# Cálculos e montagem dos documentos da página "Análise por Município", executados
+# num processo de geração (ver tarefas).
+
+# --- CONFIGURAÇÕES GLOBAIS ---
+MESES_MAPA = {
+    "Janeiro": 1, "Fevereiro": 2, "Março": 3, "Abril": 4, "Maio": 5, "Junho": 6,
+    "Julho": 7, "Agosto": 8, "Setembro": 9, "Outubro": 10, "Novembro": 11, "Dezembro": 12
+}
+
+# --- FUNÇÕES DE LÓGICA (Helpers) ---
+
+@st.cache_data
+def obter_dados_paises():
+    df_pais = carregar_tabela("PAIS.csv")
+    if df_pais is not None and not df_pais.empty:
+        return pd.Series(df_pais.NO_PAIS.values, index=df_pais.CO_PAIS).to_dict()
+    return {}
+
+@st.cache_data
+def obter_mapa_codigos_municipios():
+    df_mun = carregar_tabela("UF_MUN.csv")
+    if df_mun is not None:
+        df_mun_mg = df_mun[df_mun['SG_UF'] == 'MG']
+        return pd.Series(df_mun_mg.CO_MUN_GEO.values, index=df_mun_mg.NO_MUN).to_dict()
+    return {}
+
+@st.cache_data
+def obter_dados_produtos_ncm():
+    df_ncm = carregar_tabela("NCM_SH.csv")
+    if df_ncm is not None:
+        mapa_sh4 = df_ncm.drop_duplicates('CO_SH4').set_index('CO_SH4')['NO_SH4_POR'].to_dict()
+        mapa_sh2 = df_ncm.drop_duplicates('CO_SH2').set_index('CO_SH2')['NO_SH2_POR'].to_dict()
+        return mapa_sh4, mapa_sh2
+    return {}, {}
+
+def formatar_valor(valor):
+    if pd.isna(valor): return "US$ 0,00"
+    prefixo = ""
+    if valor < 0: prefixo, valor = "-", abs(valor)
+    if valor >= 1e9: return f"{prefixo}US$ {(valor/1e9):.2f} bilhões"
+    if valor >= 1e6: return f"{prefixo}US$ {(valor/1e6):.2f} milhões"
+    if valor >= 1e3: return f"{prefixo}US$ {(valor/1e3):.2f} mil"
+    return f"{prefixo}US$ {valor:.2f}"
+
+def calc_var_display(row, col_atual, col_ant):
+    v_atual = row[col_atual]
+    v_ant = row[col_ant]
+    if pd.isna(v_ant) or v_ant == 0:
+        return "Novo Mercado" if v_atual > 0 else "-"
+    var = ((v_atual - v_ant) / v_ant) * 100
+    return f"{var:.2f}%"
+
+def calcular_diferenca_percentual(valor_atual, valor_anterior):
+    if pd.isna(valor_anterior) or valor_anterior == 0:
+        return 100.0 if valor_atual > 0 else 0.0, "acréscimo" if valor_atual > 0 else "estabilidade"
+    diferenca = round(((valor_atual - valor_anterior) / valor_anterior) * 100, 2)
+    tipo = "acréscimo" if diferenca > 0 else "redução" if diferenca < 0 else "estabilidade"
+    return abs(diferenca), f"um {tipo}" if tipo != "estabilidade" else "uma estabilidade"
+
+class DocumentoApp(DocumentoBriefing):
+    """Briefing de município: títulos de seção sem numeração."""
+    NUMERAR_TITULOS = False
+
+
+def gerar_briefings(parametros, relato):
+    """
+    Gera os briefings de município (um consolidado ou um por município) e os anexa ao relato.
+    parametros: as escolhas feitas na página (anos, meses, municípios, agrupamento e ranking).
+    """
+    ano_principal = parametros["ano_principal"]
+    ano_comparacao = parametros["ano_comparacao"]
+    meses_selecionados = parametros["meses_selecionados"]
+    todos_municipios = parametros["municipios"]
+    agrupado = parametros["agrupado"]
+    nome_agrupamento = parametros["nome_agrupamento"]
+    top_n_itens = parametros["top_n_itens"]
+    anos_tendencia = parametros["anos_tendencia"]
+    logo_path_to_use = parametros["logo_path"]
+
+    mapa_codigos_municipios = obter_mapa_codigos_municipios()
+    mapa_nomes_paises = obter_dados_paises()
+    mapa_sh4_nomes, _ = obter_dados_produtos_ncm()
+
+    # Validação
+    codigos_municipios_map = []
+    municipios_validos = []
+    for m in todos_municipios:
+        cod = mapa_codigos_municipios.get(m) or mapa_codigos_municipios.get(m.upper())
+        if cod:
+            codigos_municipios_map.append(cod)
+            municipios_validos.append(m)
+
+    if not codigos_municipios_map:
+        raise ErroTarefa("Nenhum município válido.")
+
+    # Cubos municipais de MG (município, país, mês, SH4) e o resumo de todas as UFs para o ranking
+    filtro_mg = {'SG_UF_MUN': ['MG']}
+    # Consultas pelo motor configurado para a página (pandas ou duckdb, ver dados_comex)
+    relato.etapa("Carregando os dados da Comex Stat")
+    fontes = abrir_fontes({
+        "exp_princ": pedido_cubo("EXP", ano_principal, nivel="mun", filtros=filtro_mg),
+        "exp_comp": pedido_cubo("EXP", ano_comparacao, nivel="mun", filtros=filtro_mg),
+        "imp_princ": pedido_cubo("IMP", ano_principal, nivel="mun", filtros=filtro_mg),
+        "imp_comp": pedido_cubo("IMP", ano_comparacao, nivel="mun", filtros=filtro_mg),
+        "exp_resumo": pedido_resumo_municipios("EXP", ano_principal),
+        "imp_resumo": pedido_resumo_municipios("IMP", ano_principal),
+    }, motor=motor_da_pagina("municipio"), mostrar_progresso=False)
+
+    if any(fonte is None for fonte in fontes.values()):
+        raise ErroTarefa("Falha ao carregar dados.")
+
+    if meses_selecionados:
+        meses_para_filtrar = [MESES_MAPA[m] for m in meses_selecionados]
+        nome_periodo = f"o período de {', '.join(meses_selecionados)} de {ano_principal}"
+        nome_periodo_comp = f"o mesmo período de {ano_comparacao}"
+    else:
+        meses_para_filtrar = list(range(1, fontes["exp_princ"].meses()[-1] + 1))
+        nome_periodo = f"o ano de {ano_principal} (completo)"
+        nome_periodo_comp = f"o mesmo período de {ano_comparacao}"
+
+    # CÁLCULO RANKING ESTADUAL
+    filtro_mg_mes = {'SG_UF_MUN': ['MG'], 'CO_MES': meses_para_filtrar}
+    ranking_exp_mg = fontes["exp_resumo"].somar(['CO_MUN'], filtro_mg_mes).sort_values(ascending=False)
+    ranking_imp_mg = fontes["imp_resumo"].somar(['CO_MUN'], filtro_mg_mes).sort_values(ascending=False)
+
+    total_exportacao_mg = ranking_exp_mg.sum()
+    total_importacao_mg = ranking_imp_mg.sum()
+
+    # TENDÊNCIA: anos fechados do histórico consolidado, sem baixar outros arquivos
+    anos_historico = []
+    if anos_tendencia:
+        anos_historico = historico.anos_da_tendencia("municipios", ano_principal, anos_tendencia)
+        if len(anos_historico) < 2:
+            relato.warning("O histórico consolidado não tem anos suficientes para a seção de tendência "
+                           "(carregue-o com scripts/carregar_historico.py). Os briefings serão gerados sem ela.")
+            anos_historico = []
+    tendencias = historico.valores_por_codigo("municipios", 'CO_MUN', codigos_municipios_map, anos_historico, filtros={'SG_UF_MUN': ['MG']}) if anos_historico else None
+
+    if not agrupado:
+        municipios_para_processar = municipios_validos
+    else:
+        municipios_para_processar = [nome_agrupamento if (nome_agrupamento and nome_agrupamento.strip() != "") else ", ".join(municipios_validos)]
+
+    roteiros = []
+    for i, municipio_nome in enumerate(municipios_para_processar):
+        relato.etapa(f"Montando o briefing de {municipio_nome}", i, len(municipios_para_processar))
+        app = RoteiroDocumento(DocumentoApp, logo_path=logo_path_to_use)
+
+        if agrupado:
+            relato.subheader(f"Análise Agrupada: {municipio_nome}")
+            codigos_loop = codigos_municipios_map
+            nome_limpo = sanitize_filename(municipio_nome)
+            titulo_doc = f"Briefing - {nome_limpo} - {ano_principal}"
+            nome_doc = f"de {municipio_nome}"
+            posicao_exp_mg = "-"
+            part_exp_mg = 0
+            posicao_imp_mg = "-"
+            part_imp_mg = 0
+        else:
+            relato.subheader(f"Análise: {municipio_nome}")
+            c = mapa_codigos_municipios.get(municipio_nome) or mapa_codigos_municipios.get(municipio_nome.upper())
+            cod_mun = c
+            codigos_loop = [cod_mun]
+            nome_limpo = sanitize_filename(municipio_nome)
+            titulo_doc = f"Briefing - {nome_limpo} - {ano_principal}"
+            nome_doc = f"de {municipio_nome}"
+
+            try: posicao_exp_mg = ranking_exp_mg.index.get_loc(cod_mun) + 1
+            except: posicao_exp_mg = "-"
+            try: posicao_imp_mg = ranking_imp_mg.index.get_loc(cod_mun) + 1
+            except: posicao_imp_mg = "-"
+
+        app.set_titulo(titulo_doc)
+
+        # FLUXO (no motor pandas, cada município é uma busca binária nos cubos, sem varrê-los)
+        filtro_loop = {'CO_MUN': codigos_loop, 'CO_MES': meses_para_filtrar}
+        df_exp_princ_f = fontes["exp_princ"].selecionar(filtro_loop)
+        df_exp_comp_f = fontes["exp_comp"].selecionar(filtro_loop)
+        df_imp_princ_f = fontes["imp_princ"].selecionar(filtro_loop)
+        df_imp_comp_f = fontes["imp_comp"].selecionar(filtro_loop)
+
+        val_exp = df_exp_princ_f['VL_FOB'].sum()
+        val_exp_ant = df_exp_comp_f['VL_FOB'].sum()
+        val_imp = df_imp_princ_f['VL_FOB'].sum()
+        val_imp_ant = df_imp_comp_f['VL_FOB'].sum()
+
+        fluxo = val_exp + val_imp
+        fluxo_ant = val_exp_ant + val_imp_ant
+        saldo = val_exp - val_imp
+        saldo_ant = val_exp_ant - val_imp_ant
+
+        dif_fluxo, tipo_fluxo = calcular_diferenca_percentual(fluxo, fluxo_ant)
+
+        app.nova_secao()
+        app.adicionar_titulo("1. Fluxo Comercial")
+        texto_fluxo = (f"Em {ano_principal}, {nome_doc} teve um fluxo comercial de {formatar_valor(fluxo)}, "
+                       f"representando {tipo_fluxo} de {dif_fluxo:.1f}% em comparação a {ano_comparacao}. "
+                       f"A balança comercial fechou em {formatar_valor(saldo)}.")
+        app.adicionar_conteudo_formatado(texto_fluxo)
+
+        # EXPORTAÇÃO
+        dif_exp, tipo_exp = calcular_diferenca_percentual(val_exp, val_exp_ant)
+        part_exp = (val_exp / total_exportacao_mg * 100) if total_exportacao_mg else 0
+
+        app.nova_secao()
+        app.adicionar_titulo("2. Exportações")
+        texto_exp_1 = (f"As exportações {nome_doc} somaram {formatar_valor(val_exp)} em {ano_principal}, "
+                       f"representando {tipo_exp} de {dif_exp:.1f}% em comparação a {ano_comparacao}.")
+        app.adicionar_conteudo_formatado(texto_exp_1)
+
+        if not agrupado:
+            texto_exp_2 = (f"{municipio_nome} foi o {posicao_exp_mg}º principal município exportador de Minas Gerais em {ano_principal}, "
+                           f"com uma participação de {part_exp:.2f}% nas vendas de Minas.")
+            app.adicionar_conteudo_formatado(texto_exp_2)
+
+        exp_paises = df_exp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False).head(5)
+        exp_prods = df_exp_princ_f.groupby('SH4')['VL_FOB'].sum().sort_values(ascending=False).head(5)
+
+        top_paises_txt = []
+        for c, v in exp_paises.items():
+            nm = mapa_nomes_paises.get(c, f"Desconhecido ({c})")
+            pc = (v/val_exp)*100 if val_exp else 0
+            top_paises_txt.append(f"{nm} ({pc:.1f}%)")
+
+        top_prods_txt = []
+        for c, v in exp_prods.items():
+            nm = mapa_sh4_nomes.get(c, c)
+            pc = (v/val_exp)*100 if val_exp else 0
+            top_prods_txt.append(f"{nm} ({pc:.1f}%)")
+
+        if top_paises_txt:
+            app.adicionar_conteudo_formatado(f"Principais destinos: {'; '.join(top_paises_txt)}.")
+        if top_prods_txt:
+            app.adicionar_conteudo_formatado(f"Principais produtos: {'; '.join(top_prods_txt)}.")
+
+        # VISUAL EXP
+        relato.header(f"Exportações")
+        relato.subheader("Principais Destinos")
+        exp_p_p = df_exp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        exp_p_c = df_exp_comp_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        exp_p_p['País'] = exp_p_p['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        exp_p_c['País'] = exp_p_c['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+
+        exp_final = pd.merge(exp_p_p, exp_p_c, on='País', how='outer', suffixes=(f' {ano_principal}', f' {ano_comparacao}')).fillna(0)
+        col_princ = f'VL_FOB {ano_principal}'
+        col_comp = f'VL_FOB {ano_comparacao}'
+        exp_final['Variação %'] = exp_final.apply(lambda r: calc_var_display(r, col_princ, col_comp), axis=1)
+        exp_final = exp_final.sort_values(by=col_princ, ascending=False)
+        exp_final = exp_final.rename(columns={col_princ: f'Valor {ano_principal}', col_comp: f'Valor {ano_comparacao}'})
+
+        df_show = exp_final.copy()
+        df_show[f'Valor {ano_principal}'] = df_show[f'Valor {ano_principal}'].apply(formatar_valor)
+        df_show[f'Valor {ano_comparacao}'] = df_show[f'Valor {ano_comparacao}'].apply(formatar_valor)
+        relato.dataframe(df_show.head(top_n_itens), hide_index=True, use_container_width=True)
+
+        relato.subheader("Principais Produtos")
+        exp_pr_p = df_exp_princ_f.groupby('SH4')['VL_FOB'].sum().reset_index()
+        exp_pr_c = df_exp_comp_f.groupby('SH4')['VL_FOB'].sum().reset_index()
+        exp_pr_p['Descrição'] = exp_pr_p['SH4'].map(mapa_sh4_nomes).fillna("Desconhecido")
+
+        exp_final_pr = pd.merge(exp_pr_p, exp_pr_c, on='SH4', how='outer', suffixes=(f' {ano_principal}', f' {ano_comparacao}')).fillna(0)
+        exp_final_pr['Variação %'] = exp_final_pr.apply(lambda r: calc_var_display(r, col_princ, col_comp), axis=1)
+        exp_final_pr = exp_final_pr.sort_values(by=col_princ, ascending=False)
+
+        # Preenche descrição perdida no merge
+        exp_final_pr['Descrição'] = exp_final_pr['SH4'].map(mapa_sh4_nomes).fillna("Desconhecido")
+
+        exp_final_pr = exp_final_pr.rename(columns={col_princ: f'Valor {ano_principal}', col_comp: f'Valor {ano_comparacao}', 'SH4': 'Código SH4'})
+
+        df_show_pr = exp_final_pr.copy()
+        df_show_pr['Código SH4'] = df_show_pr['Código SH4'].astype(str).str.zfill(4)
+        df_show_pr[f'Valor {ano_principal}'] = df_show_pr[f'Valor {ano_principal}'].apply(formatar_valor)
+        df_show_pr[f'Valor {ano_comparacao}'] = df_show_pr[f'Valor {ano_comparacao}'].apply(formatar_valor)
+        relato.dataframe(df_show_pr[['Código SH4', 'Descrição', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']].head(top_n_itens), hide_index=True, use_container_width=True)
+
+        # IMPORTAÇÃO
+        dif_imp, tipo_imp = calcular_diferenca_percentual(val_imp, val_imp_ant)
+        part_imp = (val_imp / total_importacao_mg * 100) if total_importacao_mg else 0
+
+        app.nova_secao()
+        app.adicionar_titulo("3. Importações")
+        texto_imp_1 = (f"As importações {nome_doc} somaram {formatar_valor(val_imp)} em {ano_principal}, "
+                       f"representando {tipo_imp} de {dif_imp:.1f}% em comparação a {ano_comparacao}.")
+        app.adicionar_conteudo_formatado(texto_imp_1)
+
+        if not agrupado:
+            texto_imp_2 = (f"{municipio_nome} foi o {posicao_imp_mg}º principal município importador de Minas Gerais em {ano_principal}, "
+                           f"com uma participação de {part_imp:.2f}% nas compras de Minas.")
+            app.adicionar_conteudo_formatado(texto_imp_2)
+
+        # Texto IMP
+        imp_paises = df_imp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False).head(5)
+        imp_prods = df_imp_princ_f.groupby('SH4')['VL_FOB'].sum().sort_values(ascending=False).head(5)
+
+        top_paises_imp_txt = []
+        for c, v in imp_paises.items():
+            nm = mapa_nomes_paises.get(c, "Desconhecido")
+            pc = (v/val_imp)*100 if val_imp else 0
+            top_paises_imp_txt.append(f"{nm} ({pc:.1f}%)")
+
+        top_prods_imp_txt = []
+        for c, v in imp_prods.items():
+            nm = mapa_sh4_nomes.get(c, c)
+            pc = (v/val_imp)*100 if val_imp else 0
+            top_prods_imp_txt.append(f"{nm} ({pc:.1f}%)")
+
+        if top_paises_imp_txt:
+            app.adicionar_conteudo_formatado(f"Principais origens: {'; '.join(top_paises_imp_txt)}.")
+        if top_prods_imp_txt:
+            app.adicionar_conteudo_formatado(f"Principais produtos: {'; '.join(top_prods_imp_txt)}.")
+
+        # Visual IMP
+        relato.header(f"Importações")
+        relato.subheader("Principais Origens")
+
+        imp_p_p = df_imp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        imp_p_c = df_imp_comp_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        imp_p_p['País'] = imp_p_p['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        imp_p_c['País'] = imp_p_c['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+
+        imp_final = pd.merge(imp_p_p, imp_p_c, on='País', how='outer', suffixes=(f' {ano_principal}', f' {ano_comparacao}')).fillna(0)
+        imp_final['Variação %'] = imp_final.apply(lambda r: calc_var_display(r, col_princ, col_comp), axis=1)
+        imp_final = imp_final.sort_values(by=col_princ, ascending=False)
+        imp_final = imp_final.rename(columns={col_princ: f'Valor {ano_principal}', col_comp: f'Valor {ano_comparacao}'})
+
+        df_show_i = imp_final.copy()
+        df_show_i[f'Valor {ano_principal}'] = df_show_i[f'Valor {ano_principal}'].apply(formatar_valor)
+        df_show_i[f'Valor {ano_comparacao}'] = df_show_i[f'Valor {ano_comparacao}'].apply(formatar_valor)
+        relato.dataframe(df_show_i.head(top_n_itens), hide_index=True, use_container_width=True)
+
+        relato.subheader("Principais Produtos")
+        imp_pr_p = df_imp_princ_f.groupby('SH4')['VL_FOB'].sum().reset_index()
+        imp_pr_c = df_imp_comp_f.groupby('SH4')['VL_FOB'].sum().reset_index()
+
+        imp_final_pr = pd.merge(imp_pr_p, imp_pr_c, on='SH4', how='outer', suffixes=(f' {ano_principal}', f' {ano_comparacao}')).fillna(0)
+        imp_final_pr['Variação %'] = imp_final_pr.apply(lambda r: calc_var_display(r, col_princ, col_comp), axis=1)
+        imp_final_pr = imp_final_pr.sort_values(by=col_princ, ascending=False)
+        imp_final_pr['Descrição'] = imp_final_pr['SH4'].map(mapa_sh4_nomes).fillna("Desconhecido")
+
+        imp_final_pr = imp_final_pr.rename(columns={col_princ: f'Valor {ano_principal}', col_comp: f'Valor {ano_comparacao}', 'SH4': 'Código SH4'})
+
+        df_show_ip = imp_final_pr.copy()
+        df_show_ip['Código SH4'] = df_show_ip['Código SH4'].astype(str).str.zfill(4)
+        df_show_ip[f'Valor {ano_principal}'] = df_show_ip[f'Valor {ano_principal}'].apply(formatar_valor)
+        df_show_ip[f'Valor {ano_comparacao}'] = df_show_ip[f'Valor {ano_comparacao}'].apply(formatar_valor)
+        relato.dataframe(df_show_ip[['Código SH4', 'Descrição', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']].head(top_n_itens), hide_index=True, use_container_width=True)
+
+        # EVOLUÇÃO (histórico consolidado)
+        if tendencias:
+            colunas_loop = list(dict.fromkeys(codigos_loop))
+            exp_anual = tendencias["EXP"][colunas_loop].sum(axis=1)
+            imp_anual = tendencias["IMP"][colunas_loop].sum(axis=1)
+            tend_exp = historico.resumir_tendencia(exp_anual, anos_historico)
+            tend_imp = historico.resumir_tendencia(imp_anual, anos_historico)
+
+            app.nova_secao()
+            app.adicionar_titulo(f"4. Evolução {anos_historico[0]}-{anos_historico[-1]}")
+            app.adicionar_conteudo_formatado(historico.texto_evolucao(tend_exp, f"as exportações {nome_doc}", formatar_valor))
+            app.adicionar_conteudo_formatado(historico.texto_evolucao(tend_imp, f"as importações {nome_doc}", formatar_valor))
+
+            relato.header("Evolução Anual")
+            relato.dataframe(pd.DataFrame({
+                'Ano': anos_historico,
+                'Exportações': exp_anual.map(formatar_valor).values,
+                'Importações': imp_anual.map(formatar_valor).values,
+                'Saldo': (exp_anual - imp_anual).map(formatar_valor).values,
+            }), hide_index=True, use_container_width=True)
+
+        roteiros.append(app)
+
+    # Os .docx são montados em paralelo (ver tarefas) e chegam na ordem dos municípios
+    for file_bytes, file_name in renderizar_documentos(roteiros, relato):
+        relato.anexar(file_name, file_bytes)
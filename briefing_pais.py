@@ -0,0 +1,671 @@
+import streamlit as st
+import pandas as pd
+from dados_comex import carregar_tabela, carregar_em_paralelo, pedido_cubo, pedido_tabela, fatiar_por_chave, meses_disponiveis
+from documento import DocumentoBriefing
+import historico
+from tarefas import ErroTarefa, RoteiroDocumento, renderizar_documentos
+
+# --- GERAÇÃO DOS BRIEFINGS DE PAÍS ---
+# Cálculos e montagem dos documentos da página "Análise por País". Fica fora da
+# página para rodar num processo de geração (ver tarefas): a página só coleta as
+# escolhas do usuário e exibe o Relato devolvido.
+
+# --- CONFIGURAÇÕES GLOBAIS E CONSTANTES ---
+estados_brasileiros = {'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA', 'PB', 'PR',
+                       'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SE', 'SP', 'TO'}
+meses_pt = {
+    1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril", 5: "maio", 6: "junho",
+    7: "julho", 8: "agosto", 9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"
+}
+MESES_MAPA = {
+    "Janeiro": 1, "Fevereiro": 2, "Março": 3, "Abril": 4, "Maio": 5, "Junho": 6,
+    "Julho": 7, "Agosto": 8, "Setembro": 9, "Outubro": 10, "Novembro": 11, "Dezembro": 12
+}
+ARTIGOS_PAISES_MAP = {
+    "Afeganistão": "o", "África do Sul": "a", "Alemanha": "a", "Arábia Saudita": "a",
+    "Argentina": "a", "Austrália": "a", "Bélgica": "a", "Brasil": "o", "Canadá": "o",
+    "Chade": "o", "Chile": "o", "China": "a", "Colômbia": "a", "Congo": "o",
+    "Coreia do Norte": "a", "Coreia do Sul": "a", "Costa Rica": "a", "Equador": "o",
+    "Egito": "o", "Emirados Árabes Unidos": "os", "Espanha": "a", "Estados Unidos": "os",
+    "Filipinas": "as", "França": "a", "Holanda": "a", "Índia": "a", "Indonésia": "a",
+    "Inglaterra": "a", "Irã": "o", "Itália": "a", "Japão": "o", "Líbano": "o",
+    "Malásia": "a", "México": "o", "Nicarágua": "a", "Noruega": "a", "Nova Zelândia": "a",
+    "Países Baixos": "os", "Panamá": "o", "Paraguai": "o", "Pérsia": "a", "Peru": "o",
+    "Reino Unido": "o", "República Checa": "a", "República Dominicana": "a",
+    "Romênia": "a", "Rússia": "a", "Singapura": "a", "Suécia": "a", "Uruguai": "o",
+    "Venezuela": "a", "Vietnã": "o"
+}
+
+# --- FUNÇÕES DE LÓGICA (Helpers) ---
+
+@st.cache_data
+def obter_dados_paises():
+    """Carrega a tabela de países (ID e Nome) e armazena em cache."""
+    df_pais = carregar_tabela("PAIS.csv")
+    if df_pais is not None and not df_pais.empty:
+        mapa_codigo_nome = pd.Series(df_pais.NO_PAIS.values, index=df_pais.CO_PAIS).to_dict()
+        lista_nomes = sorted(df_pais[df_pais['NO_PAIS'] != 'Brasil']['NO_PAIS'].unique().tolist())
+        mapa_nome_codigo = pd.Series(df_pais.CO_PAIS.values, index=df_pais.NO_PAIS).to_dict()
+        return mapa_codigo_nome, lista_nomes, mapa_nome_codigo
+    return {}, [], {}
+
+@st.cache_data
+def obter_dados_produtos_ncm():
+    """Carrega a tabela NCM (SH4) e armazena em cache."""
+    df_ncm = carregar_tabela("NCM_SH.csv")
+    if df_ncm is not None:
+        mapa_sh4 = df_ncm.drop_duplicates('CO_SH4').set_index('CO_SH4')['NO_SH4_POR']
+        return df_ncm, mapa_sh4.to_dict()
+    return None, {}
+
+def obter_codigo_pais(nome_pais, mapa_reverso):
+    """Obtém o código do país a partir do mapa."""
+    return mapa_reverso.get(nome_pais)
+
+def validar_paises(paises_selecionados, mapa_nome_codigo):
+    """Valida a lista de países usando o mapa pré-carregado."""
+    codigos_paises = []
+    nomes_paises_validos = []
+    paises_invalidos = []
+    
+    for pais in paises_selecionados:
+        if pais.lower() == "brasil":
+            paises_invalidos.append(f"{pais} (Não é possível fazer busca no Brasil)")
+            continue
+        codigo_pais = mapa_nome_codigo.get(pais) 
+        if codigo_pais is None:
+            paises_invalidos.append(f"{pais} (País não encontrado)")
+        else:
+            codigos_paises.append(codigo_pais)
+            nomes_paises_validos.append(pais)
+    return codigos_paises, nomes_paises_validos, paises_invalidos
+
+def filtrar_dados_por_estado_e_mes(df, estados, meses_para_filtrar):
+    df_filtrado = df[df['SG_UF_NCM'].isin(list(estados))]
+    df_filtrado = df_filtrado[df_filtrado['CO_MES'].isin(meses_para_filtrar)]
+    return df_filtrado
+
+def filtrar_dados_por_mg_e_pais(df, codigos_paises, agrupado, meses_para_filtrar):
+    # Se não agrupado, assume lista de 1 item
+    if not agrupado and isinstance(codigos_paises, list) and len(codigos_paises) > 0:
+        codigos_paises = codigos_paises[:1]
+    # País primeiro: no cubo do cache, ordenado por CO_PAIS, é uma busca binária
+    df_filtrado = fatiar_por_chave(df, 'CO_PAIS', codigos_paises)
+    df_filtrado = df_filtrado[df_filtrado['SG_UF_NCM'] == 'MG']
+    df_filtrado = df_filtrado[df_filtrado['CO_MES'].isin(meses_para_filtrar)]
+    return df_filtrado
+
+def calcular_ranking_por_pais(df):
+    ranking = df.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False)
+    return ranking
+
+def calcular_participacao(valor_parcial, valor_total):
+    if valor_total == 0:
+        return 0.0
+    participacao = round(valor_parcial / valor_total * 100, 2)
+    return participacao
+
+def calcular_diferenca_percentual(valor_atual, valor_anterior):
+    if valor_anterior == 0:
+        return 0.0, "acréscimo" if valor_atual > 0 else "redução" if valor_atual < 0 else "estabilidade"
+    diferenca = round(((valor_atual - valor_anterior) / valor_anterior) * 100, 2)
+    if diferenca > 0:
+        tipo_diferenca = "um acréscimo"
+    elif diferenca < 0:
+        tipo_diferenca = "uma queda" # Alterado para bater com o doc enviado ("queda" ao inves de "redução")
+    else:
+        tipo_diferenca = "uma estabilidade"
+    diferenca = abs(diferenca)
+    return diferenca, tipo_diferenca
+
+def calcular_ranking_e_participacao_brasil(df_brasil, codigos_paises):
+    """
+    Calcula o ranking de MG entre os estados brasileiros para um destino/origem
+    e a participação de MG no total do Brasil.
+    """
+    # Filtra dados do Brasil para o país/bloco destino
+    df_brasil_pais = fatiar_por_chave(df_brasil, 'CO_PAIS', codigos_paises)
+    
+    # Agrupa por UF
+    valores_uf = df_brasil_pais.groupby('SG_UF_NCM', observed=True)['VL_FOB'].sum()
+    return posicao_e_participacao_mg(valores_uf)
+
+def posicao_e_participacao_mg(valores_uf):
+    """Posição de MG entre as UFs e participação no total do Brasil, a partir dos valores por UF."""
+    ranking_uf = valores_uf.sort_values(ascending=False)
+    
+    total_brasil_pais = ranking_uf.sum()
+    
+    if 'MG' not in ranking_uf.index:
+        return 0, 0.0
+        
+    posicao_mg = ranking_uf.index.get_loc('MG') + 1
+    valor_mg = ranking_uf['MG']
+    
+    participacao_mg_br = 0.0
+    if total_brasil_pais > 0:
+        participacao_mg_br = round((valor_mg / total_brasil_pais) * 100, 2)
+        
+    return posicao_mg, participacao_mg_br
+
+def calcular_balanca_e_fluxo(exportacao_ano, importacao_ano, exportacao_ano_anterior, importacao_ano_anterior):
+    balanca_ano = exportacao_ano - importacao_ano
+    balanca_ano_anterior = exportacao_ano_anterior - importacao_ano_anterior
+    fluxo_comercial_ano = exportacao_ano + importacao_ano
+    fluxo_comercial_ano_anterior = exportacao_ano_anterior + importacao_ano_anterior
+    variacao_balanca = 0
+    variacao_fluxo = 0
+    if balanca_ano_anterior != 0:
+        variacao_balanca = ((balanca_ano - balanca_ano_anterior) / balanca_ano_anterior) * 100
+    if fluxo_comercial_ano_anterior != 0:
+        variacao_fluxo = ((fluxo_comercial_ano - fluxo_comercial_ano_anterior) / fluxo_comercial_ano_anterior) * 100
+    return balanca_ano, balanca_ano_anterior, fluxo_comercial_ano, fluxo_comercial_ano_anterior, variacao_balanca, variacao_fluxo
+
+def gerar_texto_lista_produtos(df_dados, mapa_nomes, top_n=5):
+    """Gera string: 'Produto A (X%); Produto B (Y%); ...' """
+    return texto_lista_produtos(df_dados.groupby('SH4')['VL_FOB'].sum(), mapa_nomes, top_n)
+
+def texto_lista_produtos(valores_sh4, mapa_nomes, top_n=5):
+    """Mesmo texto de gerar_texto_lista_produtos, a partir dos valores já somados por SH4."""
+    if valores_sh4.empty:
+        return "Nenhum produto registrado."
+        
+    total = valores_sh4.sum()
+    if total == 0:
+        return "Valor total zero."
+        
+    agrupado = valores_sh4.sort_values(ascending=False).head(top_n)
+    lista_textos = []
+    
+    for sh4, valor in agrupado.items():
+        nome = mapa_nomes.get(sh4, "Produto Desconhecido")
+        part = (valor / total) * 100
+        lista_textos.append(f"{nome} ({part:.2f}%)")
+        
+    return "; ".join(lista_textos) + "."
+
+def obter_mapa_municipios(df_uf_mun):
+    """Mapa CO_MUN -> nome do município."""
+    return pd.Series(df_uf_mun.NO_MUN_MIN.values, index=df_uf_mun.CO_MUN_GEO).to_dict()
+
+def gerar_texto_lista_municipios(df_dados, df_uf_mun, top_n=5):
+    """Gera string: 'Município A (X%); Município B (Y%); ...' e retorna contagem total."""
+    valores_mun = df_dados.groupby('CO_MUN')['VL_FOB'].sum()
+    return texto_lista_municipios(valores_mun, obter_mapa_municipios(df_uf_mun), top_n)
+
+def texto_lista_municipios(valores_mun, mapa_mun, top_n=5):
+    """Mesmo texto de gerar_texto_lista_municipios, a partir dos valores já somados por CO_MUN."""
+    if valores_mun.empty:
+        return "Nenhum município.", 0
+        
+    total = valores_mun.sum()
+    if total == 0:
+        return "Valor total zero.", 0
+
+    contagem_total = len(valores_mun)
+    
+    agrupado = valores_mun.sort_values(ascending=False).head(top_n)
+    lista_textos = []
+    
+    for co_mun, valor in agrupado.items():
+        nome = mapa_mun.get(co_mun, f"Município {co_mun}")
+        part = (valor / total) * 100
+        lista_textos.append(f"{nome} ({part:.2f}%)")
+        
+    return "; ".join(lista_textos) + ".", contagem_total
+
+def calcular_metricas_por_pais(df_ano, df_ano_anterior, df_mun, codigos_paises, meses_para_filtrar):
+    """
+    Calcula de uma vez, para cada país, os números do briefing de um fluxo:
+    valor de MG no ano e no ano anterior, posição do país entre os parceiros de MG,
+    posição e participação de MG entre as UFs e os valores por SH4 e por município.
+    Cada DataFrame é agrupado uma única vez; retorna {CO_PAIS: dict}.
+    """
+    df_mg = filtrar_dados_por_estado_e_mes(df_ano, ['MG'], meses_para_filtrar)
+    df_mg_ant = filtrar_dados_por_estado_e_mes(df_ano_anterior, ['MG'], meses_para_filtrar)
+
+    ranking_mg = calcular_ranking_por_pais(df_mg)
+    posicoes_mg = pd.Series(range(1, len(ranking_mg) + 1), index=ranking_mg.index)
+    valores_ant = df_mg_ant.groupby('CO_PAIS')['VL_FOB'].sum()
+
+    # Os países pedidos saem do cubo por busca binária; MG e meses são filtrados só nessa fatia
+    df_brasil_paises = fatiar_por_chave(df_ano, 'CO_PAIS', codigos_paises)
+    df_mg_paises = filtrar_dados_por_estado_e_mes(df_brasil_paises, ['MG'], meses_para_filtrar)
+    valores_sh4 = df_mg_paises.groupby(['CO_PAIS', 'SH4'])['VL_FOB'].sum()
+
+    # Como em calcular_ranking_e_participacao_brasil, o ranking entre UFs usa o ano inteiro
+    valores_uf = df_brasil_paises.groupby(['CO_PAIS', 'SG_UF_NCM'], observed=True)['VL_FOB'].sum()
+
+    df_mun_paises = df_mun[(df_mun['SG_UF_MUN'] == 'MG') & (df_mun['CO_PAIS'].isin(codigos_paises)) & (df_mun['CO_MES'].isin(meses_para_filtrar))]
+    valores_mun = df_mun_paises.groupby(['CO_PAIS', 'CO_MUN'])['VL_FOB'].sum()
+
+    def fatiar(serie):
+        return {cod: fatia.droplevel(0) for cod, fatia in serie.groupby(level=0)}
+
+    sh4_por_pais = fatiar(valores_sh4)
+    uf_por_pais = fatiar(valores_uf)
+    mun_por_pais = fatiar(valores_mun)
+    vazio = pd.Series(dtype='int64')
+
+    metricas = {}
+    for cod in codigos_paises:
+        posicao_mg_br, part_mg_br = posicao_e_participacao_mg(uf_por_pais.get(cod, vazio))
+        metricas[cod] = {
+            "valor": ranking_mg.get(cod, 0),
+            "valor_anterior": valores_ant.get(cod, 0),
+            "posicao_pais_mg": posicoes_mg.get(cod, "-"),
+            "posicao_mg_br": posicao_mg_br,
+            "part_mg_br": part_mg_br,
+            "valores_sh4": sh4_por_pais.get(cod, vazio),
+            "valores_mun": mun_por_pais.get(cod, vazio),
+        }
+    return metricas
+
+def obter_artigo_pais(nome_pais):
+    return ARTIGOS_PAISES_MAP.get(nome_pais, "") 
+
+def formatar_valor(valor):
+    prefixo = ""
+    if valor < 0:
+        prefixo = "-"
+        valor = abs(valor)
+    if valor >= 1_000_000_000:
+        valor_formatado_str = f"{(valor / 1_000_000_000):.2f}".replace('.',',')
+        unidade = "bilhão" if (valor / 1_000_000_000) < 2 else "bilhões"
+        return f"{prefixo}US$ {valor_formatado_str} {unidade}"
+    if valor >= 1_000_000:
+        valor_formatado_str = f"{(valor / 1_000_000):.2f}".replace('.',',')
+        unidade = "milhão" if (valor / 1_000_000) < 2 else "milhões"
+        return f"{prefixo}US$ {valor_formatado_str} {unidade}"
+    if valor >= 1_000:
+        valor_formatado_str = f"{(valor / 1_000):.2f}".replace('.',',')
+        return f"{prefixo}US$ {valor_formatado_str} mil"
+    valor_formatado_str = f"{valor:.2f}".replace('.',',')
+    return f"{prefixo}US$ {valor_formatado_str}"
+
+def adicionar_secao_tendencia(app, relato, nome, valores_exp, valores_imp, anos):
+    """Seção com a evolução anual de MG com `nome` nos `anos` do histórico, e a tabela no relato."""
+    exp = historico.resumir_tendencia(valores_exp, anos)
+    imp = historico.resumir_tendencia(valores_imp, anos)
+    fluxo = historico.resumir_tendencia(exp["valores"] + imp["valores"], anos)
+
+    app.nova_secao()
+    app.adicionar_titulo(f"Evolução {anos[0]}-{anos[-1]}")
+    app.adicionar_paragrafo(
+        f"Entre {anos[0]} e {anos[-1]}, o fluxo comercial entre Minas Gerais e {nome} passou de "
+        f"{formatar_valor(fluxo['valor_inicial'])} para {formatar_valor(fluxo['valor_final'])}{historico.texto_cagr(fluxo)}."
+    )
+    app.adicionar_paragrafo(historico.texto_evolucao(exp, f"as exportações mineiras para {nome}", formatar_valor))
+    app.adicionar_paragrafo(historico.texto_evolucao(imp, f"as importações mineiras provenientes de {nome}", formatar_valor))
+
+    relato.write(f"**Evolução anual ({anos[0]}-{anos[-1]})**")
+    relato.dataframe(pd.DataFrame({
+        'Ano': anos,
+        'Exportações': exp["valores"].map(formatar_valor).values,
+        'Importações': imp["valores"].map(formatar_valor).values,
+        'Fluxo Comercial': fluxo["valores"].map(formatar_valor).values,
+    }), hide_index=True)
+
+class DocumentoApp(DocumentoBriefing):
+    """Briefing de país: título em 14 pt e um parágrafo em branco em volta dos títulos."""
+    TAMANHO_TITULO = 14
+    ESPACAR_TITULOS = True
+
+
+def gerar_briefings(parametros, relato):
+    """
+    Gera os briefings de país (um consolidado ou um por país) e os anexa ao relato.
+    parametros: as escolhas feitas na página (anos, meses, países, agrupamento e ranking).
+    """
+    ano_principal = parametros["ano_principal"]
+    ano_comparacao = parametros["ano_comparacao"]
+    meses_selecionados = parametros["meses_selecionados"]
+    paises = parametros["paises"]
+    agrupado = parametros["agrupado"]
+    nome_agrupamento = parametros["nome_agrupamento"]
+    top_n_produtos = parametros["top_n_produtos"]
+    anos_tendencia = parametros["anos_tendencia"]
+    logo_path_to_use = parametros["logo_path"]
+
+    _, _, mapa_paises_reverso = obter_dados_paises()
+    codigos_paises, nomes_paises_validos, paises_invalidos = validar_paises(paises, mapa_paises_reverso)
+    if paises_invalidos:
+        relato.warning(f"Países não encontrados ou inválidos (ignorados): {', '.join(paises_invalidos)}")
+    if not nomes_paises_validos:
+        raise ErroTarefa("Nenhum país válido fornecido. A geração foi interrompida.")
+
+    df_ncm, mapa_sh4_nomes = obter_dados_produtos_ncm()
+
+    relato.etapa("Carregando os dados da Comex Stat")
+    # Todos os arquivos da geração são baixados ao mesmo tempo.
+    # Os anuais vêm como cubos (UF, país, mês, SH6 / município, país, mês, SH4): é tudo o que o briefing usa.
+    dados = carregar_em_paralelo({
+        "uf_mun": pedido_tabela("UF_MUN.csv"),
+        "exp_ano": pedido_cubo("EXP", ano_principal),
+        "exp_ano_anterior": pedido_cubo("EXP", ano_comparacao),
+        "imp_ano": pedido_cubo("IMP", ano_principal),
+        "imp_ano_anterior": pedido_cubo("IMP", ano_comparacao),
+        "exp_mun": pedido_cubo("EXP", ano_principal, nivel="mun", filtros={'SG_UF_MUN': ['MG']}),
+        "imp_mun": pedido_cubo("IMP", ano_principal, nivel="mun", filtros={'SG_UF_MUN': ['MG']}),
+    }, mostrar_progresso=False)
+    df_uf_mun = dados["uf_mun"]
+
+    if df_ncm is None or df_uf_mun is None:
+        raise ErroTarefa("Não foi possível carregar tabelas auxiliares (NCM ou Municípios). Abortando.")
+
+    df_exp_ano = dados["exp_ano"]
+    df_exp_ano_anterior = dados["exp_ano_anterior"]
+
+    if df_exp_ano is None or df_exp_ano_anterior is None:
+        raise ErroTarefa("Não foi possível carregar dados de exportação. Verifique os anos selecionados ou tente novamente mais tarde.")
+
+    ultimo_mes_disponivel = meses_disponiveis(df_exp_ano)[-1]
+    meses_para_filtrar = []
+
+    if not meses_selecionados: 
+        meses_para_filtrar = list(range(1, ultimo_mes_disponivel + 1))
+        nome_periodo = f"o ano de {ano_principal}"
+        nome_periodo_em = f"Em {ano_principal}"
+        nome_periodo_comp = f"{ano_comparacao}"
+    else:
+        meses_para_filtrar = [MESES_MAPA[m] for m in meses_selecionados]
+        if max(meses_para_filtrar) > ultimo_mes_disponivel:
+            raise ErroTarefa(f"O ano {ano_principal} só possui dados até {meses_pt[ultimo_mes_disponivel]}. Por favor, desmarque os meses posteriores.")
+        nome_periodo = f"o período de {', '.join(meses_selecionados)} de {ano_principal}"
+        nome_periodo_em = f"No período de {', '.join(meses_selecionados)} de {ano_principal}"
+        nome_periodo_comp = f"o mesmo período de {ano_comparacao}"
+
+    # Filtros Gerais
+    df_exp_ano_estados = filtrar_dados_por_estado_e_mes(df_exp_ano, estados_brasileiros, meses_para_filtrar)
+    df_exp_ano_mg = filtrar_dados_por_estado_e_mes(df_exp_ano, ['MG'], meses_para_filtrar)
+
+    # IMPORTAÇÕES
+    df_imp_ano = dados["imp_ano"]
+    df_imp_ano_anterior = dados["imp_ano_anterior"]
+
+    if df_imp_ano is None or df_imp_ano_anterior is None:
+        raise ErroTarefa("Não foi possível carregar dados de importação. Abortando.")
+
+    df_imp_ano_estados = filtrar_dados_por_estado_e_mes(df_imp_ano, estados_brasileiros, meses_para_filtrar)
+    df_imp_ano_mg = filtrar_dados_por_estado_e_mes(df_imp_ano, ['MG'], meses_para_filtrar)
+
+    # DFs Municipais
+    df_exp_mun = dados["exp_mun"]
+    df_imp_mun = dados["imp_mun"]
+
+    # Tendência: anos fechados do histórico consolidado, sem baixar outros arquivos
+    anos_historico = []
+    if anos_tendencia:
+        anos_historico = historico.anos_da_tendencia("paises", ano_principal, anos_tendencia)
+        if len(anos_historico) < 2:
+            relato.warning("O histórico consolidado não tem anos suficientes para a seção de tendência "
+                           "(carregue-o com scripts/carregar_historico.py). Os briefings serão gerados sem ela.")
+            anos_historico = []
+    tendencias = historico.valores_por_codigo("paises", 'CO_PAIS', codigos_paises, anos_historico, filtros={'SG_UF_NCM': ['MG']}) if anos_historico else None
+
+    # FILTROS PRINCIPAIS PARA O DOC (AGRUPADO)
+    df_exp_ano_mg_paises = filtrar_dados_por_mg_e_pais(df_exp_ano, codigos_paises, agrupado, meses_para_filtrar)
+    df_exp_ano_anterior_mg_paises = filtrar_dados_por_mg_e_pais(df_exp_ano_anterior, codigos_paises, agrupado, meses_para_filtrar)
+
+    # --- CÁLCULOS GERAIS PARA O AGRUPADO ---
+    exportacao_pais_ano = df_exp_ano_mg_paises['VL_FOB'].sum()
+    exportacao_pais_ano_anterior = df_exp_ano_anterior_mg_paises['VL_FOB'].sum()
+    exportacao_mg_total_ano = df_exp_ano_mg['VL_FOB'].sum()
+
+    df_imp_ano_mg_paises = filtrar_dados_por_mg_e_pais(df_imp_ano, codigos_paises, agrupado, meses_para_filtrar)
+    df_imp_ano_anterior_mg_paises = filtrar_dados_por_mg_e_pais(df_imp_ano_anterior, codigos_paises, agrupado, meses_para_filtrar)
+    importacao_pais_ano = df_imp_ano_mg_paises['VL_FOB'].sum()
+    importacao_pais_ano_anterior = df_imp_ano_anterior_mg_paises['VL_FOB'].sum()
+    importacao_mg_total_ano = df_imp_ano_mg['VL_FOB'].sum()
+
+    balanca_ano, balanca_ano_anterior, fluxo_comercial_ano, fluxo_comercial_ano_anterior, variacao_balanca, variacao_fluxo = calcular_balanca_e_fluxo(exportacao_pais_ano, importacao_pais_ano, exportacao_pais_ano_anterior, importacao_pais_ano_anterior)
+
+    if agrupado:
+        relato.etapa("Montando o briefing")
+        app = DocumentoApp(logo_path=logo_path_to_use)
+        paises_corretos = nomes_paises_validos 
+        nome_relatorio = nome_agrupamento if (nome_agrupamento and nome_agrupamento.strip() != "") else ', '.join(paises_corretos)
+
+        titulo_documento = f"Briefing - {nome_relatorio} - {ano_principal}"
+        app.set_titulo(titulo_documento)
+        app.nova_secao()
+
+        # --- Seção 1: Balança Comercial ---
+        app.adicionar_titulo("Fluxo Comercial")
+
+        # Variação Fluxo
+        tipo_var_fluxo = "queda" if variacao_fluxo < 0 else "acréscimo" if variacao_fluxo > 0 else "estabilidade"
+        val_var_fluxo = abs(round(variacao_fluxo, 2))
+
+        # Variação Balança
+        tipo_var_bal = "queda" if variacao_balanca < 0 else "acréscimo" if variacao_balanca > 0 else "estabilidade"
+        val_var_bal = abs(round(variacao_balanca, 2))
+        saldo_str = "positiva" if balanca_ano >= 0 else "negativa"
+
+        texto_balanca = (
+            f"{nome_periodo_em}, Minas Gerais e {nome_relatorio} tiveram um fluxo comercial de {formatar_valor(fluxo_comercial_ano)}, "
+            f"representando {tipo_var_fluxo} de {val_var_fluxo}% em comparação a {nome_periodo_comp}. "
+            f"A balança comercial fechou {saldo_str} para Minas Gerais em {formatar_valor(balanca_ano)}, "
+            f"apresentando uma {tipo_var_bal} de {val_var_bal}% em relação a {nome_periodo_comp}."
+        )
+        app.adicionar_paragrafo(texto_balanca)
+
+        # --- Seção 2: Exportações DOC ---
+        app.nova_secao()
+        app.adicionar_titulo("Exportações")
+
+        # Cálculos específicos
+        posicao_pais_para_mg_exp = 0 # Ranking que ESSE PAÍS tem para MG
+        rank_df = df_exp_ano_mg.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False)
+        # Para agrupado, é dificil dizer "O Ranking do Bloco". Vamos somar e ver onde cairia se fosse um país, ou ignorar se for bloco.
+        # Se for só 1 país (agrupado=True mas len=1), calcula.
+        if len(codigos_paises) == 1:
+            try:
+                posicao_pais_para_mg_exp = rank_df.index.get_loc(codigos_paises[0]) + 1
+            except:
+                posicao_pais_para_mg_exp = "-"
+        else:
+             posicao_pais_para_mg_exp = "(bloco)"
+
+        diferenca_exportacao, tipo_diferenca_exp = calcular_diferenca_percentual(exportacao_pais_ano, exportacao_pais_ano_anterior)
+        participacao_pais_mg_exp = calcular_participacao(exportacao_pais_ano, exportacao_mg_total_ano)
+
+        # Ranking e Part de MG no Brasil
+        posicao_mg_br_exp, part_mg_br_exp = calcular_ranking_e_participacao_brasil(df_exp_ano, codigos_paises)
+
+        # Strings de listas
+        texto_produtos_exp = gerar_texto_lista_produtos(df_exp_ano_mg_paises, mapa_sh4_nomes, top_n_produtos)
+
+        # Filtra municipios
+        df_exp_mun_filtrado = df_exp_mun[(df_exp_mun['SG_UF_MUN'] == 'MG') & (df_exp_mun['CO_PAIS'].isin(codigos_paises)) & (df_exp_mun['CO_MES'].isin(meses_para_filtrar))]
+        texto_mun_exp, count_mun_exp = gerar_texto_lista_municipios(df_exp_mun_filtrado, df_uf_mun, top_n_produtos)
+
+        texto_exportacao_1 = (
+            f"{nome_relatorio} foi o {posicao_pais_para_mg_exp}º destino das exportações de Minas Gerais em {ano_principal}. "
+            f"As exportações mineiras para {nome_relatorio} somaram {formatar_valor(exportacao_pais_ano)} em {ano_principal}, "
+            f"{tipo_diferenca_exp} de {diferenca_exportacao}% em relação a {ano_comparacao}. "
+            f"A participação de {nome_relatorio} nas exportações totais de Minas Gerais em {ano_principal} foi equivalente a {participacao_pais_mg_exp}%."
+        )
+        app.adicionar_paragrafo(texto_exportacao_1)
+
+        texto_exportacao_2 = (
+            f"Minas Gerais foi o {posicao_mg_br_exp}º principal estado exportador brasileiro para {nome_relatorio} em {ano_principal}, "
+            f"com uma participação de {part_mg_br_exp}% nas vendas do Brasil ao país."
+        )
+        app.adicionar_paragrafo(texto_exportacao_2)
+
+        app.adicionar_paragrafo(f"Em {ano_principal}, os principais produtos exportados de Minas Gerais para {nome_relatorio} foram: {texto_produtos_exp}")
+
+        app.adicionar_paragrafo(f"Dentre os {count_mun_exp} municípios de Minas Gerais que exportaram produtos para {nome_relatorio} em {ano_principal}, os principais foram: {texto_mun_exp}")
+
+        # --- Seção 3: Importações DOC ---
+        app.nova_secao()
+        app.adicionar_titulo("Importações")
+
+        # Cálculos imp
+        diferenca_importacao, tipo_diferenca_imp = calcular_diferenca_percentual(importacao_pais_ano, importacao_pais_ano_anterior)
+        participacao_pais_mg_imp = calcular_participacao(importacao_pais_ano, importacao_mg_total_ano)
+        posicao_mg_br_imp, part_mg_br_imp = calcular_ranking_e_participacao_brasil(df_imp_ano, codigos_paises)
+
+        rank_df_imp = df_imp_ano_mg.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False)
+        if len(codigos_paises) == 1:
+            try:
+                posicao_pais_para_mg_imp = rank_df_imp.index.get_loc(codigos_paises[0]) + 1
+            except:
+                posicao_pais_para_mg_imp = "-"
+        else:
+             posicao_pais_para_mg_imp = "(bloco)"
+
+        texto_produtos_imp = gerar_texto_lista_produtos(df_imp_ano_mg_paises, mapa_sh4_nomes, top_n_produtos)
+
+        df_imp_mun_filtrado = df_imp_mun[(df_imp_mun['SG_UF_MUN'] == 'MG') & (df_imp_mun['CO_PAIS'].isin(codigos_paises)) & (df_imp_mun['CO_MES'].isin(meses_para_filtrar))]
+        texto_mun_imp, count_mun_imp = gerar_texto_lista_municipios(df_imp_mun_filtrado, df_uf_mun, top_n_produtos)
+
+        texto_importacao_1 = (
+            f"{nome_relatorio} foi a {posicao_pais_para_mg_imp}ª origem das importações de Minas Gerais em {ano_principal}. "
+            f"As importações mineiras provenientes de {nome_relatorio} somaram {formatar_valor(importacao_pais_ano)} em {ano_principal}, "
+            f"{tipo_diferenca_imp} de {diferenca_importacao}% em relação a {ano_comparacao}. "
+            f"A participação de {nome_relatorio} nas importações totais de Minas Gerais em {ano_principal} foi equivalente a {participacao_pais_mg_imp}%."
+        )
+        app.adicionar_paragrafo(texto_importacao_1)
+
+        texto_importacao_2 = (
+            f"Minas Gerais foi o {posicao_mg_br_imp}º principal estado importador brasileiro de {nome_relatorio} em {ano_principal}, "
+            f"com uma participação de {part_mg_br_imp}% nas compras do Brasil ao país."
+        )
+        app.adicionar_paragrafo(texto_importacao_2)
+
+        app.adicionar_paragrafo(f"Em {ano_principal}, os principais produtos importados para Minas Gerais de {nome_relatorio} foram: {texto_produtos_imp}")
+
+        app.adicionar_paragrafo(f"Dentre os {count_mun_imp} municípios de Minas Gerais que importaram produtos de {nome_relatorio} em {ano_principal}, os principais foram: {texto_mun_imp}")
+
+        # --- EXIBIÇÃO APENAS NO STREAMLIT (Tabelas) ---
+        relato.subheader("Visualização de Dados (Não incluído no DOCX)")
+
+        # --- Seção 4: Evolução (histórico consolidado) ---
+        if tendencias:
+            adicionar_secao_tendencia(app, relato, nome_relatorio, tendencias["EXP"].sum(axis=1),
+                                      tendencias["IMP"].sum(axis=1), anos_historico)
+
+        relato.write("**Exportações (Top Produtos)**")
+        exp_produtos_princ = df_exp_ano_mg_paises.groupby('SH4')['VL_FOB'].sum().sort_values(ascending=False).head(top_n_produtos).reset_index()
+        exp_produtos_princ['Produto'] = exp_produtos_princ['SH4'].map(mapa_sh4_nomes)
+        exp_produtos_princ[f'Valor {ano_principal}'] = exp_produtos_princ['VL_FOB'].apply(formatar_valor)
+        relato.dataframe(exp_produtos_princ[['Produto', f'Valor {ano_principal}']], hide_index=True)
+
+        relato.write("**Importações (Top Produtos)**")
+        imp_produtos_princ = df_imp_ano_mg_paises.groupby('SH4')['VL_FOB'].sum().sort_values(ascending=False).head(top_n_produtos).reset_index()
+        imp_produtos_princ['Produto'] = imp_produtos_princ['SH4'].map(mapa_sh4_nomes)
+        imp_produtos_princ[f'Valor {ano_principal}'] = imp_produtos_princ['VL_FOB'].apply(formatar_valor)
+        relato.dataframe(imp_produtos_princ[['Produto', f'Valor {ano_principal}']], hide_index=True)
+
+        file_bytes, file_name = app.finalizar_documento() 
+        relato.anexar(file_name, file_bytes)
+        relato.success(f"Relatório '{file_name}' gerado com sucesso!")
+
+    else:
+        # --- LÓGICA PARA SEPARADOS ---
+        paises_corretos = nomes_paises_validos
+
+        # Todos os números por país saem de um agrupamento por DataFrame; o loop só monta o texto
+        metricas_exp = calcular_metricas_por_pais(df_exp_ano, df_exp_ano_anterior, df_exp_mun, codigos_paises, meses_para_filtrar)
+        metricas_imp = calcular_metricas_por_pais(df_imp_ano, df_imp_ano_anterior, df_imp_mun, codigos_paises, meses_para_filtrar)
+        mapa_mun = obter_mapa_municipios(df_uf_mun)
+
+        roteiros = []
+        for i, pais in enumerate(paises_corretos):
+            relato.etapa(f"Montando o briefing de {pais}", i, len(paises_corretos))
+            relato.subheader(f"Processando: {pais}") 
+            app = RoteiroDocumento(DocumentoApp, logo_path=logo_path_to_use)
+
+            codigo_pais = obter_codigo_pais(pais, mapa_paises_reverso)
+            m_exp = metricas_exp[codigo_pais]
+            m_imp = metricas_imp[codigo_pais]
+
+            # Valores e Balança
+            v_exp_atual = m_exp["valor"]
+            v_exp_ant = m_exp["valor_anterior"]
+            v_imp_atual = m_imp["valor"]
+            v_imp_ant = m_imp["valor_anterior"]
+
+            balanca_loop, balanca_ant_loop, fluxo_loop, fluxo_ant_loop, var_bal, var_fluxo = calcular_balanca_e_fluxo(v_exp_atual, v_imp_atual, v_exp_ant, v_imp_ant)
+
+            titulo_documento = f"Briefing - {pais} - {ano_principal}"
+            app.set_titulo(titulo_documento)
+            app.nova_secao()
+
+            # Texto Balança
+            app.adicionar_titulo("Fluxo Comercial")
+            tipo_var_fluxo = "queda" if var_fluxo < 0 else "acréscimo" if var_fluxo > 0 else "estabilidade"
+            val_var_fluxo = abs(round(var_fluxo, 2))
+            tipo_var_bal = "queda" if var_bal < 0 else "acréscimo" if var_bal > 0 else "estabilidade"
+            val_var_bal = abs(round(var_bal, 2))
+            saldo_str = "positiva" if balanca_loop >= 0 else "negativa"
+
+            texto_balanca = (
+                f"{nome_periodo_em}, Minas Gerais e {pais} tiveram um fluxo comercial de {formatar_valor(fluxo_loop)}, "
+                f"representando {tipo_var_fluxo} de {val_var_fluxo}% em comparação a {nome_periodo_comp}. "
+                f"A balança comercial fechou {saldo_str} para Minas Gerais em {formatar_valor(balanca_loop)}, "
+                f"apresentando uma {tipo_var_bal} de {val_var_bal}% em relação a {nome_periodo_comp}."
+            )
+            app.adicionar_paragrafo(texto_balanca)
+
+            # Texto Exportações
+            app.nova_secao()
+            app.adicionar_titulo("Exportações")
+
+            pos_pais_mg = m_exp["posicao_pais_mg"]
+            dif_exp_val, tipo_dif_exp = calcular_diferenca_percentual(v_exp_atual, v_exp_ant)
+            part_exp = calcular_participacao(v_exp_atual, exportacao_mg_total_ano)
+            pos_mg_br_exp, part_mg_br_exp = m_exp["posicao_mg_br"], m_exp["part_mg_br"]
+
+            texto_prods_exp = texto_lista_produtos(m_exp["valores_sh4"], mapa_sh4_nomes, top_n_produtos)
+            texto_mun_exp, count_mun_exp = texto_lista_municipios(m_exp["valores_mun"], mapa_mun, top_n_produtos)
+
+            app.adicionar_paragrafo(
+                f"{pais} foi o {pos_pais_mg}º destino das exportações de Minas Gerais em {ano_principal}. "
+                f"As exportações mineiras para {pais} somaram {formatar_valor(v_exp_atual)} em {ano_principal}, "
+                f"{tipo_dif_exp} de {dif_exp_val}% em relação a {ano_comparacao}. "
+                f"A participação de {pais} nas exportações totais de Minas Gerais em {ano_principal} foi equivalente a {part_exp}%."
+            )
+            app.adicionar_paragrafo(
+                f"Minas Gerais foi o {pos_mg_br_exp}º principal estado exportador brasileiro para {pais} em {ano_principal}, "
+                f"com uma participação de {part_mg_br_exp}% nas vendas do Brasil ao país."
+            )
+            app.adicionar_paragrafo(f"Em {ano_principal}, os principais produtos exportados de Minas Gerais para {pais} foram: {texto_prods_exp}")
+            app.adicionar_paragrafo(f"Dentre os {count_mun_exp} municípios de Minas Gerais que exportaram produtos para {pais} em {ano_principal}, os principais foram: {texto_mun_exp}")
+
+            # Texto Importações
+            app.nova_secao()
+            app.adicionar_titulo("Importações")
+
+            pos_pais_mg_imp = m_imp["posicao_pais_mg"]
+            dif_imp_val, tipo_dif_imp = calcular_diferenca_percentual(v_imp_atual, v_imp_ant)
+            part_imp = calcular_participacao(v_imp_atual, importacao_mg_total_ano)
+            pos_mg_br_imp, part_mg_br_imp = m_imp["posicao_mg_br"], m_imp["part_mg_br"]
+
+            texto_prods_imp = texto_lista_produtos(m_imp["valores_sh4"], mapa_sh4_nomes, top_n_produtos)
+            texto_mun_imp, count_mun_imp = texto_lista_municipios(m_imp["valores_mun"], mapa_mun, top_n_produtos)
+
+            app.adicionar_paragrafo(
+                f"{pais} foi a {pos_pais_mg_imp}ª origem das importações de Minas Gerais em {ano_principal}. "
+                f"As importações mineiras provenientes de {pais} somaram {formatar_valor(v_imp_atual)} em {ano_principal}, "
+                f"{tipo_dif_imp} de {dif_imp_val}% em relação a {ano_comparacao}. "
+                f"A participação de {pais} nas importações totais de Minas Gerais em {ano_principal} foi equivalente a {part_imp}%."
+            )
+            app.adicionar_paragrafo(
+                f"Minas Gerais foi o {pos_mg_br_imp}º principal estado importador brasileiro de {pais} em {ano_principal}, "
+                f"com uma participação de {part_mg_br_imp}% nas compras do Brasil ao país."
+            )
+            app.adicionar_paragrafo(f"Em {ano_principal}, os principais produtos importados para Minas Gerais de {pais} foram: {texto_prods_imp}")
+            app.adicionar_paragrafo(f"Dentre os {count_mun_imp} municípios de Minas Gerais que importaram produtos de {pais} em {ano_principal}, os principais foram: {texto_mun_imp}")
+
+            if tendencias:
+                adicionar_secao_tendencia(app, relato, pais, tendencias["EXP"][codigo_pais],
+                                          tendencias["IMP"][codigo_pais], anos_historico)
+
+            roteiros.append(app)
+
+        # Os .docx são montados em paralelo (ver tarefas) e chegam na ordem dos países
+        for file_bytes, file_name in renderizar_documentos(roteiros, relato):
+            relato.anexar(file_name, file_bytes)
@@ -0,0 +1,553 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from dados_comex import carregar_tabela, carregar_em_paralelo, pedido_cubo_produto, fatiar_por_produto, meses_disponiveis
+from documento import DocumentoBriefing, sanitize_filename
+from tarefas import ErroTarefa, RoteiroDocumento, renderizar_documentos
+import historico
+
+# --- GERAÇÃO DOS BRIEFINGS DE PRODUTO ---
+# Cálculos e montagem dos documentos da página "Análise por Produto", executados
+# num processo de geração (ver tarefas).
+
+# --- CONFIGURAÇÕES GLOBAIS ---
+MESES_MAPA = {
+    "Janeiro": 1, "Fevereiro": 2, "Março": 3, "Abril": 4, "Maio": 5, "Junho": 6,
+    "Julho": 7, "Agosto": 8, "Setembro": 9, "Outubro": 10, "Novembro": 11, "Dezembro": 12
+}
+meses_pt = {
+    1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril", 5: "maio", 6: "junho",
+    7: "julho", 8: "agosto", 9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"
+}
+
+# --- FUNÇÕES DE LÓGICA (Helpers) ---
+
+@st.cache_data
+def obter_dados_paises():
+    """Carrega a tabela de países (ID e Nome) e armazena em cache."""
+    df_pais = carregar_tabela("PAIS.csv")
+    if df_pais is not None and not df_pais.empty:
+        mapa_codigo_nome = pd.Series(df_pais.NO_PAIS.values, index=df_pais.CO_PAIS).to_dict()
+        lista_nomes = sorted(df_pais[df_pais['NO_PAIS'] != 'Brasil']['NO_PAIS'].unique().tolist())
+        mapa_nome_codigo = pd.Series(df_pais.CO_PAIS.values, index=df_pais.NO_PAIS).to_dict()
+        return mapa_codigo_nome, lista_nomes, mapa_nome_codigo
+    return {}, [], {}
+
+@st.cache_data
+def obter_dados_produtos_ncm():
+    """Carrega a tabela NCM completa (SH2, SH4 e SH6) e armazena em cache."""
+    df_ncm = carregar_tabela("NCM_SH.csv")
+    if df_ncm is not None:
+        # Criar mapas de nomes de produtos para reuso
+        mapa_sh2 = df_ncm.drop_duplicates('CO_SH2').set_index('CO_SH2')['NO_SH2_POR']
+        mapa_sh4 = df_ncm.drop_duplicates('CO_SH4').set_index('CO_SH4')['NO_SH4_POR']
+        mapa_sh6 = df_ncm.drop_duplicates('CO_SH6').set_index('CO_SH6')['NO_SH6_POR']
+        
+        return df_ncm, mapa_sh2.to_dict(), mapa_sh4.to_dict(), mapa_sh6.to_dict()
+    return None, {}, {}, {}
+
+def formatar_valor(valor):
+    prefixo = ""
+    if valor < 0:
+        prefixo = "-"
+        valor = abs(valor)
+    if valor >= 1_000_000_000:
+        valor_formatado_str = f"{(valor / 1_000_000_000):.2f}".replace('.',',')
+        unidade = "bilhão" if (valor / 1_000_000_000) < 2 else "bilhões"
+        return f"{prefixo}US$ {valor_formatado_str} {unidade}"
+    if valor >= 1_000_000:
+        valor_formatado_str = f"{(valor / 1_000_000):.2f}".replace('.',',')
+        unidade = "milhão" if (valor / 1_000_000) < 2 else "milhões"
+        return f"{prefixo}US$ {valor_formatado_str} {unidade}"
+    if valor >= 1_000:
+        valor_formatado_str = f"{(valor / 1_000):.2f}".replace('.',',')
+        return f"{prefixo}US$ {valor_formatado_str} mil"
+    valor_formatado_str = f"{valor:.2f}".replace('.',',')
+    return f"{prefixo}US$ {valor_formatado_str}"
+
+def calcular_diferenca_percentual(valor_atual, valor_anterior):
+    """Calcula a diferença percentual entre dois valores."""
+    if valor_anterior == 0:
+        return 0.0, "acréscimo" if valor_atual > 0 else "redução" if valor_atual < 0 else "estabilidade"
+    diferenca = round(((valor_atual - valor_anterior) / valor_anterior) * 100, 2)
+    if diferenca > 0:
+        tipo_diferenca = "um acréscimo"
+    elif diferenca < 0:
+        tipo_diferenca = "uma redução"
+    else:
+        tipo_diferenca = "uma estabilidade"
+    diferenca = abs(diferenca)
+    return diferenca, tipo_diferenca
+
+def atribuir_produto_selecionado(df, produto_info, mapa_sh2, mapa_sh4, mapa_sh6):
+    """
+    Nome do produto selecionado de cada linha, com precedência SH6 > SH4 > SH2, sem apply por linha.
+    Retorna uma Series categórica alinhada a df (vazia nas linhas fora da seleção).
+    """
+    niveis = [('SH2', produto_info['codigos_sh2'], mapa_sh2),
+              ('SH4', produto_info['codigos_sh4'], mapa_sh4),
+              ('SH6', produto_info['codigos_sh6'], mapa_sh6)]
+    categorias = {}
+    codigos = np.full(len(df), -1, dtype=np.int32)
+    # Do nível menos para o mais específico: cada nível sobrescreve o anterior onde casar
+    for coluna, selecionados, mapa in niveis:
+        if not selecionados:
+            continue
+        rotulos = [str(mapa.get(c, c)) for c in selecionados]
+        codigos_nivel = np.array([categorias.setdefault(r, len(categorias)) for r in rotulos], dtype=np.int32)
+        posicoes = pd.Index(selecionados).get_indexer(df[coluna])
+        casou = posicoes >= 0
+        codigos[casou] = codigos_nivel[posicoes[casou]]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=list(categorias)), index=df.index)
+
+def calcular_tendencia_produto(produto_info, anos):
+    """
+    Valores anuais do produto nos `anos`, lidos do histórico consolidado (ver historico).
+    Retorna {fluxo: (Series de MG por ano, Series do Brasil por ano)}.
+    """
+    codigos = (produto_info['codigos_sh2'], produto_info['codigos_sh4'], produto_info['codigos_sh6'])
+    tendencia = {}
+    for fluxo in historico.FLUXOS:
+        por_uf = historico.somar_por_ano("produtos", fluxo, anos, chaves=['SG_UF_NCM'], produtos=codigos)
+        por_uf = por_uf.unstack(fill_value=0).reindex(index=anos, fill_value=0)
+        valores_mg = por_uf['MG'] if 'MG' in por_uf.columns else pd.Series(0, index=por_uf.index)
+        tendencia[fluxo] = (valores_mg, por_uf.sum(axis=1))
+    return tendencia
+
+def texto_evolucao_com_participacao(resumo, descricao, valores_brasil):
+    """Frase da evolução de um fluxo de MG (ver historico.texto_evolucao), com a participação no Brasil no início e no fim."""
+    texto = historico.texto_evolucao(resumo, descricao, formatar_valor)
+    if resumo["valor_pico"] == 0:
+        return texto
+    participacoes = []
+    for ano, valor in ((resumo['inicio'], resumo['valor_inicial']), (resumo['fim'], resumo['valor_final'])):
+        total = valores_brasil[ano]
+        participacoes.append(f"{(valor / total * 100) if total > 0 else 0:.2f}% em {ano}")
+    return texto + f" A participação de Minas Gerais no total nacional foi de {' e de '.join(participacoes)}."
+
+class DocumentoApp(DocumentoBriefing):
+    """Briefing de produto: o formato padrão, com as seções numeradas."""
+
+
+def gerar_briefings(parametros, relato):
+    """
+    Gera os briefings de produto (um consolidado ou um por SH selecionado) e os anexa ao relato.
+    parametros: as escolhas feitas na página (anos, meses, países, produtos, agrupamento e ranking).
+    """
+    ano_principal = parametros["ano_principal"]
+    ano_comparacao = parametros["ano_comparacao"]
+    meses_selecionados = parametros["meses_selecionados"]
+    paises_selecionados_nomes = parametros["paises"]
+    sh2_selecionados_nomes = parametros["sh2"]
+    sh4_selecionados_nomes = parametros["sh4"]
+    sh6_selecionados_nomes = parametros["sh6"]
+    agrupado = parametros["agrupado"]
+    nome_agrupamento = parametros["nome_agrupamento"]
+    top_n_paises = parametros["top_n_paises"]
+    anos_tendencia = parametros["anos_tendencia"]
+    logo_path_to_use = parametros["logo_path"]
+
+    total_selecionado = len(sh2_selecionados_nomes) + len(sh4_selecionados_nomes) + len(sh6_selecionados_nomes)
+    produtos_para_agrupar_nomes = sh2_selecionados_nomes + sh4_selecionados_nomes + sh6_selecionados_nomes
+    mapa_nomes_paises, _, mapa_paises_reverso = obter_dados_paises()
+    _, mapa_sh2_nomes, mapa_sh4_nomes, mapa_sh6_nomes = obter_dados_produtos_ncm()
+
+    codigos_sh2_selecionados = [int(s.split(" - ")[0]) for s in sh2_selecionados_nomes]
+    codigos_sh4_selecionados = [int(s.split(" - ")[0]) for s in sh4_selecionados_nomes]
+    codigos_sh6_selecionados = [int(s.split(" - ")[0]) for s in sh6_selecionados_nomes]
+
+    if not codigos_sh2_selecionados and not codigos_sh4_selecionados and not codigos_sh6_selecionados:
+        raise ErroTarefa("Nenhum produto (SH2, SH4 ou SH6) selecionado.")
+
+    codigos_paises_selecionados = [mapa_paises_reverso[nome] for nome in paises_selecionados_nomes]
+
+    # --- ATENÇÃO: Carregando dados de TODAS AS UFs para o ranking nacional ---
+    # (mostrar_progresso=False para não poluir a UI)
+    # Cubos (UF, país, mês, SH6): bastam para os rankings por UF e país e para o detalhamento SH.
+    # Vêm ordenados por SH6, então cada produto selecionado é uma faixa contígua de linhas
+    relato.etapa("Carregando os dados da Comex Stat")
+    dados = carregar_em_paralelo({
+        "exp_princ": pedido_cubo_produto("EXP", ano_principal),
+        "exp_comp": pedido_cubo_produto("EXP", ano_comparacao),
+        "imp_princ": pedido_cubo_produto("IMP", ano_principal),
+        "imp_comp": pedido_cubo_produto("IMP", ano_comparacao),
+    }, mostrar_progresso=False)
+    df_exp_princ_ufs = dados["exp_princ"]
+    df_exp_comp_ufs = dados["exp_comp"]
+    df_imp_princ_ufs = dados["imp_princ"]
+    df_imp_comp_ufs = dados["imp_comp"]
+
+    # (Aviso: os arquivos MUN não contêm CO_NCM, então o ranking municipal por produto é impossível)
+
+    # Verificação de falha
+    if df_exp_princ_ufs is None or df_imp_princ_ufs is None or df_exp_comp_ufs is None or df_imp_comp_ufs is None:
+        raise ErroTarefa("Falha ao carregar arquivos de dados NCM (Nacional). Tente novamente.")
+    # if df_exp_mun_princ is None or df_imp_mun_princ is None or df_uf_mun is None:
+    #     st.error("Falha ao carregar arquivos de dados Municipais. Tente novamente.")
+    #     st.stop()
+    relato.warning("AVISO: Os arquivos públicos da Comex Stat não permitem cruzar dados de Produto (NCM) com Município. O ranking municipal não será gerado.")
+
+    # Anos fechados do histórico consolidado para a seção de tendência (sem novos downloads)
+    anos_historico = []
+    if anos_tendencia:
+        anos_historico = historico.anos_da_tendencia("produtos", ano_principal, anos_tendencia)
+        if len(anos_historico) < 2:
+            relato.warning("O histórico consolidado não tem anos suficientes para a seção de tendência "
+                           "(carregue-o com scripts/carregar_historico.py). Os briefings serão gerados sem ela.")
+            anos_historico = []
+
+
+    # --- Filtro de Meses ---
+    if meses_selecionados:
+        meses_para_filtrar = [MESES_MAPA[m] for m in meses_selecionados]
+        nome_periodo = f"o período de {', '.join(meses_selecionados)} de {ano_principal}"
+        nome_periodo_comp = f"o mesmo período de {ano_comparacao}"
+    else:
+        ultimo_mes_disponivel = meses_disponiveis(df_exp_princ_ufs)[-1]
+        meses_para_filtrar = list(range(1, ultimo_mes_disponivel + 1))
+        nome_periodo = f"o ano de {ano_principal} (até {meses_pt.get(ultimo_mes_disponivel, ultimo_mes_disponivel)})"
+        nome_periodo_comp = f"o mesmo período de {ano_comparacao}"
+
+    # --- Filtro por produto e mês ---
+    # Busca binária no cubo ordenado por SH6; os meses só são filtrados na fatia do produto
+    def filtrar_produto(df, produto_info):
+        fatia = fatiar_por_produto(df, produto_info['codigos_sh2'], produto_info['codigos_sh4'], produto_info['codigos_sh6'])
+        return fatia[fatia['CO_MES'].isin(meses_para_filtrar)]
+
+
+    # --- Lógica de Loop (Agrupado vs Separado) ---
+    if agrupado:
+        nome_grupo = nome_agrupamento if (nome_agrupamento and nome_agrupamento.strip() != "") else ", ".join([p.split(' - ')[1] for p in produtos_para_agrupar_nomes])
+        produtos_para_processar = [{
+            "nome": nome_grupo,
+            "codigos_sh2": codigos_sh2_selecionados,
+            "codigos_sh4": codigos_sh4_selecionados,
+            "codigos_sh6": codigos_sh6_selecionados,
+            "nomes_originais": produtos_para_agrupar_nomes 
+        }]
+    else:
+        produtos_para_processar = []
+        for nome_completo in sh2_selecionados_nomes:
+            produtos_para_processar.append({ "nome": nome_completo, "codigos_sh2": [int(nome_completo.split(" - ")[0])], "codigos_sh4": [], "codigos_sh6": [], "nomes_originais": [nome_completo] })
+        for nome_completo in sh4_selecionados_nomes:
+            produtos_para_processar.append({ "nome": nome_completo, "codigos_sh2": [], "codigos_sh4": [int(nome_completo.split(" - ")[0])], "codigos_sh6": [], "nomes_originais": [nome_completo] })
+        for nome_completo in sh6_selecionados_nomes:
+            produtos_para_processar.append({ "nome": nome_completo, "codigos_sh2": [], "codigos_sh4": [], "codigos_sh6": [int(nome_completo.split(" - ")[0])], "nomes_originais": [nome_completo] })
+
+    # Loop principal de processamento
+    roteiros = []
+    for i, produto_info in enumerate(produtos_para_processar):
+        relato.etapa(f"Montando o briefing de {produto_info['nome']}", i, len(produtos_para_processar))
+
+        app = RoteiroDocumento(DocumentoApp, logo_path=logo_path_to_use)
+
+        if agrupado:
+            relato.subheader(f"Análise Agrupada de: {produto_info['nome']}")
+            nome_limpo_arquivo = sanitize_filename(produto_info['nome'])
+            titulo_doc = f"Briefing - {nome_limpo_arquivo} - {ano_principal}"
+            produto_nome_doc = f"de {produto_info['nome']}"
+        else:
+            relato.subheader(f"Análise de: {produto_info['nome']}")
+            nome_limpo_arquivo = sanitize_filename(produto_info['nome'].split(" - ")[1])
+            titulo_doc = f"Briefing - {nome_limpo_arquivo} - {ano_principal}"
+            produto_nome_doc = f"de {produto_info['nome'].split(' - ')[1]}"
+
+        app.set_titulo(titulo_doc)
+
+        # --- Filtros de Produto (para todos os DFs de UF) ---
+        df_exp_princ_ufs_filtrado = filtrar_produto(df_exp_princ_ufs, produto_info)
+        df_exp_comp_ufs_filtrado = filtrar_produto(df_exp_comp_ufs, produto_info)
+        df_imp_princ_ufs_filtrado = filtrar_produto(df_imp_princ_ufs, produto_info)
+        df_imp_comp_ufs_filtrado = filtrar_produto(df_imp_comp_ufs, produto_info)
+
+        # --- Lógica de Filtragem (para UI) ---
+        df_exp_princ_f = df_exp_princ_ufs_filtrado[df_exp_princ_ufs_filtrado['SG_UF_NCM'] == 'MG']
+        df_exp_comp_f = df_exp_comp_ufs_filtrado[df_exp_comp_ufs_filtrado['SG_UF_NCM'] == 'MG']
+
+        if codigos_paises_selecionados:
+            df_exp_princ_f = df_exp_princ_f[df_exp_princ_f['CO_PAIS'].isin(codigos_paises_selecionados)]
+            df_exp_comp_f = df_exp_comp_f[df_exp_comp_f['CO_PAIS'].isin(codigos_paises_selecionados)]
+
+        # --- UI: Tabela Exportação ---
+        relato.header("Principais Destinos (Exportação de MG)")
+        exp_paises_princ = df_exp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False).reset_index()
+        exp_paises_comp = df_exp_comp_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        # ... (resto da lógica da tabela da UI) ...
+        exp_paises_princ['País'] = exp_paises_princ['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        exp_paises_princ[f'Valor {ano_principal} (US$)'] = exp_paises_princ['VL_FOB']
+        exp_paises_comp['País'] = exp_paises_comp['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        exp_paises_comp[f'Valor {ano_comparacao} (US$)'] = exp_paises_comp['VL_FOB']
+        exp_final = pd.merge(exp_paises_princ[['País', f'Valor {ano_principal} (US$)']], exp_paises_comp[['País', f'Valor {ano_comparacao} (US$)']], on="País", how="outer").fillna(0)
+        exp_final['Variação %'] = 100 * (exp_final[f'Valor {ano_principal} (US$)'] - exp_final[f'Valor {ano_comparacao} (US$)']) / exp_final[f'Valor {ano_comparacao} (US$)']
+        exp_final['Variação %'] = exp_final['Variação %'].replace([float('inf'), float('-inf')], 0).fillna(0).round(2)
+        exp_final[f'Valor {ano_principal}'] = exp_final[f'Valor {ano_principal} (US$)'].apply(formatar_valor)
+        exp_final[f'Valor {ano_comparacao}'] = exp_final[f'Valor {ano_comparacao} (US$)'].apply(formatar_valor)
+        df_display_exp = exp_final.sort_values(by=f'Valor {ano_principal} (US$)', ascending=False).reset_index(drop=True)
+        relato.dataframe(
+            df_display_exp[['País', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']].head(top_n_paises),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        # --- UI: Expander Exportação ---
+        if agrupado and total_selecionado > 1:
+            with relato.expander("Ver detalhamento de produtos por país (Exportação)"):
+                # ... (lógica do expander mantida) ...
+                top_paises_lista = df_display_exp['País'].head(top_n_paises).tolist()
+                df_exp_princ_f['Produto'] = atribuir_produto_selecionado(df_exp_princ_f, produto_info, mapa_sh2_nomes, mapa_sh4_nomes, mapa_sh6_nomes)
+                df_exp_comp_f['Produto'] = atribuir_produto_selecionado(df_exp_comp_f, produto_info, mapa_sh2_nomes, mapa_sh4_nomes, mapa_sh6_nomes)
+                df_exp_princ_f_detalhe = df_exp_princ_f.dropna(subset=['Produto'])
+                df_exp_comp_f_detalhe = df_exp_comp_f.dropna(subset=['Produto'])
+                detalhe_exp_princ = df_exp_princ_f_detalhe.groupby(['CO_PAIS', 'Produto'], observed=True)['VL_FOB'].sum().reset_index()
+                detalhe_exp_comp = df_exp_comp_f_detalhe.groupby(['CO_PAIS', 'Produto'], observed=True)['VL_FOB'].sum().reset_index()
+                detalhe_exp_princ['País'] = detalhe_exp_princ['CO_PAIS'].map(mapa_nomes_paises)
+                detalhe_exp_comp['País'] = detalhe_exp_comp['CO_PAIS'].map(mapa_nomes_paises)
+                detalhe_exp_princ = detalhe_exp_princ.rename(columns={'VL_FOB': f'Valor {ano_principal} (US$)'})
+                detalhe_exp_comp = detalhe_exp_comp.rename(columns={'VL_FOB': f'Valor {ano_comparacao} (US$)'})
+                detalhe_exp_final = pd.merge(detalhe_exp_princ[['País', 'Produto', f'Valor {ano_principal} (US$)']], detalhe_exp_comp[['País', 'Produto', f'Valor {ano_comparacao} (US$)']], on=['País', 'Produto'], how='outer').fillna(0)
+                detalhe_exp_final = detalhe_exp_final[detalhe_exp_final['País'].isin(top_paises_lista)]
+                detalhe_exp_final['Variação %'] = 100 * (detalhe_exp_final[f'Valor {ano_principal} (US$)'] - detalhe_exp_final[f'Valor {ano_comparacao} (US$)']) / detalhe_exp_final[f'Valor {ano_comparacao} (US$)']
+                detalhe_exp_final['Variação %'] = detalhe_exp_final['Variação %'].replace([float('inf'), float('-inf')], 0).fillna(0).round(2)
+                detalhe_exp_final[f'Valor {ano_principal}'] = detalhe_exp_final[f'Valor {ano_principal} (US$)'].apply(formatar_valor)
+                detalhe_exp_final[f'Valor {ano_comparacao}'] = detalhe_exp_final[f'Valor {ano_comparacao} (US$)'].apply(formatar_valor)
+                detalhe_exp_final = detalhe_exp_final.sort_values(by=['País', f'Valor {ano_principal} (US$)'], ascending=[True, False])
+                relato.dataframe(detalhe_exp_final[['País', 'Produto', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']], hide_index=True, use_container_width=True)
+
+        # --- UI: Tabela Importação ---
+        relato.header("Principais Origens (Importação de MG)")
+        df_imp_princ_f = df_imp_princ_ufs_filtrado[df_imp_princ_ufs_filtrado['SG_UF_NCM'] == 'MG']
+        df_imp_comp_f = df_imp_comp_ufs_filtrado[df_imp_comp_ufs_filtrado['SG_UF_NCM'] == 'MG']
+
+        if codigos_paises_selecionados:
+            df_imp_princ_f = df_imp_princ_f[df_imp_princ_f['CO_PAIS'].isin(codigos_paises_selecionados)]
+            df_imp_comp_f = df_imp_comp_f[df_imp_comp_f['CO_PAIS'].isin(codigos_paises_selecionados)]
+
+        imp_paises_princ = df_imp_princ_f.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False).reset_index()
+        imp_paises_comp = df_imp_comp_f.groupby('CO_PAIS')['VL_FOB'].sum().reset_index()
+        # ... (resto da lógica da tabela da UI) ...
+        imp_paises_princ['País'] = imp_paises_princ['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        imp_paises_princ[f'Valor {ano_principal} (US$)'] = imp_paises_princ['VL_FOB']
+        imp_paises_comp['País'] = imp_paises_comp['CO_PAIS'].map(mapa_nomes_paises).fillna("Desconhecido")
+        imp_paises_comp[f'Valor {ano_comparacao} (US$)'] = imp_paises_comp['VL_FOB']
+        imp_final = pd.merge(imp_paises_princ[['País', f'Valor {ano_principal} (US$)']], imp_paises_comp[['País', f'Valor {ano_comparacao} (US$)']], on="País", how="outer").fillna(0)
+        imp_final['Variação %'] = 100 * (imp_final[f'Valor {ano_principal} (US$)'] - imp_final[f'Valor {ano_comparacao} (US$)']) / imp_final[f'Valor {ano_comparacao} (US$)']
+        imp_final['Variação %'] = imp_final['Variação %'].replace([float('inf'), float('-inf')], 0).fillna(0).round(2)
+        imp_final[f'Valor {ano_principal}'] = imp_final[f'Valor {ano_principal} (US$)'].apply(formatar_valor)
+        imp_final[f'Valor {ano_comparacao}'] = imp_final[f'Valor {ano_comparacao} (US$)'].apply(formatar_valor)
+        df_display_imp = imp_final.sort_values(by=f'Valor {ano_principal} (US$)', ascending=False).reset_index(drop=True)
+        relato.dataframe(
+            df_display_imp[['País', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']].head(top_n_paises),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        # --- UI: Expander Importação ---
+        if agrupado and total_selecionado > 1:
+            with relato.expander("Ver detalhamento de produtos por país (Importação)"):
+                # ... (lógica do expander mantida) ...
+                top_paises_lista_imp = df_display_imp['País'].head(top_n_paises).tolist()
+                df_imp_princ_f['Produto'] = atribuir_produto_selecionado(df_imp_princ_f, produto_info, mapa_sh2_nomes, mapa_sh4_nomes, mapa_sh6_nomes)
+                df_imp_comp_f['Produto'] = atribuir_produto_selecionado(df_imp_comp_f, produto_info, mapa_sh2_nomes, mapa_sh4_nomes, mapa_sh6_nomes)
+                df_imp_princ_f_detalhe = df_imp_princ_f.dropna(subset=['Produto'])
+                df_imp_comp_f_detalhe = df_imp_comp_f.dropna(subset=['Produto'])
+                detalhe_imp_princ = df_imp_princ_f_detalhe.groupby(['CO_PAIS', 'Produto'], observed=True)['VL_FOB'].sum().reset_index()
+                detalhe_imp_comp = df_imp_comp_f_detalhe.groupby(['CO_PAIS', 'Produto'], observed=True)['VL_FOB'].sum().reset_index()
+                detalhe_imp_princ['País'] = detalhe_imp_princ['CO_PAIS'].map(mapa_nomes_paises)
+                detalhe_imp_comp['País'] = detalhe_imp_comp['CO_PAIS'].map(mapa_nomes_paises)
+                detalhe_imp_princ = detalhe_imp_princ.rename(columns={'VL_FOB': f'Valor {ano_principal} (US$)'})
+                detalhe_imp_comp = detalhe_imp_comp.rename(columns={'VL_FOB': f'Valor {ano_comparacao} (US$)'})
+                detalhe_imp_final = pd.merge(detalhe_imp_princ[['País', 'Produto', f'Valor {ano_principal} (US$)']], detalhe_imp_comp[['País', 'Produto', f'Valor {ano_comparacao} (US$)']], on=['País', 'Produto'], how='outer').fillna(0)
+                detalhe_imp_final = detalhe_imp_final[detalhe_imp_final['País'].isin(top_paises_lista_imp)]
+                detalhe_imp_final['Variação %'] = 100 * (detalhe_imp_final[f'Valor {ano_principal} (US$)'] - detalhe_imp_final[f'Valor {ano_comparacao} (US$)']) / detalhe_imp_final[f'Valor {ano_comparacao} (US$)']
+                detalhe_imp_final['Variação %'] = detalhe_imp_final['Variação %'].replace([float('inf'), float('-inf')], 0).fillna(0).round(2)
+                detalhe_imp_final[f'Valor {ano_principal}'] = detalhe_imp_final[f'Valor {ano_principal} (US$)'].apply(formatar_valor)
+                detalhe_imp_final[f'Valor {ano_comparacao}'] = detalhe_imp_final[f'Valor {ano_comparacao} (US$)'].apply(formatar_valor)
+                detalhe_imp_final = detalhe_imp_final.sort_values(by=['País', f'Valor {ano_principal} (US$)'], ascending=[True, False])
+                relato.dataframe(detalhe_imp_final[['País', 'Produto', f'Valor {ano_principal}', f'Valor {ano_comparacao}', 'Variação %']], hide_index=True, use_container_width=True)
+
+
+        # --- NOVO: GERAÇÃO DE TEXTO PARA O DOCX ---
+
+        # --- Inicia Seção 1: Exportações ---
+        app.nova_secao()
+        app.adicionar_titulo("1. Exportações de Minas Gerais")
+
+        # Parágrafo 1: Ranking Nacional
+        ranking_exp_uf = df_exp_princ_ufs_filtrado.groupby('SG_UF_NCM', observed=True)['VL_FOB'].sum().sort_values(ascending=False)
+        valor_total_br_exp = ranking_exp_uf.sum()
+        valor_mg_exp = ranking_exp_uf.get('MG', 0)
+        posicao_mg_exp = 0
+        if valor_mg_exp > 0:
+            try:
+                posicao_mg_exp = ranking_exp_uf.index.get_loc('MG') + 1
+            except KeyError:
+                posicao_mg_exp = 0 # MG não exportou esse produto
+
+        participacao_mg_exp = 0
+        if valor_total_br_exp > 0:
+            participacao_mg_exp = (valor_mg_exp / valor_total_br_exp) * 100
+
+        texto_exp_1 = f"Em {nome_periodo}, Minas Gerais foi o {posicao_mg_exp}º estado brasileiro exportador {produto_nome_doc}, com uma participação de {participacao_mg_exp:.2f}% nas exportações nacionais."
+        app.adicionar_conteudo_formatado(texto_exp_1)
+
+        # Parágrafo 2: Variação MG
+        valor_mg_exp_comp = df_exp_comp_ufs_filtrado[df_exp_comp_ufs_filtrado['SG_UF_NCM'] == 'MG']['VL_FOB'].sum()
+        dif_exp, tipo_dif_exp = calcular_diferenca_percentual(valor_mg_exp, valor_mg_exp_comp)
+        texto_exp_2 = f"O estado exportou um montante de {formatar_valor(valor_mg_exp)}, apresentando {tipo_dif_exp} de {dif_exp:.1f}% em relação a {nome_periodo_comp}."
+        app.adicionar_conteudo_formatado(texto_exp_2)
+
+        # Parágrafo 3 e 4: Ranking Países
+        df_exp_mg_filtrado = df_exp_princ_ufs_filtrado[df_exp_princ_ufs_filtrado['SG_UF_NCM'] == 'MG']
+        ranking_paises_exp = df_exp_mg_filtrado.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False)
+        total_mercados_exp = len(ranking_paises_exp)
+        total_exp_mg = valor_mg_exp # Já calculado
+
+        if total_mercados_exp > 0:
+            top_5_paises_exp = ranking_paises_exp.head(5)
+            lista_paises_texto = []
+            soma_top_5_exp = 0
+            for co_pais, valor in top_5_paises_exp.items():
+                nome_pais = mapa_nomes_paises.get(co_pais, "Desconhecido")
+                part = (valor / total_exp_mg) * 100
+                lista_paises_texto.append(f"{nome_pais} ({part:.2f}%)")
+                soma_top_5_exp += valor
+
+            part_top_5_exp = (soma_top_5_exp / total_exp_mg) * 100
+            texto_exp_3 = f"As exportações {produto_nome_doc} de Minas Gerais atingiram {total_mercados_exp} mercados em {ano_principal}. Dentre esses, os maiores foram: {'; '.join(lista_paises_texto)}."
+            app.adicionar_conteudo_formatado(texto_exp_3)
+            texto_exp_4 = f"Juntos, esses cinco países foram responsáveis por {part_top_5_exp:.2f}% das exportações {produto_nome_doc} do estado."
+            app.adicionar_conteudo_formatado(texto_exp_4)
+
+        # Parágrafo 5: Drill-Down de Produto
+        nivel_detalhe = None
+        mapa_detalhe = None
+        if produto_info['codigos_sh6']: # Se selecionou SH6, não há drill-down
+            pass
+        elif produto_info['codigos_sh4']: # Se selecionou SH4, detalha SH6
+            nivel_detalhe = 'SH6'
+            mapa_detalhe = mapa_sh6_nomes
+        elif produto_info['codigos_sh2']: # Se selecionou SH2, detalha SH4
+            nivel_detalhe = 'SH4'
+            mapa_detalhe = mapa_sh4_nomes
+
+        if nivel_detalhe and total_exp_mg > 0:
+            ranking_detalhe = df_exp_mg_filtrado.groupby(nivel_detalhe)['VL_FOB'].sum().sort_values(ascending=False).head(5)
+            lista_produtos_texto = []
+            for cod, valor in ranking_detalhe.items():
+                nome_prod = mapa_detalhe.get(cod, "Desconhecido")
+                part = (valor / total_exp_mg) * 100
+                lista_produtos_texto.append(f"{nome_prod} ({part:.2f}%)")
+
+            texto_exp_5 = f"Em {ano_principal}, os principais produtos ({nivel_detalhe}) do setor {produto_nome_doc} exportados de Minas Gerais foram: {'; '.join(lista_produtos_texto)}."
+            app.adicionar_conteudo_formatado(texto_exp_5)
+
+        # Parágrafo 6: Ranking Municípios (Impossível com estes dados)
+        # (Omitido)
+
+
+        # --- Inicia Seção 2: Importações ---
+        app.nova_secao()
+        app.adicionar_titulo("2. Importações de Minas Gerais")
+
+        # Parágrafo 1: Ranking Nacional
+        ranking_imp_uf = df_imp_princ_ufs_filtrado.groupby('SG_UF_NCM', observed=True)['VL_FOB'].sum().sort_values(ascending=False)
+        valor_total_br_imp = ranking_imp_uf.sum()
+        valor_mg_imp = ranking_imp_uf.get('MG', 0)
+        posicao_mg_imp = 0
+        if valor_mg_imp > 0:
+            try:
+                posicao_mg_imp = ranking_imp_uf.index.get_loc('MG') + 1
+            except KeyError:
+                posicao_mg_imp = 0
+
+        participacao_mg_imp = 0
+        if valor_total_br_imp > 0:
+            participacao_mg_imp = (valor_mg_imp / valor_total_br_imp) * 100
+
+        texto_imp_1 = f"Em {nome_periodo}, Minas Gerais foi o {posicao_mg_imp}º estado brasileiro importador {produto_nome_doc}, com uma participação de {participacao_mg_imp:.2f}% nas importações nacionais."
+        app.adicionar_conteudo_formatado(texto_imp_1)
+
+        # Parágrafo 2: Variação MG
+        valor_mg_imp_comp = df_imp_comp_ufs_filtrado[df_imp_comp_ufs_filtrado['SG_UF_NCM'] == 'MG']['VL_FOB'].sum()
+        dif_imp, tipo_dif_imp = calcular_diferenca_percentual(valor_mg_imp, valor_mg_imp_comp)
+        texto_imp_2 = f"O estado importou um montante de {formatar_valor(valor_mg_imp)}, apresentando {tipo_dif_imp} de {dif_imp:.1f}% em relação a {nome_periodo_comp}."
+        app.adicionar_conteudo_formatado(texto_imp_2)
+
+        # Parágrafo 3 e 4: Ranking Países
+        df_imp_mg_filtrado = df_imp_princ_ufs_filtrado[df_imp_princ_ufs_filtrado['SG_UF_NCM'] == 'MG']
+        ranking_paises_imp = df_imp_mg_filtrado.groupby('CO_PAIS')['VL_FOB'].sum().sort_values(ascending=False)
+        total_mercados_imp = len(ranking_paises_imp)
+        total_imp_mg = valor_mg_imp
+
+        if total_mercados_imp > 0:
+            top_5_paises_imp = ranking_paises_imp.head(5)
+            lista_paises_texto_imp = []
+            soma_top_5_imp = 0
+            for co_pais, valor in top_5_paises_imp.items():
+                nome_pais = mapa_nomes_paises.get(co_pais, "Desconhecido")
+                part = (valor / total_imp_mg) * 100
+                lista_paises_texto_imp.append(f"{nome_pais} ({part:.2f}%)")
+                soma_top_5_imp += valor
+
+            part_top_5_imp = (soma_top_5_imp / total_imp_mg) * 100
+            texto_imp_3 = f"As importações mineiras {produto_nome_doc} tiveram origem em {total_mercados_imp} mercados em {ano_principal}. Dentre esses, os maiores foram: {'; '.join(lista_paises_texto_imp)}."
+            app.adicionar_conteudo_formatado(texto_imp_3)
+            texto_imp_4 = f"Juntos, esses cinco países foram responsáveis por {part_top_5_imp:.2f}% das importações {produto_nome_doc} do estado."
+            app.adicionar_conteudo_formatado(texto_imp_4)
+
+        # Parágrafo 5: Drill-Down de Produto
+        nivel_detalhe_imp = None
+        mapa_detalhe_imp = None
+        if produto_info['codigos_sh6']: 
+            pass
+        elif produto_info['codigos_sh4']: 
+            nivel_detalhe_imp = 'SH6'
+            mapa_detalhe_imp = mapa_sh6_nomes
+        elif produto_info['codigos_sh2']:
+            nivel_detalhe_imp = 'SH4'
+            mapa_detalhe_imp = mapa_sh4_nomes
+
+        if nivel_detalhe_imp and total_imp_mg > 0:
+            ranking_detalhe_imp = df_imp_mg_filtrado.groupby(nivel_detalhe_imp)['VL_FOB'].sum().sort_values(ascending=False).head(5)
+            lista_produtos_texto_imp = []
+            for cod, valor in ranking_detalhe_imp.items():
+                nome_prod = mapa_detalhe_imp.get(cod, "Desconhecido")
+                part = (valor / total_imp_mg) * 100
+                lista_produtos_texto_imp.append(f"{nome_prod} ({part:.2f}%)")
+
+            texto_imp_5 = f"Em {ano_principal}, os principais produtos ({nivel_detalhe_imp}) do setor {produto_nome_doc} importados por Minas Gerais foram: {'; '.join(lista_produtos_texto_imp)}."
+            app.adicionar_conteudo_formatado(texto_imp_5)
+
+        # Parágrafo 6: Ranking Municípios (Impossível com estes dados)
+        # (Omitido)
+
+        # --- Inicia Seção 3: Evolução (histórico consolidado) ---
+        if anos_historico:
+            tendencia = calcular_tendencia_produto(produto_info, anos_historico)
+            exp_mg_anual, exp_br_anual = tendencia["EXP"]
+            imp_mg_anual, imp_br_anual = tendencia["IMP"]
+            tend_exp = historico.resumir_tendencia(exp_mg_anual, anos_historico)
+            tend_imp = historico.resumir_tendencia(imp_mg_anual, anos_historico)
+
+            app.nova_secao()
+            app.adicionar_titulo(f"3. Evolução {anos_historico[0]}-{anos_historico[-1]}")
+            app.adicionar_conteudo_formatado(texto_evolucao_com_participacao(tend_exp, f"as exportações mineiras {produto_nome_doc}", exp_br_anual))
+            app.adicionar_conteudo_formatado(texto_evolucao_com_participacao(tend_imp, f"as importações mineiras {produto_nome_doc}", imp_br_anual))
+
+            relato.header("Evolução Anual (MG)")
+            relato.dataframe(pd.DataFrame({
+                'Ano': anos_historico,
+                'Exportações': exp_mg_anual.map(formatar_valor).values,
+                'Part. Brasil Exp. %': (100 * exp_mg_anual / exp_br_anual).replace([float('inf'), float('-inf')], 0).fillna(0).round(2).values,
+                'Importações': imp_mg_anual.map(formatar_valor).values,
+                'Part. Brasil Imp. %': (100 * imp_mg_anual / imp_br_anual).replace([float('inf'), float('-inf')], 0).fillna(0).round(2).values,
+            }), hide_index=True, use_container_width=True)
+
+        # --- FIM DA GERAÇÃO DE TEXTO ---
+
+        roteiros.append(app)
+
+    # Os .docx são montados em paralelo (ver tarefas) e chegam na ordem dos produtos
+    for file_bytes, file_name in renderizar_documentos(roteiros, relato):
+        relato.anexar(file_name, file_bytes)
+        relato.success(f"Documento '{file_name}' gerado com sucesso!")
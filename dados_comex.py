@@ -0,0 +1,1423 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import requests
+import os
+import json
+import time
+import hashlib
+import shutil
+import socket
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from pandas.api.types import union_categoricals
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+try:
+    import duckdb
+except ImportError:  # Motor de consulta opcional (ver MOTOR DE CONSULTA)
+    duckdb = None
+
+# --- ACESSO COMPARTILHADO AOS DADOS DA COMEX STAT ---
+# Todas as páginas carregam os arquivos por aqui, para que exista um único
+# cache por (arquivo, ano, projeção de colunas) no processo do Streamlit.
+
+requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+
+URL_BASE = "https://balanca.economia.gov.br/balanca/bd"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# --- CACHE PERSISTENTE EM DISCO ---
+# Sobrevive a reinícios do servidor e à expiração do st.cache_resource.
+# brutos/: CSV original baixado do servidor, com ETag/Last-Modified ao lado.
+#          Downloads vão para um arquivo .part e são retomados com Range após falhas;
+#          atualizações usam If-None-Match/If-Modified-Since (304 = nada a baixar).
+# raiz:    Parquet por (arquivo, projeção, filtros[, agregação]), derivado do CSV bruto,
+#          e ao lado um espelho .arrow do mesmo quadro (ver ARMAZÉM COMPARTILHADO).
+#          Nos arquivos anuais, o Parquet é uma pasta .meses com um arquivo por mês
+#          (ver PARTIÇÕES POR MÊS).
+DIRETORIO_CACHE = os.environ.get("BRIEFINGS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "briefings_cache"))
+DIRETORIO_BRUTOS = os.path.join(DIRETORIO_CACHE, "brutos")
+# Quando o servidor não envia ETag nem Last-Modified, o arquivo local vale por este tempo
+IDADE_MAXIMA_SEM_VALIDADOR = 24 * 3600
+# Entra na chave do Parquet: incrementar quando o conteúdo gravado mudar (ex.: novas colunas derivadas)
+VERSAO_CACHE = 4
+
+# --- INGESTÃO INCREMENTAL ---
+# O arquivo do ano corrente cresce um mês por vez no servidor. Quando ele muda, só o
+# fim é baixado (Range a partir do tamanho local, menos um trecho de SOBREPOSICAO_ANEXO
+# bytes que precisa coincidir com a cópia local) e a cópia local recebe o que faltava.
+# O metadado do CSV bruto guarda a linhagem: as versões anteriores que são prefixo da
+# atual. Os caches derivados dos arquivos anuais são particionados por mês (ver
+# PARTIÇÕES POR MÊS) e só interpretam e agregam os bytes novos.
+# A cada REVALIDACAO_COMPLETA o arquivo é baixado inteiro, para captar revisões dos
+# meses já fechados que não mudem o tamanho do trecho conferido.
+SOBREPOSICAO_ANEXO = 64 * 1024
+REVALIDACAO_COMPLETA = 30 * 24 * 3600
+MAX_LINHAGEM = 24
+
+# --- LEITURA EM FLUXO ---
+# O corpo HTTP é gravado em blocos no disco. O leitor pandas interpreta o CSV em
+# pedaços de linhas e filtra cada pedaço; o Arrow lê só as colunas projetadas,
+# já tipadas, e filtra a tabela antes de convertê-la.
+TAMANHO_BLOCO_HTTP = 1024 * 1024
+LINHAS_POR_PEDACO = 500_000
+BYTES_INSPECAO = 4096
+
+# --- LEITOR DE CSV ---
+# arrow:  (padrão) leitor multithread do pyarrow, que decodifica o latin-1 e converte
+#         cada coluna direto no tipo do ESQUEMA; os filtros rodam sobre a tabela Arrow
+#         e a conversão para pandas acontece uma vez, sem cópia nas colunas numéricas.
+# pandas: pd.read_csv em pedaços de LINHAS_POR_PEDACO, numa única thread.
+LEITOR_CSV = os.environ.get("BRIEFINGS_LEITOR_CSV", "arrow")
+BLOCO_LEITURA_ARROW = 16 * 1024 * 1024
+
+# --- CARGA CONCORRENTE ---
+# Uma geração declara de antemão todos os arquivos de que precisa e eles são
+# baixados e interpretados em paralelo; no máximo MAX_CONEXOES_POR_HOST
+# transferências simultâneas vão para o mesmo servidor.
+MAX_CONEXOES_POR_HOST = int(os.environ.get("BRIEFINGS_CONEXOES_POR_HOST", "4"))
+_semaforos_host = {}
+_travas_arquivo = {}
+_trava_semaforos = threading.Lock()
+
+# --- COORDENAÇÃO ENTRE PROCESSOS ---
+# Vários processos do Streamlit no mesmo host (ou duas gerações simultâneas) não
+# baixam nem processam o mesmo arquivo em dobro. Cada item do cache em disco (CSV
+# bruto, Parquet/espelho) tem um arquivo .lock com trava do sistema operacional e,
+# enquanto é preparado, um marcador .em_andamento com o processo responsável. Só
+# quem obtém a trava baixa e grava; os demais esperam e encontram o cache pronto.
+# A trava é liberada pelo sistema mesmo se o processo morrer; um marcador sem dono
+# indica uma preparação interrompida, retomada pelo próximo a chegar.
+ESPERA_MAXIMA_TRAVA = 30 * 60
+INTERVALO_ESPERA_TRAVA = 0.5
+
+# --- SESSÃO HTTP COMPARTILHADA ---
+# Uma única sessão por processo: conexões keep-alive são reaproveitadas entre
+# arquivos e páginas. Falhas de conexão e respostas 429/5xx são repetidas pelo
+# urllib3 com backoff exponencial e jitter; quedas no meio do corpo são
+# tratadas em _baixar_ou_revalidar, retomando o .part.
+TENTATIVAS_HTTP = 4
+BACKOFF_HTTP = 1.0
+JITTER_HTTP = 1.0
+TENTATIVAS_RETOMADA = 3
+
+# --- ESQUEMA DOS ARQUIVOS ---
+# Tipos compactos das colunas da Comex Stat, valendo para os arquivos anuais e
+# para as tabelas auxiliares: códigos viram inteiros estreitos e siglas de UF
+# viram categorias. Códigos perdem os zeros à esquerda (SH4 "0101" -> 101);
+# a formatação para exibição fica com as páginas.
+ESQUEMA = {
+    'CO_ANO': 'int16',
+    'CO_MES': 'int8',
+    'CO_PAIS': 'int16',
+    'CO_NCM': 'int32',
+    'CO_MUN': 'int32',
+    'CO_MUN_GEO': 'int32',
+    'SH2': 'int8',
+    'SH4': 'int16',
+    'SH6': 'int32',
+    'CO_SH2': 'int8',
+    'CO_SH4': 'int16',
+    'CO_SH6': 'int32',
+    'SG_UF_NCM': 'category',
+    'SG_UF_MUN': 'category',
+    'SG_UF': 'category',
+    'VL_FOB': 'int64',
+    'KG_LIQUIDO': 'int64',
+}
+
+
+def tipos_do_esquema(colunas):
+    """Tipos do ESQUEMA para as colunas pedidas; as demais ficam com o tipo inferido."""
+    return {col: ESQUEMA[col] for col in colunas if col in ESQUEMA}
+
+
+# --- PROJEÇÕES CANÔNICAS ---
+# Colunas fixas por tipo de arquivo. Páginas diferentes que pedem o mesmo
+# arquivo caem na mesma chave de cache.
+COLUNAS_NCM = ['CO_MES', 'CO_NCM', 'CO_PAIS', 'SG_UF_NCM', 'VL_FOB']
+DTYPES_NCM = tipos_do_esquema(COLUNAS_NCM)
+COLUNAS_MUN = ['CO_MES', 'SH4', 'CO_PAIS', 'SG_UF_MUN', 'CO_MUN', 'VL_FOB']
+DTYPES_MUN = tipos_do_esquema(COLUNAS_MUN)
+
+TABELAS = {
+    "PAIS.csv": ['CO_PAIS', 'NO_PAIS'],
+    "NCM_SH.csv": ['CO_SH2', 'NO_SH2_POR', 'CO_SH4', 'NO_SH4_POR', 'CO_SH6', 'NO_SH6_POR'],
+    "UF_MUN.csv": ['CO_MUN_GEO', 'NO_MUN', 'NO_MUN_MIN', 'SG_UF'],
+}
+
+def url_comex(fluxo, ano, nivel="ncm"):
+    """Monta a URL do arquivo anual de EXP/IMP (nível NCM ou município)."""
+    if nivel == "mun":
+        return f"{URL_BASE}/comexstat-bd/mun/{fluxo}_{ano}_MUN.csv"
+    return f"{URL_BASE}/comexstat-bd/ncm/{fluxo}_{ano}.csv"
+
+
+def url_tabela(nome_arquivo):
+    """Monta a URL de uma tabela auxiliar (PAIS.csv, NCM_SH.csv, UF_MUN.csv)."""
+    return f"{URL_BASE}/tabelas/{nome_arquivo}"
+
+
+def _normalizar_projecao(usecols, dtypes, filtros=None):
+    """Converte colunas/dtypes/filtros em tuplas ordenadas, usadas como chave do cache."""
+    colunas = None
+    if usecols:
+        # As colunas filtradas precisam ser lidas, mesmo que o chamador não as peça
+        colunas = tuple(sorted(set(usecols) | set(filtros or {})))
+    tipos = None
+    if dtypes:
+        tipos = tuple(sorted(
+            (col, tipo.__name__ if isinstance(tipo, type) else str(tipo))
+            for col, tipo in dtypes.items()
+        ))
+    filtros_norm = None
+    if filtros:
+        filtros_norm = tuple(sorted((col, tuple(sorted(set(valores)))) for col, valores in filtros.items()))
+    return colunas, tipos, filtros_norm
+
+
+def _caminhos_cache(url, colunas, tipos, filtros=None, agregacao=None):
+    """Retorna os caminhos (parquet, metadados) do arquivo no cache em disco."""
+    nome = os.path.splitext(os.path.basename(urlparse(url).path))[0]
+    chave_projecao = (VERSAO_CACHE, url, colunas, tipos, filtros)
+    if agregacao:
+        chave_projecao += (agregacao,)
+        nome = f"{nome}-{agregacao}"
+    chave = hashlib.sha1(repr(chave_projecao).encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(DIRETORIO_CACHE, f"{nome}-{chave}")
+    return base + ".parquet", base + ".json"
+
+
+def _ler_metadados(caminho_meta):
+    try:
+        with open(caminho_meta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json(caminho, dados):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+
+def _gravar_atomico(caminho, escrever):
+    """Grava em arquivo temporário e renomeia, para nunca deixar um cache pela metade."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        escrever(caminho_tmp)
+        os.replace(caminho_tmp, caminho)
+    finally:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+
+
+def _validadores(resposta):
+    return {"etag": resposta.headers.get("ETag"), "last_modified": resposta.headers.get("Last-Modified")}
+
+
+def _mesma_versao(meta_a, meta_b):
+    """Compara dois metadados pelo ETag/Last-Modified do servidor."""
+    return (meta_a.get("etag"), meta_a.get("last_modified")) == (meta_b.get("etag"), meta_b.get("last_modified"))
+
+
+def _parece_html(prefixo):
+    """Detecta páginas de erro HTML pelos primeiros bytes da resposta."""
+    inicio = prefixo.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    return inicio.startswith(b"<!doctype") or inicio.startswith(b"<html") or inicio.startswith(b"<?xml")
+
+
+def _remover(*caminhos):
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _gravar_corpo(resposta, caminho_parcial, modo, verificar_html):
+    """Grava o corpo da resposta em blocos no arquivo parcial."""
+    blocos = resposta.iter_content(chunk_size=TAMANHO_BLOCO_HTTP)
+    with open(caminho_parcial, modo) as f:
+        if verificar_html:
+            prefixo = b""
+            for bloco in blocos:
+                prefixo += bloco
+                if len(prefixo) >= BYTES_INSPECAO:
+                    break
+            if _parece_html(prefixo):
+                raise ValueError(f"O servidor retornou uma página HTML em vez do CSV: {resposta.url}")
+            f.write(prefixo)
+        for bloco in blocos:
+            f.write(bloco)
+
+
+@st.cache_resource(show_spinner=False)
+def _sessao_http():
+    """Sessão requests compartilhada pelo processo, com pool de conexões e retry."""
+    retry = Retry(
+        total=TENTATIVAS_HTTP,
+        backoff_factor=BACKOFF_HTTP,
+        backoff_jitter=JITTER_HTTP,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(max_retries=retry, pool_connections=4,
+                            pool_maxsize=MAX_CONEXOES_POR_HOST, pool_block=True)
+    sessao = requests.Session()
+    sessao.headers.update(HEADERS)
+    sessao.verify = False
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+def _semaforo_host(url):
+    """Semáforo compartilhado que limita as conexões simultâneas a um host."""
+    host = urlparse(url).netloc
+    with _trava_semaforos:
+        if host not in _semaforos_host:
+            _semaforos_host[host] = threading.BoundedSemaphore(MAX_CONEXOES_POR_HOST)
+        return _semaforos_host[host]
+
+
+def _trava_arquivo(chave):
+    """Trava entre as threads do processo para um item do cache (ex.: cubo e resumo do mesmo CSV)."""
+    with _trava_semaforos:
+        return _travas_arquivo.setdefault(chave, threading.Lock())
+
+
+def _tentar_travar(arquivo):
+    """Trava exclusiva do sistema operacional, sem bloquear; False se outro processo a detém."""
+    try:
+        arquivo.seek(0)
+        if os.name == "nt":
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _destravar(arquivo):
+    arquivo.seek(0)
+    if os.name == "nt":
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _voo_unico(caminho_base, descricao):
+    """
+    Executa o bloco com exclusividade sobre o item `caminho_base` do cache, entre as
+    threads do processo e entre processos do host; quem chega depois espera a vez.
+    """
+    caminho_marcador = caminho_base + ".em_andamento"
+    with _trava_arquivo(caminho_base):
+        os.makedirs(os.path.dirname(caminho_base), exist_ok=True)
+        with open(caminho_base + ".lock", "a+") as arquivo_trava:
+            if not _tentar_travar(arquivo_trava):
+                dono = _ler_metadados(caminho_marcador) or {}
+                print(f"{descricao} está sendo preparado por outro processo "
+                      f"(pid {dono.get('pid', '?')} em {dono.get('host', '?')}), aguardando...")
+                limite = time.monotonic() + ESPERA_MAXIMA_TRAVA
+                while not _tentar_travar(arquivo_trava):
+                    if time.monotonic() > limite:
+                        raise TimeoutError(f"Tempo esgotado aguardando a preparação de {descricao}")
+                    time.sleep(INTERVALO_ESPERA_TRAVA)
+            try:
+                if os.path.exists(caminho_marcador):
+                    print(f"A preparação anterior de {descricao} foi interrompida; retomando.")
+                marcador = {"pid": os.getpid(), "host": socket.gethostname(),
+                            "inicio": datetime.now().isoformat(timespec='seconds')}
+                _gravar_atomico(caminho_marcador, lambda destino: _gravar_json(destino, marcador))
+                yield
+            finally:
+                _remover(caminho_marcador)
+                _destravar(arquivo_trava)
+
+
+def _sincronizar_arquivo(url):
+    """Sincroniza o CSV, um download por arquivo no host e respeitando o limite de conexões."""
+    nome = os.path.basename(urlparse(url).path)
+    with _voo_unico(os.path.join(DIRETORIO_BRUTOS, nome), nome), _semaforo_host(url):
+        return _baixar_ou_revalidar(url)
+
+
+def descartar_bruto(url):
+    """
+    Apaga a cópia local do CSV (e um download pela metade) para liberar disco. Os Parquet
+    derivados continuam valendo; se o arquivo for pedido de novo, é baixado inteiro.
+    """
+    nome = os.path.basename(urlparse(url).path)
+    caminho = os.path.join(DIRETORIO_BRUTOS, nome)
+    with _voo_unico(caminho, nome):
+        _remover(caminho, caminho + ".json", caminho + ".part", caminho + ".part.json")
+
+
+def _pode_anexar(meta, caminho):
+    """Se a cópia local pode ser completada só com o fim do arquivo (ver INGESTÃO INCREMENTAL)."""
+    tamanho = meta.get("tamanho")
+    if not tamanho or tamanho <= SOBREPOSICAO_ANEXO or os.path.getsize(caminho) != tamanho:
+        return False
+    return time.time() - meta.get("completo_em", 0) < REVALIDACAO_COMPLETA
+
+
+def _inicio_content_range(resposta):
+    try:
+        return int(resposta.headers.get("Content-Range", "").split(" ")[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _anexar_corpo(resposta, caminho, caminho_parcial, caminho_meta_parcial, meta, validadores, inicio):
+    """
+    Resposta ao pedido do fim do arquivo: confere que ela começa pelos mesmos bytes da
+    cópia local e grava no .part a cópia local seguida do trecho novo. Retorna False,
+    sem gravar nada, se o arquivo no servidor foi reescrito em vez de crescer.
+    """
+    if _inicio_content_range(resposta) != inicio:
+        return False
+    esperado = meta["tamanho"] - inicio
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        local = f.read(esperado)
+    blocos = resposta.iter_content(chunk_size=TAMANHO_BLOCO_HTTP)
+    recebido = b""
+    for bloco in blocos:
+        recebido += bloco
+        if len(recebido) >= esperado:
+            break
+    if recebido[:esperado] != local:
+        return False
+
+    shutil.copyfile(caminho, caminho_parcial)
+    anterior = {"etag": meta.get("etag"), "last_modified": meta.get("last_modified"), "tamanho": meta["tamanho"]}
+    # O .part já é um prefixo da versão nova: se a transferência cair, é retomado como qualquer outro
+    _gravar_json(caminho_meta_parcial, {**validadores, "completo_em": meta.get("completo_em"),
+                                        "linhagem": (meta.get("linhagem", []) + [anterior])[-MAX_LINHAGEM:]})
+    with open(caminho_parcial, 'ab') as f:
+        f.write(recebido[esperado:])
+        for bloco in blocos:
+            f.write(bloco)
+    return True
+
+
+def _baixar_ou_revalidar(url):
+    """
+    Garante uma cópia local completa e atualizada do CSV e retorna (caminho, metadados).
+    - Cópia local existente: GET condicional; 304 mantém o arquivo sem transferência.
+      Se o arquivo mudou e só cresceu, baixa apenas o fim (ver INGESTÃO INCREMENTAL).
+    - Download interrompido: o .part é retomado com Range/If-Range na próxima tentativa.
+    """
+    caminho = os.path.join(DIRETORIO_BRUTOS, os.path.basename(urlparse(url).path))
+    caminho_parcial = caminho + ".part"
+    caminho_meta = caminho + ".json"
+    caminho_meta_parcial = caminho_parcial + ".json"
+    os.makedirs(DIRETORIO_BRUTOS, exist_ok=True)
+
+    meta = _ler_metadados(caminho_meta) if os.path.exists(caminho) else None
+    if meta and not (meta.get("etag") or meta.get("last_modified")):
+        if time.time() - meta.get("baixado_em", 0) < IDADE_MAXIMA_SEM_VALIDADOR:
+            return caminho, meta
+        meta = None
+
+    sessao = _sessao_http()
+    anexar = meta is not None and _pode_anexar(meta, caminho)
+    for tentativa in range(TENTATIVAS_RETOMADA):
+        recebendo_corpo = False
+        try:
+            headers = {}
+            meta_parcial = _ler_metadados(caminho_meta_parcial) if os.path.exists(caminho_parcial) else None
+            inicio = os.path.getsize(caminho_parcial) if meta_parcial else 0
+            inicio_anexo = None
+            if inicio:
+                # Retoma de onde parou, desde que o arquivo no servidor seja o mesmo
+                headers["Range"] = f"bytes={inicio}-"
+                validador = meta_parcial.get("etag") or meta_parcial.get("last_modified")
+                if validador:
+                    headers["If-Range"] = validador
+            elif meta:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+                if anexar:
+                    # Sem mudança, o servidor responde 304 como antes; com mudança, manda só o fim
+                    inicio_anexo = meta["tamanho"] - SOBREPOSICAO_ANEXO
+                    headers["Range"] = f"bytes={inicio_anexo}-"
+
+            with sessao.get(url, headers=headers, timeout=(10, 1200), stream=True) as resposta:
+                if resposta.status_code == 304:
+                    meta["revalidado_em"] = time.time()
+                    _gravar_atomico(caminho_meta, lambda destino: _gravar_json(destino, meta))
+                    return caminho, meta
+                if resposta.status_code == 416 and (inicio or inicio_anexo is not None):
+                    # O parcial não corresponde mais ao arquivo do servidor (ou o arquivo
+                    # encolheu): recomeça do zero
+                    _remover(caminho_parcial, caminho_meta_parcial)
+                    anexar = False
+                    continue
+                resposta.raise_for_status()
+
+                validadores = _validadores(resposta)
+                recebendo_corpo = True
+                if resposta.status_code == 206 and inicio_anexo is not None:
+                    if not _anexar_corpo(resposta, caminho, caminho_parcial, caminho_meta_parcial,
+                                         meta, validadores, inicio_anexo):
+                        print(f"{url} foi reescrito no servidor, baixando o arquivo inteiro.")
+                        anexar = False
+                        continue
+                    meta_parcial = _ler_metadados(caminho_meta_parcial)
+                    print(f"{url} cresceu; baixado só o trecho novo ({os.path.getsize(caminho_parcial) - meta['tamanho']} bytes).")
+                elif resposta.status_code == 206:
+                    print(f"Retomando download de {url} a partir do byte {inicio}.")
+                    _gravar_corpo(resposta, caminho_parcial, 'ab', verificar_html=False)
+                else:
+                    meta_parcial = None
+                    _gravar_json(caminho_meta_parcial, validadores)
+                    _gravar_corpo(resposta, caminho_parcial, 'wb', verificar_html=True)
+
+            os.replace(caminho_parcial, caminho)
+            agora = time.time()
+            meta = {"url": url, "baixado_em": agora, **(meta_parcial or validadores),
+                    "tamanho": os.path.getsize(caminho)}
+            # Trecho anexado: a última cópia completa continua sendo a de antes
+            meta["completo_em"] = meta.get("completo_em") or agora
+            _gravar_atomico(caminho_meta, lambda destino: _gravar_json(destino, meta))
+            _remover(caminho_meta_parcial)
+            return caminho, meta
+        except (requests.exceptions.RequestException, ConnectionResetError) as e:
+            # Falhas antes do corpo já foram repetidas pela sessão; aqui só se insiste
+            # quando a transferência caiu no meio, retomando o .part na próxima volta
+            if recebendo_corpo and tentativa < TENTATIVAS_RETOMADA - 1:
+                print(f"Download de {url} interrompido (tentativa {tentativa + 1}/{TENTATIVAS_RETOMADA}): {e}")
+                continue
+            if meta:
+                # Servidor inacessível: melhor servir a cópia local do que falhar
+                print(f"Não foi possível revalidar {url}, usando cópia local.")
+                return caminho, meta
+            raise
+    raise requests.exceptions.RetryError(f"Não foi possível baixar {url} após {TENTATIVAS_RETOMADA} tentativas.")
+
+
+def _aplicar_filtros(pedaco, filtros):
+    """Mantém só as linhas cujas colunas estão nos valores permitidos."""
+    if not filtros:
+        return pedaco
+    mascara = None
+    for col, valores in filtros:
+        condicao = pedaco[col].isin(valores)
+        mascara = condicao if mascara is None else (mascara & condicao)
+    return pedaco[mascara]
+
+
+def _derivar_hierarquia_sh(df):
+    """
+    Acrescenta a hierarquia de produtos como inteiros, numa passada vetorizada:
+    SH2/SH4/SH6 a partir do CO_NCM (arquivos NCM) ou SH2 a partir do SH4 (arquivos MUN).
+    """
+    if 'CO_NCM' in df.columns:
+        ncm = df['CO_NCM'].to_numpy()
+        df['SH6'] = (ncm // 100).astype(ESQUEMA['SH6'])
+        df['SH4'] = (ncm // 10000).astype(ESQUEMA['SH4'])
+        df['SH2'] = (ncm // 1000000).astype(ESQUEMA['SH2'])
+    elif 'SH4' in df.columns:
+        df['SH2'] = (df['SH4'].to_numpy() // 100).astype(ESQUEMA['SH2'])
+    return df
+
+
+def _ler_csv_pandas(caminho_csv, colunas, tipos, filtros):
+    """Lê o CSV local (latin-1, ';') em pedaços, filtrando cada pedaço antes de acumular."""
+    tipos = dict(tipos) if tipos else {}
+    # Categorias só são aplicadas depois de juntar os pedaços: cada pedaço
+    # teria seu próprio conjunto de categorias e o concat voltaria a object
+    categoricas = {col: tipo for col, tipo in tipos.items() if tipo == 'category'}
+    tipos_leitura = {col: ('str' if tipo == 'category' else tipo) for col, tipo in tipos.items()}
+    leitor = pd.read_csv(caminho_csv,
+                         sep=';',
+                         encoding='latin-1',
+                         dtype=tipos_leitura or None,
+                         usecols=list(colunas) if colunas else None,
+                         chunksize=LINHAS_POR_PEDACO)
+    partes = []
+    with leitor:
+        for pedaco in leitor:
+            partes.append(_aplicar_filtros(pedaco, filtros))
+    if not partes:
+        vazio = pd.DataFrame(columns=list(colunas) if colunas else None)
+        return vazio.astype({col: tipo for col, tipo in tipos.items() if col in vazio.columns})
+    if len(partes) == 1:
+        df = partes[0].reset_index(drop=True)
+    else:
+        df = pd.concat(partes, ignore_index=True)
+    if categoricas:
+        df = df.astype(categoricas)
+    return df
+
+
+def _tipo_arrow(tipo):
+    """Tipo Arrow equivalente a um tipo do ESQUEMA (categorias viram colunas de dicionário)."""
+    if tipo == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(tipo))
+
+
+def ler_tabela_arrow(caminho_csv, colunas=None, tipos=None, filtros=None):
+    """Lê o CSV local (latin-1, ';') com o leitor multithread do pyarrow e aplica os filtros na tabela Arrow."""
+    opcoes_conversao = {"column_types": {col: _tipo_arrow(tipo) for col, tipo in (dict(tipos) if tipos else {}).items()}}
+    if colunas:
+        opcoes_conversao["include_columns"] = list(colunas)
+    tabela = pacsv.read_csv(caminho_csv,
+                            read_options=pacsv.ReadOptions(encoding='latin1', use_threads=True,
+                                                           block_size=BLOCO_LEITURA_ARROW),
+                            parse_options=pacsv.ParseOptions(delimiter=';'),
+                            convert_options=pacsv.ConvertOptions(**opcoes_conversao))
+    if filtros:
+        mascara = None
+        for col, valores in filtros:
+            condicao = pc.is_in(tabela[col], value_set=pa.array(list(valores)))
+            mascara = condicao if mascara is None else pc.and_(mascara, condicao)
+        tabela = tabela.filter(mascara)
+    return tabela
+
+
+def _ler_csv_arrow(caminho_csv, colunas, tipos, filtros):
+    """Como _ler_csv_pandas, pelo leitor Arrow; a tabela é convertida uma vez e liberada em seguida."""
+    df = ler_tabela_arrow(caminho_csv, colunas, tipos, filtros).to_pandas(split_blocks=True, self_destruct=True)
+    # Mesmas categorias do leitor pandas: o dicionário Arrow segue a ordem de aparição
+    # e guarda também os valores descartados pelos filtros
+    for col in df.select_dtypes('category').columns:
+        categorias = df[col].cat.remove_unused_categories()
+        df[col] = categorias.cat.reorder_categories(sorted(categorias.cat.categories))
+    return df
+
+
+def _interpretar_csv(caminho_csv, colunas, tipos, filtros):
+    """Lê o CSV local com o LEITOR_CSV configurado e acrescenta a hierarquia SH."""
+    if LEITOR_CSV == "pandas":
+        df = _ler_csv_pandas(caminho_csv, colunas, tipos, filtros)
+    else:
+        df = _ler_csv_arrow(caminho_csv, colunas, tipos, filtros)
+    # As colunas derivadas vão para o Parquet junto com o resto, calculadas uma vez por arquivo
+    return _derivar_hierarquia_sh(df)
+
+
+# --- CUBO AGREGADO ---
+# Soma de VL_FOB por (UF, país, mês, SH6) de um arquivo NCM anual. Rankings por
+# país e por UF e listas de produtos só usam essas chaves, então os briefings
+# consultam o cubo, bem menor que as linhas por NCM. Ele é materializado uma
+# vez no cache em disco, ao lado do Parquet bruto, e refeito junto com o CSV.
+CHAVES_CUBO = ['SG_UF_NCM', 'CO_PAIS', 'CO_MES', 'SH6']
+
+
+def _agregar_cubo(df):
+    """Agrega um DataFrame NCM (com SH6) nas CHAVES_CUBO, mantendo SH4/SH2 para os filtros."""
+    cubo = df.groupby(CHAVES_CUBO, observed=True)['VL_FOB'].sum().reset_index()
+    sh6 = cubo['SH6'].to_numpy()
+    cubo['SH4'] = (sh6 // 100).astype(ESQUEMA['SH4'])
+    cubo['SH2'] = (sh6 // 10000).astype(ESQUEMA['SH2'])
+    return cubo
+
+
+# --- CUBO MUNICIPAL ---
+# O equivalente para os arquivos MUN: soma por (UF, município, país, mês, SH4),
+# normalmente lido já filtrado para MG. À parte, um resumo por (UF, município,
+# mês) de todas as UFs, sem país nem produto, atende aos rankings.
+CHAVES_CUBO_MUN = ['SG_UF_MUN', 'CO_MUN', 'CO_PAIS', 'CO_MES', 'SH4']
+CHAVES_RESUMO_MUN = ['SG_UF_MUN', 'CO_MUN', 'CO_MES']
+
+
+def _agregar_cubo_mun(df):
+    """Agrega um DataFrame MUN nas CHAVES_CUBO_MUN, mantendo SH2 para os filtros."""
+    cubo = df.groupby(CHAVES_CUBO_MUN, observed=True)['VL_FOB'].sum().reset_index()
+    cubo['SH2'] = (cubo['SH4'].to_numpy() // 100).astype(ESQUEMA['SH2'])
+    return cubo
+
+
+def _agregar_resumo_mun(df):
+    """Agrega um DataFrame MUN nas CHAVES_RESUMO_MUN."""
+    return df.groupby(CHAVES_RESUMO_MUN, observed=True)['VL_FOB'].sum().reset_index()
+
+
+# Agregações que podem ser materializadas no cache em disco, por nome
+AGREGACOES = {
+    "cubo": _agregar_cubo,
+    "cubo_mun": _agregar_cubo_mun,
+    "resumo_mun": _agregar_resumo_mun,
+    # O mesmo cubo NCM, gravado em ordem de SH6 para a página de produtos (ver fatiar_por_produto)
+    "cubo_produto": _agregar_cubo,
+}
+
+
+# --- LAYOUT ORDENADO POR CHAVE ---
+# Os DataFrames em cache são gravados ordenados pela chave de consulta dominante
+# (CO_MUN nos arquivos MUN, CO_PAIS nos NCM). Ao ser servido, cada quadro ganha um
+# índice de deslocamentos (arrays numpy), e a fatia de um país ou município passa a
+# ser uma busca binária no índice e um iloc contíguo, sem varrer nem copiar o quadro.
+# Os códigos SH2/SH4 são prefixos do SH6, então num quadro ordenado por SH6 cada
+# seleção de produto também é uma faixa contígua de linhas.
+# O índice fica num mapa à parte, e não em df.attrs: o pandas copia (deepcopy) os
+# attrs para cada quadro derivado, o que com milhares de chaves pesava em toda
+# operação. Ele vale só para o objeto servido pelo cache, conferido por identidade:
+# um quadro derivado (filtrado, reordenado) nunca o herda, tenha as linhas que tiver.
+CHAVES_ORDENACAO = ['CO_MUN', 'CO_PAIS']
+# Agregações gravadas em outra ordem que a de CHAVES_ORDENACAO
+ORDENACAO_POR_AGREGACAO = {"cubo_produto": "SH6"}
+# {id do quadro: (referência fraca ao quadro, índice)}; a entrada sai junto com o quadro
+_INDICES = {}
+
+
+def _coluna_de_ordenacao(df, coluna=None):
+    return coluna or next((col for col in CHAVES_ORDENACAO if col in df.columns), None)
+
+
+def _ordenar_por_chave(df, coluna=None):
+    """Ordena por `coluna` (padrão: a primeira de CHAVES_ORDENACAO presente)."""
+    coluna = _coluna_de_ordenacao(df, coluna)
+    if coluna is None:
+        return df
+    return df.sort_values(coluna, kind='stable', ignore_index=True)
+
+
+def _indexar(df, coluna=None):
+    """Registra o índice de deslocamentos de um quadro servido pelo cache, se ele estiver ordenado pela coluna."""
+    # Caches gravados por versões anteriores traziam o índice nos attrs
+    df.attrs.pop("indice", None)
+    coluna = _coluna_de_ordenacao(df, coluna)
+    if coluna is None or coluna not in df.columns:
+        return df
+    valores = df[coluna].to_numpy()
+    if len(valores) and not (valores[1:] >= valores[:-1]).all():
+        return df
+    inicios = np.flatnonzero(np.r_[True, valores[1:] != valores[:-1]]) if len(valores) else np.array([], dtype=np.int64)
+    indice = {"coluna": coluna, "chaves": valores[inicios], "inicios": np.append(inicios, len(valores))}
+    _INDICES[id(df)] = (weakref.ref(df), indice)
+    weakref.finalize(df, _INDICES.pop, id(df), None)
+    return df
+
+
+def _indice_do_quadro(df):
+    """Índice de deslocamentos registrado para este mesmo objeto (None em qualquer outro quadro)."""
+    entrada = _INDICES.get(id(df))
+    if entrada is None or entrada[0]() is not df:
+        return None
+    return entrada[1]
+
+
+def _indice_da_coluna(df, coluna):
+    indice = _indice_do_quadro(df)
+    return indice if indice is not None and indice["coluna"] == coluna else None
+
+
+def _fatiar_faixas(df, indice, faixas):
+    """Linhas cuja chave cai em alguma faixa [início, fim) de valores, por busca binária no índice."""
+    chaves = indice["chaves"]
+    inicios = indice["inicios"]
+    linhas = []
+    for inicio, fim in sorted(faixas):
+        a = int(inicios[np.searchsorted(chaves, inicio)])
+        b = int(inicios[np.searchsorted(chaves, fim)])
+        if a == b:
+            continue
+        # Faixas sobrepostas (ex.: um SH4 dentro de um SH2 já pedido) são unidas
+        if linhas and a <= linhas[-1][1]:
+            linhas[-1] = (linhas[-1][0], max(linhas[-1][1], b))
+        else:
+            linhas.append((a, b))
+    if not linhas:
+        return df.iloc[0:0]
+    if len(linhas) == 1:
+        return df.iloc[linhas[0][0]:linhas[0][1]]
+    return df.iloc[np.concatenate([np.arange(a, b) for a, b in linhas])]
+
+
+def fatiar_por_chave(df, coluna, valores):
+    """
+    Linhas de `df` cuja `coluna` está em `valores` (um código ou uma lista).
+    Em quadros vindos do cache e ordenados por `coluna`, cada código custa uma busca
+    binária e a fatia de um único código é uma visão, sem cópia; nos demais, usa isin.
+    """
+    lista = list(valores) if isinstance(valores, (list, tuple, set)) else [valores]
+    lista = [v for v in lista if not pd.isna(v)]
+    indice = _indice_da_coluna(df, coluna)
+    if indice is None:
+        return df[df[coluna].isin(lista)]
+    return _fatiar_faixas(df, indice, [(int(v), int(v) + 1) for v in lista])
+
+
+def fatiar_por_produto(df, codigos_sh2=(), codigos_sh4=(), codigos_sh6=()):
+    """
+    Linhas de `df` cujo produto está em algum dos códigos SH2, SH4 ou SH6 pedidos.
+    No cubo por produto (ordenado por SH6), cada código é uma faixa contígua de SH6
+    achada por busca binária; nos demais quadros, usa as máscaras isin.
+    """
+    indice = _indice_da_coluna(df, 'SH6')
+    if indice is None:
+        return df[df['SH2'].isin(codigos_sh2) | df['SH4'].isin(codigos_sh4) | df['SH6'].isin(codigos_sh6)]
+    # Um SH2 cobre 10.000 valores de SH6 e um SH4, 100
+    faixas = ([(int(c) * 10000, (int(c) + 1) * 10000) for c in codigos_sh2]
+              + [(int(c) * 100, (int(c) + 1) * 100) for c in codigos_sh4]
+              + [(int(c), int(c) + 1) for c in codigos_sh6])
+    return _fatiar_faixas(df, indice, faixas)
+
+
+def _materializar(df, agregacao):
+    """Aplica a agregação (se houver) e grava o quadro na ordem da chave de consulta."""
+    if agregacao:
+        df = AGREGACOES[agregacao](df)
+    return _ordenar_por_chave(df, ORDENACAO_POR_AGREGACAO.get(agregacao))
+
+
+def _garantir_parquet(url, colunas, tipos, filtros=None, agregacao=None, reprocessar=False):
+    """
+    Deixa em dia com o CSV bruto o Parquet de (arquivo, projeção, filtros, agregação).
+    Retorna (caminho, df): `caminho` é o Parquet válido em disco (None se não pôde ser gravado)
+    e `df`, o DataFrame quando acabou de ser processado (None se o Parquet existente já valia).
+    """
+    caminho_parquet, caminho_meta = _caminhos_cache(url, colunas, tipos, filtros, agregacao)
+    meta = _ler_metadados(caminho_meta) if os.path.exists(caminho_parquet) else None
+
+    try:
+        caminho_csv, meta_bruto = _sincronizar_arquivo(url)
+    except requests.exceptions.RequestException as e:
+        if meta is None or reprocessar:
+            raise
+        # Servidor inacessível: melhor servir a cópia local do que falhar
+        print(f"Não foi possível revalidar {url}, usando cópia local: {e}")
+        return caminho_parquet, None
+
+    if not reprocessar and meta is not None and _mesma_versao(meta, meta_bruto):
+        return caminho_parquet, None
+
+    df = _materializar(_interpretar_csv(caminho_csv, colunas, tipos, filtros), agregacao)
+    try:
+        _gravar_atomico(caminho_parquet, lambda destino: df.to_parquet(destino, index=False))
+        meta = {"url": url, "processado_em": datetime.now().isoformat(timespec='seconds'),
+                "etag": meta_bruto.get("etag"), "last_modified": meta_bruto.get("last_modified")}
+        _gravar_atomico(caminho_meta, lambda destino: _gravar_json(destino, meta))
+    except Exception as e:
+        # O cache em disco é uma otimização: falhar ao gravar não impede o relatório
+        print(f"Não foi possível gravar o cache em disco de {url}: {e}")
+        return None, df
+    return caminho_parquet, df
+
+
+# --- PARTIÇÕES POR MÊS ---
+# Os quadros dos arquivos anuais (projeções com CO_MES) ficam em disco como um Parquet
+# por mês, já agregado e ordenado, numa pasta .meses ao lado dos metadados. Para cada
+# mês o metadado guarda [linhas, soma de VL_FOB] lidas do CSV. Se o CSV bruto só
+# cresceu desde a última preparação (está na linhagem dele), só o trecho novo é
+# interpretado; se foi baixado inteiro, só os meses cujo resumo mudou são refeitos.
+# Os meses fechados não são regravados. Todas as AGREGACOES são somas com CO_MES na
+# chave, então agregar mês a mês dá o mesmo que agregar o ano, e linhas novas de um mês
+# já preparado são somadas ao Parquet dele, sem reler o ano. O quadro servido junta as
+# partições, refaz a ordenação e traz os meses disponíveis em df.attrs["meses"]; ele e
+# o espelho Arrow (ver ARMAZÉM COMPARTILHADO) são refeitos inteiros quando um mês muda.
+def _particionado(colunas):
+    return bool(colunas) and 'CO_MES' in colunas
+
+
+def _diretorio_particoes(caminho_parquet):
+    return os.path.splitext(caminho_parquet)[0] + ".meses"
+
+
+def _caminho_particao(diretorio, mes):
+    return os.path.join(diretorio, f"{mes:02d}.parquet")
+
+
+def _resumo_por_mes(df):
+    """{mês: [linhas, soma de VL_FOB]} das linhas interpretadas do CSV."""
+    grupos = df.groupby('CO_MES', observed=True)
+    linhas = grupos.size()
+    somas = grupos['VL_FOB'].sum() if 'VL_FOB' in df.columns else linhas * 0
+    return {int(mes): [int(linhas[mes]), int(somas[mes])] for mes in linhas.index}
+
+
+def _concatenar(quadros):
+    """pd.concat que mantém as colunas category, cada quadro com as próprias categorias."""
+    if len(quadros) == 1:
+        return quadros[0].reset_index(drop=True)
+    categoricas = [col for col in quadros[0].columns if isinstance(quadros[0][col].dtype, pd.CategoricalDtype)]
+    for col in categoricas:
+        categorias = union_categoricals([q[col] for q in quadros], sort_categories=True).categories
+        quadros = [q.assign(**{col: q[col].cat.set_categories(categorias)}) for q in quadros]
+    df = pd.concat(quadros, ignore_index=True)
+    for col in categoricas:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+def _mesclar_particao(existente, novas, agregacao):
+    """Junta ao quadro de um mês já preparado as linhas novas dele (já materializadas)."""
+    df = _concatenar([existente, novas])
+    if agregacao:
+        # Toda agregação é uma soma de VL_FOB nas demais colunas (chaves e derivadas delas)
+        chaves = [col for col in existente.columns if col != 'VL_FOB']
+        df = df.groupby(chaves, observed=True, sort=False)['VL_FOB'].sum().reset_index()[list(existente.columns)]
+    return _ordenar_por_chave(df, ORDENACAO_POR_AGREGACAO.get(agregacao))
+
+
+def _deslocamento_anexado(meta, meta_bruto, caminho_csv):
+    """Byte do CSV bruto em que começam as linhas que o cache ainda não viu; 0 se é preciso ler tudo."""
+    if not meta or not meta.get("tamanho"):
+        return 0
+    versao = {"etag": meta.get("etag"), "last_modified": meta.get("last_modified"), "tamanho": meta["tamanho"]}
+    if versao not in meta_bruto.get("linhagem", []):
+        return 0
+    # O trecho novo precisa começar numa linha nova
+    with open(caminho_csv, 'rb') as f:
+        f.seek(meta["tamanho"] - 1)
+        return meta["tamanho"] if f.read(1) == b"\n" else 0
+
+
+def _interpretar_trecho(caminho_csv, inicio, colunas, tipos, filtros):
+    """Interpreta só as linhas do CSV a partir do byte `inicio`, com o cabeçalho do arquivo."""
+    caminho_trecho = f"{caminho_csv}.{os.getpid()}.{threading.get_ident()}.trecho"
+    try:
+        with open(caminho_csv, 'rb') as origem, open(caminho_trecho, 'wb') as destino:
+            destino.write(origem.readline())
+            origem.seek(inicio)
+            shutil.copyfileobj(origem, destino, TAMANHO_BLOCO_HTTP)
+        return _interpretar_csv(caminho_trecho, colunas, tipos, filtros)
+    finally:
+        _remover(caminho_trecho)
+
+
+def _garantir_particoes(url, colunas, tipos, filtros=None, agregacao=None, reprocessar=False):
+    """
+    Deixa em dia com o CSV bruto as partições mensais de (arquivo, projeção, filtros, agregação).
+    Retorna (pasta, meses, partes): `partes` ({mês: DataFrame}) traz os meses materializados
+    agora, para não serem relidos do disco; os demais meses estão na pasta.
+    """
+    caminho_parquet, caminho_meta = _caminhos_cache(url, colunas, tipos, filtros, agregacao)
+    diretorio = _diretorio_particoes(caminho_parquet)
+    meta = None if reprocessar else _ler_metadados(caminho_meta)
+    if meta and not all(os.path.exists(_caminho_particao(diretorio, int(mes))) for mes in meta["meses"]):
+        meta = None
+    meses = {int(mes): resumo for mes, resumo in meta["meses"].items()} if meta else {}
+
+    try:
+        caminho_csv, meta_bruto = _sincronizar_arquivo(url)
+    except requests.exceptions.RequestException as e:
+        if meta is None:
+            raise
+        # Servidor inacessível: melhor servir a cópia local do que falhar
+        print(f"Não foi possível revalidar {url}, usando cópia local: {e}")
+        return diretorio, sorted(meses), {}
+
+    if meta is not None and _mesma_versao(meta, meta_bruto):
+        return diretorio, sorted(meses), {}
+
+    inicio = _deslocamento_anexado(meta, meta_bruto, caminho_csv)
+    revistos = set()
+    if inicio:
+        df = _interpretar_trecho(caminho_csv, inicio, colunas, tipos, filtros)
+        alterados = _resumo_por_mes(df)
+        # O trecho novo pode ter linhas de um mês já preparado: elas são somadas à partição dele
+        revistos = set(alterados) & set(meses)
+        for mes in revistos:
+            alterados[mes] = [anterior + novo for anterior, novo in zip(meses[mes], alterados[mes])]
+        removidos = []
+    else:
+        df = _interpretar_csv(caminho_csv, colunas, tipos, filtros)
+        resumo = _resumo_por_mes(df)
+        alterados = {mes: r for mes, r in resumo.items() if meses.get(mes) != r}
+        removidos = [mes for mes in meses if mes not in resumo]
+    if alterados or removidos or meta is None:
+        print(f"{os.path.basename(caminho_parquet)}: preparando os meses {sorted(alterados)} de {url}.")
+
+    partes = {}
+    for mes, parte in df.groupby('CO_MES', sort=True, observed=True):
+        mes = int(mes)
+        if mes not in alterados:
+            continue
+        parte = _materializar(parte, agregacao)
+        if mes in revistos:
+            parte = _mesclar_particao(pd.read_parquet(_caminho_particao(diretorio, mes)), parte, agregacao)
+        partes[mes] = parte
+    meses.update(alterados)
+    for mes in removidos:
+        del meses[mes]
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        for mes, parte in partes.items():
+            _gravar_atomico(_caminho_particao(diretorio, mes), lambda destino: parte.to_parquet(destino, index=False))
+        for mes in removidos:
+            _remover(_caminho_particao(diretorio, mes))
+        meta = {"url": url, "processado_em": datetime.now().isoformat(timespec='seconds'),
+                "etag": meta_bruto.get("etag"), "last_modified": meta_bruto.get("last_modified"),
+                "tamanho": meta_bruto.get("tamanho"), "meses": {str(mes): meses[mes] for mes in sorted(meses)}}
+        _gravar_atomico(caminho_meta, lambda destino: _gravar_json(destino, meta))
+    except Exception as e:
+        # O cache em disco é uma otimização: os meses novos seguem da memória, os fechados do disco
+        print(f"Não foi possível gravar o cache em disco de {url}: {e}")
+    return diretorio, sorted(meses), partes
+
+
+def _montar_particoes(diretorio, meses, partes, agregacao):
+    """Junta as partições mensais num quadro ordenado pela chave, com os meses em df.attrs."""
+    if not meses:
+        raise ValueError(f"Nenhuma linha em {diretorio}")
+    df = _concatenar([partes[mes] if mes in partes else pd.read_parquet(_caminho_particao(diretorio, mes))
+                      for mes in meses])
+    df.attrs = {}
+    df = _ordenar_por_chave(df, ORDENACAO_POR_AGREGACAO.get(agregacao))
+    df.attrs["meses"] = list(meses)
+    return df
+
+
+def meses_disponiveis(df):
+    """
+    Meses presentes no arquivo anual de que `df` veio, pelo metadado das partições
+    (df.attrs), sem varrer a coluna CO_MES; nos demais quadros, pela própria coluna.
+    """
+    meses = df.attrs.get("meses")
+    if meses is None:
+        return sorted(int(mes) for mes in df['CO_MES'].unique())
+    return list(meses)
+
+
+def carregar_particoes(pedido):
+    """
+    Quadros mensais de um pedido anual ({mês: DataFrame}), direto das partições em disco,
+    sem montar o quadro do ano nem o espelho Arrow. Usado pela carga do histórico.
+    Levanta exceção se o arquivo não puder ser baixado.
+    """
+    colunas, tipos, filtros = _normalizar_projecao(pedido["usecols"], pedido["dtypes"], pedido["filtros"])
+    caminho_parquet, _ = _caminhos_cache(pedido["url"], colunas, tipos, filtros, pedido["agregacao"])
+    with _voo_unico(os.path.splitext(caminho_parquet)[0], os.path.basename(caminho_parquet)):
+        diretorio, meses, partes = _garantir_particoes(pedido["url"], colunas, tipos, filtros, pedido["agregacao"])
+        return {mes: partes[mes] if mes in partes else pd.read_parquet(_caminho_particao(diretorio, mes))
+                for mes in meses}
+
+
+# --- ARMAZÉM COMPARTILHADO ---
+# O st.cache_data entrega a cada chamada uma cópia desserializada do DataFrame, então
+# cada sessão mantinha o próprio ano inteiro em memória. O quadro agora é servido pelo
+# st.cache_resource (um único objeto por processo), montado sobre um espelho Arrow IPC
+# sem compressão do Parquet e mapeado em memória: as colunas numéricas apontam direto
+# para as páginas do arquivo no cache do sistema operacional, que também são
+# compartilhadas entre processos. Os quadros devolvidos são somente leitura: as
+# páginas filtram e derivam novos quadros, sem alterar colunas do quadro recebido.
+# Isso conta com o copy-on-write do pandas, padrão a partir do 3.0: uma fatia por iloc
+# (ver fatiar_por_chave) ou uma coluna do quadro compartilhado só é copiada quando
+# alguém escreve nela. No pandas 2.x sem pd.options.mode.copy_on_write = True, escrever
+# numa visão dessas alteraria o quadro de todas as sessões, ou falharia com "assignment
+# destination is read-only" nas colunas mapeadas. O requirements.txt não fixa a versão
+# do pandas: ao montar o ambiente, use o 3.0 ou mais novo (ou ligue o copy-on-write).
+def _caminho_espelho(caminho_parquet):
+    return os.path.splitext(caminho_parquet)[0] + ".arrow"
+
+
+def _gravar_espelho(df, caminho):
+    """Grava o quadro em Arrow IPC sem compressão, num único lote: cada coluna fica contígua e mapeável sem cópia."""
+    tabela = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    with pa.OSFile(caminho, 'wb') as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+def _abrir_espelho(caminho):
+    """DataFrame sobre o espelho mapeado em memória (df.attrs, com os meses, vem nos metadados)."""
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def _espelho_em_dia(caminho_espelho, caminho_origem):
+    return (os.path.exists(caminho_espelho) and os.path.exists(caminho_origem)
+            and os.path.getmtime(caminho_espelho) >= os.path.getmtime(caminho_origem))
+
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _ler_csv_em_cache(url, colunas, tipos, filtros=None, agregacao=None):
+    """
+    Lê o CSV via cache em disco e devolve o quadro compartilhado por todas as sessões.
+    Levanta exceção em caso de falha para não cachear o erro.
+    """
+    caminho_parquet, _ = _caminhos_cache(url, colunas, tipos, filtros, agregacao)
+    # Um processo prepara o Parquet e o espelho; os outros esperam e só mapeiam o resultado
+    with _voo_unico(os.path.splitext(caminho_parquet)[0], os.path.basename(caminho_parquet)):
+        df = _preparar_quadro_compartilhado(url, colunas, tipos, filtros, agregacao)
+    return _indexar(df, ORDENACAO_POR_AGREGACAO.get(agregacao))
+
+
+def _preparar_quadro_particionado(url, colunas, tipos, filtros, agregacao):
+    caminho_parquet, caminho_meta = _caminhos_cache(url, colunas, tipos, filtros, agregacao)
+    caminho_espelho = _caminho_espelho(caminho_parquet)
+    diretorio, meses, partes = _garantir_particoes(url, colunas, tipos, filtros, agregacao)
+
+    # O espelho é refeito quando algum mês mudou; os meses fechados vêm das partições em disco
+    if not partes and _espelho_em_dia(caminho_espelho, caminho_meta):
+        try:
+            return _abrir_espelho(caminho_espelho)
+        except Exception as e:
+            print(f"Espelho Arrow corrompido ({caminho_espelho}), refazendo: {e}")
+    try:
+        df = _montar_particoes(diretorio, meses, partes, agregacao)
+    except Exception as e:
+        print(f"Cache local corrompido ({diretorio}), reprocessando: {e}")
+        diretorio, meses, partes = _garantir_particoes(url, colunas, tipos, filtros, agregacao, reprocessar=True)
+        df = _montar_particoes(diretorio, meses, partes, agregacao)
+    try:
+        _gravar_atomico(caminho_espelho, lambda destino: _gravar_espelho(df, destino))
+        return _abrir_espelho(caminho_espelho)
+    except Exception as e:
+        print(f"Não foi possível gravar o espelho Arrow de {url}: {e}")
+        return df
+
+
+def _preparar_quadro_compartilhado(url, colunas, tipos, filtros, agregacao):
+    if _particionado(colunas):
+        return _preparar_quadro_particionado(url, colunas, tipos, filtros, agregacao)
+    caminho_parquet, df = _garantir_parquet(url, colunas, tipos, filtros, agregacao)
+    if caminho_parquet is None:
+        # Sem cache em disco, o quadro recém-processado é compartilhado direto da memória
+        return df
+    caminho_espelho = _caminho_espelho(caminho_parquet)
+
+    if df is None and _espelho_em_dia(caminho_espelho, caminho_parquet):
+        try:
+            return _abrir_espelho(caminho_espelho)
+        except Exception as e:
+            print(f"Espelho Arrow corrompido ({caminho_espelho}), refazendo: {e}")
+
+    if df is None:
+        try:
+            df = pd.read_parquet(caminho_parquet)
+        except Exception as e:
+            print(f"Cache local corrompido ({caminho_parquet}), reprocessando: {e}")
+            caminho_parquet, df = _garantir_parquet(url, colunas, tipos, filtros, agregacao, reprocessar=True)
+            if caminho_parquet is None:
+                return df
+    try:
+        _gravar_atomico(caminho_espelho, lambda destino: _gravar_espelho(df, destino))
+        return _abrir_espelho(caminho_espelho)
+    except Exception as e:
+        print(f"Não foi possível gravar o espelho Arrow de {url}: {e}")
+        return df
+
+
+def ler_dados_csv_online(url, usecols=None, dtypes=None, filtros=None, agregacao=None):
+    """
+    Lê um CSV da Comex Stat (com cache compartilhado). Retorna None em caso de falha.
+    O DataFrame é o mesmo para todas as sessões: filtre ou copie, nunca altere no lugar.
+    `filtros` ({coluna: valores permitidos}) é aplicado durante a leitura, pedaço a pedaço.
+    `agregacao` (chave de AGREGACOES) devolve e guarda em cache o agregado no lugar das linhas.
+    """
+    colunas, tipos, filtros_norm = _normalizar_projecao(usecols, dtypes, filtros)
+    try:
+        return _ler_csv_em_cache(url, colunas, tipos, filtros_norm, agregacao)
+    except Exception as e:
+        print(f"Erro ao baixar ou processar o CSV {url}: {e}")
+        return None
+
+
+def carregar_dataframe(url, nome_arquivo, usecols=None, dtypes=None, mostrar_progresso=True, filtros=None,
+                       agregacao=None):
+    """Carrega o DataFrame da URL exibindo uma barra de progresso opcional."""
+    progress_bar = None
+    if mostrar_progresso:
+        progress_bar = st.progress(0, text=f"Carregando {nome_arquivo}...")
+
+    df = ler_dados_csv_online(url, usecols=usecols, dtypes=dtypes, filtros=filtros, agregacao=agregacao)
+
+    if progress_bar:
+        if df is not None:
+            progress_bar.progress(100, text=f"{nome_arquivo} carregado com sucesso.")
+        else:
+            progress_bar.empty()
+    return df
+
+
+def pedido_comex(fluxo, ano, nivel="ncm", filtros=None):
+    """Descreve o arquivo EXP/IMP de um ano (projeção canônica do nível) para carregar_em_paralelo."""
+    if nivel == "mun":
+        return {"nome": f"{fluxo}_{ano}_MUN.csv", "url": url_comex(fluxo, ano, nivel),
+                "usecols": COLUNAS_MUN, "dtypes": DTYPES_MUN, "filtros": filtros, "agregacao": None}
+    return {"nome": f"{fluxo}_{ano}.csv", "url": url_comex(fluxo, ano, nivel),
+            "usecols": COLUNAS_NCM, "dtypes": DTYPES_NCM, "filtros": filtros, "agregacao": None}
+
+
+def pedido_cubo(fluxo, ano, nivel="ncm", filtros=None):
+    """
+    Descreve o cubo agregado de EXP/IMP de um ano para carregar_em_paralelo:
+    (UF, país, mês, SH6) no nível ncm, (UF, município, país, mês, SH4) no nível mun.
+    """
+    pedido = pedido_comex(fluxo, ano, nivel, filtros)
+    pedido["nome"] = f"{pedido['nome']} (agregado)"
+    pedido["agregacao"] = "cubo_mun" if nivel == "mun" else "cubo"
+    return pedido
+
+
+def pedido_cubo_produto(fluxo, ano):
+    """O cubo NCM de pedido_cubo, gravado em ordem de SH6 para as seleções por produto (fatiar_por_produto)."""
+    pedido = pedido_cubo(fluxo, ano)
+    pedido["agregacao"] = "cubo_produto"
+    return pedido
+
+
+def pedido_resumo_municipios(fluxo, ano):
+    """Descreve o resumo (UF, município, mês) de todas as UFs, usado nos rankings municipais."""
+    pedido = pedido_comex(fluxo, ano, nivel="mun")
+    pedido["nome"] = f"{pedido['nome']} (resumo por município)"
+    pedido["agregacao"] = "resumo_mun"
+    return pedido
+
+
+def pedido_tabela(nome_arquivo):
+    """Descreve uma tabela auxiliar registrada em TABELAS para carregar_em_paralelo."""
+    colunas = TABELAS[nome_arquivo]
+    return {"nome": nome_arquivo, "url": url_tabela(nome_arquivo),
+            "usecols": colunas, "dtypes": tipos_do_esquema(colunas), "filtros": None, "agregacao": None}
+
+
+def carregar_comex(fluxo, ano, nivel="ncm", mostrar_progresso=True, filtros=None):
+    """
+    Carrega EXP/IMP de um ano com a projeção canônica do nível (ncm ou mun).
+    Arquivos NCM já vêm com SH2/SH4/SH6; arquivos MUN, com SH2 além do SH4.
+    Ex.: filtros={'SG_UF_MUN': ['MG']} mantém só as linhas de Minas Gerais.
+    """
+    pedido = pedido_comex(fluxo, ano, nivel, filtros)
+    return carregar_dataframe(pedido["url"], pedido["nome"], usecols=pedido["usecols"], dtypes=pedido["dtypes"],
+                              mostrar_progresso=mostrar_progresso, filtros=pedido["filtros"])
+
+
+def carregar_tabela(nome_arquivo):
+    """Carrega uma tabela auxiliar com as colunas registradas em TABELAS, tipadas pelo ESQUEMA."""
+    pedido = pedido_tabela(nome_arquivo)
+    return carregar_dataframe(pedido["url"], nome_arquivo, usecols=pedido["usecols"],
+                              dtypes=pedido["dtypes"], mostrar_progresso=False)
+
+
+def carregar_cubo(fluxo, ano, nivel="ncm", mostrar_progresso=True, filtros=None):
+    """Carrega o cubo agregado de EXP/IMP de um ano (ver pedido_cubo)."""
+    pedido = pedido_cubo(fluxo, ano, nivel, filtros)
+    return carregar_dataframe(pedido["url"], pedido["nome"], usecols=pedido["usecols"], dtypes=pedido["dtypes"],
+                              mostrar_progresso=mostrar_progresso, filtros=pedido["filtros"],
+                              agregacao=pedido["agregacao"])
+
+
+def _executar_em_paralelo(pedidos, funcao, mostrar_progresso):
+    """Aplica `funcao` a cada pedido em threads, com a barra de progresso atualizada na thread da página."""
+    ctx = get_script_run_ctx()
+
+    def executar(pedido):
+        # As threads precisam do contexto da sessão para usar o st.cache_resource sem avisos
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return funcao(pedido)
+
+    progress_bar = None
+    if mostrar_progresso:
+        progress_bar = st.progress(0, text=f"Carregando {len(pedidos)} arquivos...")
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(len(pedidos), 1)) as executor:
+        futuros = {executor.submit(executar, pedido): chave for chave, pedido in pedidos.items()}
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            chave = futuros[futuro]
+            resultados[chave] = futuro.result()
+            # A barra só é atualizada aqui, na thread da página
+            if progress_bar:
+                progress_bar.progress(int(100 * concluidos / len(pedidos)),
+                                      text=f"{pedidos[chave]['nome']} carregado ({concluidos}/{len(pedidos)}).")
+    return resultados
+
+
+def _carregar_pedido(pedido):
+    return ler_dados_csv_online(pedido["url"], usecols=pedido["usecols"], dtypes=pedido["dtypes"],
+                                filtros=pedido["filtros"], agregacao=pedido["agregacao"])
+
+
+def carregar_em_paralelo(pedidos, mostrar_progresso=True):
+    """
+    Carrega de uma vez todos os arquivos de uma geração.
+    `pedidos` é {chave: pedido_comex(...) ou pedido_tabela(...)}; retorna {chave: DataFrame ou None}.
+    O tempo total fica próximo ao do arquivo mais lento, não à soma de todos.
+    """
+    return _executar_em_paralelo(pedidos, _carregar_pedido, mostrar_progresso)
+
+
+# --- MOTOR DE CONSULTA ---
+# As páginas podem consultar os arquivos por "fontes", com a mesma interface em dois motores:
+# pandas: (padrão) o quadro compartilhado do arquivo (st.cache_resource sobre o espelho Arrow
+#         mapeado em memória, ver ARMAZÉM COMPARTILHADO) é filtrado em memória.
+# duckdb: cada consulta roda em SQL sobre o Parquet do cache em disco; o DuckDB lê só as colunas
+#         e os grupos de linhas que o filtro alcança, e só o resultado vira DataFrame.
+# O motor vem de BRIEFINGS_MOTOR e pode ser trocado por página em BRIEFINGS_MOTOR_<PÁGINA>
+# (ex.: BRIEFINGS_MOTOR_MUNICIPIO=duckdb). Sem o pacote duckdb instalado, vale o pandas.
+# Só as páginas de PAGINAS_COM_MOTOR consultam por fontes: as de país e de produto
+# usam sempre o pandas, com os cubos fatiados por busca binária (ver fatiar_por_chave),
+# e uma BRIEFINGS_MOTOR_<PÁGINA> de outra página é ignorada com um aviso.
+MOTORES = ("pandas", "duckdb")
+PAGINAS_COM_MOTOR = ("municipio",)
+
+
+def _avisar_motores_ignorados():
+    for variavel in sorted(os.environ):
+        pagina = variavel[len("BRIEFINGS_MOTOR_"):].lower()
+        if variavel.startswith("BRIEFINGS_MOTOR_") and pagina not in PAGINAS_COM_MOTOR:
+            print(f"{variavel} ignorada: só a(s) página(s) {', '.join(PAGINAS_COM_MOTOR)} "
+                  f"têm motor de consulta configurável; as demais usam pandas.")
+
+
+_avisar_motores_ignorados()
+
+
+def motor_da_pagina(pagina):
+    """Motor de consulta configurado para a página; pandas se o configurado não estiver disponível."""
+    if pagina not in PAGINAS_COM_MOTOR:
+        raise ValueError(f"A página '{pagina}' não consulta por fontes (ver PAGINAS_COM_MOTOR).")
+    motor = (os.environ.get(f"BRIEFINGS_MOTOR_{pagina.upper()}") or os.environ.get("BRIEFINGS_MOTOR") or "pandas").lower()
+    if motor not in MOTORES:
+        print(f"Motor de consulta desconhecido '{motor}', usando pandas.")
+        return "pandas"
+    if motor == "duckdb" and duckdb is None:
+        print("DuckDB não está instalado, usando pandas.")
+        return "pandas"
+    return motor
+
+
+class FontePandas:
+    """Fonte de consulta sobre um DataFrame já carregado."""
+
+    def __init__(self, df):
+        self.df = df
+
+    def selecionar(self, filtros):
+        """Linhas em que cada coluna de `filtros` ({coluna: valores}) está nos valores pedidos."""
+        df = self.df
+        indice = _indice_do_quadro(df)
+        # A coluna ordenada no cache vem primeiro, enquanto o quadro ainda pode ser fatiado por busca binária
+        coluna_indice = indice["coluna"] if indice else None
+        for coluna in sorted(filtros, key=lambda col: col != coluna_indice):
+            df = fatiar_por_chave(df, coluna, filtros[coluna])
+        return df
+
+    def somar(self, chaves, filtros):
+        """Soma de VL_FOB por `chaves` nas linhas selecionadas."""
+        return self.selecionar(filtros).groupby(chaves, observed=True)['VL_FOB'].sum()
+
+    def maximo(self, coluna):
+        return self.df[coluna].max()
+
+    def meses(self):
+        return meses_disponiveis(self.df)
+
+
+@st.cache_resource
+def _conexao_duckdb():
+    """Conexão DuckDB em memória, compartilhada; cada consulta abre o próprio cursor."""
+    return duckdb.connect()
+
+
+def _valor_sql(valor):
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+class FonteDuckDB:
+    """Fonte de consulta em SQL sobre o Parquet do cache (ou sobre o DataFrame, se o Parquet não pôde ser gravado)."""
+
+    def __init__(self, caminho_parquet, df=None, meses=None):
+        # caminho_parquet pode ser um padrão glob (as partições mensais de um arquivo anual)
+        self.caminho_parquet = caminho_parquet
+        self.df = df
+        self._meses = meses
+
+    def _executar(self, sql, filtros, buscar):
+        condicoes = []
+        parametros = []
+        for coluna, valores in (filtros or {}).items():
+            valores = [_valor_sql(v) for v in (valores if isinstance(valores, (list, tuple, set)) else [valores])]
+            if not valores:
+                condicoes.append("FALSE")
+                continue
+            condicoes.append(f'"{coluna}" IN ({", ".join("?" * len(valores))})')
+            parametros.extend(valores)
+        onde = " AND ".join(condicoes) or "TRUE"
+
+        cursor = _conexao_duckdb().cursor()
+        try:
+            if self.caminho_parquet:
+                origem = "read_parquet(?)"
+                parametros = [self.caminho_parquet] + parametros
+            else:
+                cursor.register("fonte", self.df)
+                origem = "fonte"
+            return buscar(cursor.execute(sql.format(origem=origem, onde=onde), parametros))
+        finally:
+            cursor.close()
+
+    def selecionar(self, filtros):
+        """Linhas em que cada coluna de `filtros` ({coluna: valores}) está nos valores pedidos."""
+        return self._executar("SELECT * FROM {origem} WHERE {onde}", filtros, lambda r: r.df())
+
+    def somar(self, chaves, filtros):
+        """Soma de VL_FOB por `chaves` nas linhas selecionadas."""
+        colunas = ", ".join(f'"{c}"' for c in chaves)
+        sql = f"SELECT {colunas}, SUM(VL_FOB)::BIGINT AS VL_FOB FROM {{origem}} WHERE {{onde}} GROUP BY {colunas}"
+        return self._executar(sql, filtros, lambda r: r.df()).set_index(chaves)['VL_FOB']
+
+    def maximo(self, coluna):
+        return self._executar(f'SELECT MAX("{coluna}") FROM {{origem}}', None, lambda r: r.fetchone()[0])
+
+    def meses(self):
+        """Meses do arquivo anual: do metadado das partições, sem consulta, quando disponível."""
+        if self._meses is not None:
+            return list(self._meses)
+        return self._executar('SELECT DISTINCT "CO_MES" FROM {origem} ORDER BY 1', None,
+                              lambda r: [int(linha[0]) for linha in r.fetchall()])
+
+
+def _preparar_fonte_duckdb(pedido):
+    colunas, tipos, filtros = _normalizar_projecao(pedido["usecols"], pedido["dtypes"], pedido["filtros"])
+    caminho_parquet, _ = _caminhos_cache(pedido["url"], colunas, tipos, filtros, pedido["agregacao"])
+    try:
+        with _voo_unico(os.path.splitext(caminho_parquet)[0], os.path.basename(caminho_parquet)):
+            if _particionado(colunas):
+                diretorio, meses, partes = _garantir_particoes(pedido["url"], colunas, tipos, filtros, pedido["agregacao"])
+                if any(not os.path.exists(_caminho_particao(diretorio, mes)) for mes in meses):
+                    # Partições novas que não puderam ser gravadas: consulta o quadro em memória
+                    df = _montar_particoes(diretorio, meses, partes, pedido["agregacao"])
+                    return FonteDuckDB(None, df, meses=meses)
+                if not meses:
+                    raise ValueError(f"Nenhuma linha em {diretorio}")
+                # O DuckDB lê as partições mensais direto do disco, como um só arquivo
+                return FonteDuckDB(os.path.join(diretorio, "*.parquet"), meses=meses)
+            caminho, df = _garantir_parquet(pedido["url"], colunas, tipos, filtros, pedido["agregacao"])
+    except Exception as e:
+        print(f"Erro ao baixar ou processar o CSV {pedido['url']}: {e}")
+        return None
+    # Com o Parquet em disco, o DataFrame recém-processado (se houver) é descartado
+    return FonteDuckDB(caminho) if caminho else FonteDuckDB(None, df)
+
+
+def abrir_fontes(pedidos, motor="pandas", mostrar_progresso=True):
+    """
+    Como carregar_em_paralelo, mas retorna {chave: fonte de consulta ou None} no motor escolhido.
+    No motor duckdb os arquivos só são baixados e convertidos em Parquet, sem virar DataFrame.
+    """
+    if motor == "duckdb":
+        return _executar_em_paralelo(pedidos, _preparar_fonte_duckdb, mostrar_progresso)
+    dados = carregar_em_paralelo(pedidos, mostrar_progresso)
+    return {chave: (FontePandas(df) if df is not None else None) for chave, df in dados.items()}
@@ -0,0 +1,163 @@
+import streamlit as st
+import os
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+from docx import Document
+from docx.shared import Cm, Pt
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+
+# --- MONTAGEM DOS DOCUMENTOS (.docx) ---
+# Todo briefing tem o mesmo pacote: estilos, cabeçalho com a logo e as margens.
+# Esse pacote é montado uma vez por processo com o python-docx (_modelo) e fica
+# guardado já compactado; cada documento só acrescenta o próprio
+# word/document.xml, escrito direto em OOXML. Assim a logo não é relida do disco
+# a cada relatório e os estilos padrão (quase 800 KB de XML) não são
+# recompactados a cada arquivo.
+
+TEXTOS_CABECALHO = [
+    "GOVERNO DO ESTADO DE MINAS GERAIS",
+    "SECRETARIA DE ESTADO DE DESENVOLVIMENTO ECONÔMICO",
+    "Subsecretaria de Promoção de Investimentos e Cadeias Produtivas",
+    "Superintendência de Atração de Investimentos e Estímulo à Exportação"
+]
+PARTE_DOCUMENTO = "word/document.xml"
+# Recuo da primeira linha dos parágrafos (1,25 cm), em twips
+RECUO_PARAGRAFO = int(Cm(1.25).twips)
+
+# Caracteres de controle que o XML não aceita (o python-docx recusaria o texto)
+_CONTROLE_INVALIDO = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_QUEBRAS = re.compile(r"(\t|\n|\r)")
+
+
+def sanitize_filename(filename):
+    return re.sub(r'[\\/*?:"<>|]', "_", filename)
+
+
+def _criar_cabecalho(doc, logo_path):
+    section = doc.sections[0]
+    section.top_margin = Cm(1.27)
+    header = section.header
+    table = header.add_table(rows=1, cols=2, width=Cm(16.0))
+    table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    table.columns[0].width = Cm(4.0)
+    table.columns[1].width = Cm(12.0)
+    paragraph_imagem = table.cell(0, 0).paragraphs[0]
+    paragraph_imagem.paragraph_format.space_before = Pt(0)
+    paragraph_imagem.paragraph_format.space_after = Pt(0)
+    if logo_path and os.path.exists(logo_path):
+        try:
+            paragraph_imagem.add_run().add_picture(logo_path, width=Cm(3.5), height=Cm(3.42))
+        except Exception:
+            paragraph_imagem.add_run("[Logo não encontrado]")
+    paragraph_imagem.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    cell_texto = table.cell(0, 1)
+    for i, texto in enumerate(TEXTOS_CABECALHO):
+        p = cell_texto.paragraphs[0] if i == 0 else cell_texto.add_paragraph()
+        p.paragraph_format.space_before = Pt(0)
+        p.paragraph_format.space_after = Pt(0)
+        p.paragraph_format.line_spacing_rule = WD_LINE_SPACING.EXACTLY
+        p.paragraph_format.line_spacing = Pt(11)
+        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        run = p.add_run(texto)
+        run.font.name = 'Times New Roman'
+        run.font.size = Pt(11)
+        run.bold = (i < 2)
+
+
+@st.cache_resource(show_spinner=False)
+def _modelo(logo_path):
+    """
+    Pacote-modelo de um briefing: (zip com todas as partes menos o word/document.xml,
+    início do document.xml até <w:body>, fim do document.xml a partir do <w:sectPr>).
+    """
+    doc = Document()
+    _criar_cabecalho(doc, logo_path)
+    original = io.BytesIO()
+    doc.save(original)
+
+    pacote = io.BytesIO()
+    with zipfile.ZipFile(original) as origem, zipfile.ZipFile(pacote, "w", zipfile.ZIP_DEFLATED) as destino:
+        for info in origem.infolist():
+            if info.filename == PARTE_DOCUMENTO:
+                xml = origem.read(info).decode("utf-8")
+            else:
+                destino.writestr(info.filename, origem.read(info))
+    inicio_corpo = xml.index("<w:body>") + len("<w:body>")
+    inicio_secao = xml.rindex("<w:sectPr")
+    return pacote.getvalue(), xml[:inicio_corpo], xml[inicio_secao:]
+
+
+def _runs_xml(texto, tamanho, negrito):
+    """Um run com o texto, no mesmo XML que o add_run do python-docx gera (\\n vira <w:br/>, \\t vira <w:tab/>)."""
+    propriedades = ('<w:rPr><w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman"/>'
+                    f'{"<w:b/>" if negrito else ""}<w:sz w:val="{tamanho * 2}"/></w:rPr>')
+    partes = []
+    for trecho in _QUEBRAS.split(_CONTROLE_INVALIDO.sub("", texto)):
+        if trecho == "\t":
+            partes.append("<w:tab/>")
+        elif trecho in ("\n", "\r"):
+            partes.append("<w:br/>")
+        elif trecho:
+            preservar = ' xml:space="preserve"' if trecho.strip() != trecho else ""
+            partes.append(f"<w:t{preservar}>{escape(trecho)}</w:t>")
+    return f"<w:r>{propriedades}{''.join(partes)}</w:r>"
+
+
+def _paragrafo_xml(texto, tamanho, alinhamento, negrito=False, recuo=False):
+    recuo_xml = f'<w:ind w:firstLine="{RECUO_PARAGRAFO}"/>' if recuo else ""
+    return (f'<w:p><w:pPr>{recuo_xml}<w:jc w:val="{alinhamento}"/></w:pPr>'
+            f'{_runs_xml(texto, tamanho, negrito)}</w:p>')
+
+
+class DocumentoBriefing:
+    """
+    Um briefing em .docx: título, títulos de seção e parágrafos justificados, sobre o
+    pacote-modelo com o cabeçalho. As páginas ajustam o formato pelos atributos de classe.
+    """
+    TAMANHO_TITULO = 12
+    # Parágrafo em branco depois do título do documento e antes de cada título de seção
+    ESPACAR_TITULOS = False
+    NUMERAR_TITULOS = True
+
+    def __init__(self, logo_path):
+        self.logo_path = logo_path
+        self.secao_atual = 0
+        self.subsecao_atual = 0
+        self.titulo_doc = ""
+        self.corpo = []
+
+    def set_titulo(self, titulo):
+        self.titulo_doc = sanitize_filename(titulo)
+        self.corpo.append(_paragrafo_xml(self.titulo_doc, self.TAMANHO_TITULO, "center", negrito=True))
+        if self.ESPACAR_TITULOS:
+            self.corpo.append("<w:p/>")
+
+    def adicionar_paragrafo(self, texto):
+        self.corpo.append(_paragrafo_xml(texto, 12, "both", recuo=True))
+
+    adicionar_conteudo_formatado = adicionar_paragrafo
+
+    def adicionar_titulo(self, texto):
+        if self.ESPACAR_TITULOS:
+            self.corpo.append("<w:p/>")
+        if not self.NUMERAR_TITULOS:
+            rotulo = texto
+        elif self.subsecao_atual == 0:
+            rotulo = f"{self.secao_atual}. {texto}"
+        else:
+            rotulo = f"{self.secao_atual}.{self.subsecao_atual}. {texto}"
+        self.corpo.append(_paragrafo_xml(rotulo, 12, "left", negrito=True))
+
+    def nova_secao(self):
+        self.secao_atual += 1
+        self.subsecao_atual = 0
+
+    def finalizar_documento(self):
+        """Devolve (bytes do .docx, nome do arquivo); nada é gravado no disco do servidor."""
+        pacote, inicio, fim = _modelo(self.logo_path)
+        arquivo = io.BytesIO(pacote)
+        with zipfile.ZipFile(arquivo, "a", zipfile.ZIP_DEFLATED) as z:
+            z.writestr(PARTE_DOCUMENTO, inicio + "".join(self.corpo) + fim)
+        return arquivo.getvalue(), sanitize_filename(f"{self.titulo_doc}.docx")
@@ -0,0 +1,251 @@
+import os
+import json
+import shutil
+from functools import reduce
+from datetime import datetime
+import pandas as pd
+import pyarrow.dataset as ds
+from dados_comex import (DIRETORIO_CACHE, ESQUEMA, carregar_particoes, descartar_bruto, pedido_cubo,
+                         pedido_resumo_municipios)
+
+# --- HISTÓRICO CONSOLIDADO ---
+# Séries de vários anos para as seções de tendência dos briefings. A carga inicial
+# (scripts/carregar_historico.py) baixa cada ano da Comex Stat uma vez, reduz o
+# cubo do ano às chaves de cada série e grava o resultado particionado por fluxo,
+# ano e mês:
+#     <DIRETORIO_HISTORICO>/<série>/fluxo=EXP/ano=2015/01.parquet
+# com um _ano.json por ano listando os meses gravados. Na geração dos briefings as
+# séries só são lidas daqui, com o filtro aplicado pelo pyarrow na leitura: nenhum
+# CSV é baixado para montar uma tendência.
+DIRETORIO_HISTORICO = os.environ.get("BRIEFINGS_HISTORICO_DIR", os.path.join(DIRETORIO_CACHE, "historico"))
+PRIMEIRO_ANO = 1997
+FLUXOS = ("EXP", "IMP")
+NOME_MANIFESTO = "_ano.json"
+# Grupos de linhas pequenos: cada série é gravada ordenada pela chave de consulta, e a
+# leitura pula os grupos cujo mínimo/máximo não alcança o filtro
+LINHAS_POR_GRUPO = 16 * 1024
+
+SERIES = {
+    # Valor por (UF, país, mês): comércio de MG e do Brasil com cada parceiro
+    "paises": {"pedido": pedido_cubo, "chaves": ['SG_UF_NCM', 'CO_PAIS', 'CO_MES'], "ordem": 'CO_PAIS'},
+    # Valor por (UF, mês, SH6), com SH4/SH2 para os filtros: cada produto é uma faixa de SH6
+    "produtos": {"pedido": pedido_cubo, "chaves": ['SG_UF_NCM', 'CO_MES', 'SH6'], "ordem": 'SH6'},
+    # Valor por (UF, município, mês), de todas as UFs
+    "municipios": {"pedido": pedido_resumo_municipios, "chaves": ['SG_UF_MUN', 'CO_MUN', 'CO_MES'], "ordem": 'CO_MUN'},
+}
+
+
+def _diretorio_ano(serie, fluxo, ano):
+    return os.path.join(DIRETORIO_HISTORICO, serie, f"fluxo={fluxo}", f"ano={ano}")
+
+
+def _ler_manifesto(diretorio):
+    try:
+        with open(os.path.join(diretorio, NOME_MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def meses_consolidados(serie, fluxo, ano):
+    """Meses de `ano` gravados no histórico da série ([] se o ano não foi carregado)."""
+    return (_ler_manifesto(_diretorio_ano(serie, fluxo, ano)) or {}).get("meses", [])
+
+
+def anos_consolidados(serie, fluxo, completos=True):
+    """Anos no histórico da série; com completos=True, só os que têm os 12 meses."""
+    try:
+        nomes = os.listdir(os.path.join(DIRETORIO_HISTORICO, serie, f"fluxo={fluxo}"))
+    except OSError:
+        return []
+    anos = []
+    for nome in nomes:
+        if not nome.startswith("ano="):
+            continue
+        meses = meses_consolidados(serie, fluxo, int(nome[4:]))
+        if meses and (len(meses) == 12 or not completos):
+            anos.append(int(nome[4:]))
+    return sorted(anos)
+
+
+def _reduzir(df, serie):
+    """Agrega o quadro de um mês nas chaves da série, ordenado pela chave de consulta."""
+    definicao = SERIES[serie]
+    reduzido = df.groupby(definicao["chaves"], observed=True)['VL_FOB'].sum().reset_index()
+    if 'SH6' in reduzido.columns:
+        sh6 = reduzido['SH6'].to_numpy()
+        reduzido['SH4'] = (sh6 // 100).astype(ESQUEMA['SH4'])
+        reduzido['SH2'] = (sh6 // 10000).astype(ESQUEMA['SH2'])
+    reduzido = reduzido.sort_values(definicao["ordem"], kind='stable', ignore_index=True)
+    reduzido.attrs = {}
+    return reduzido
+
+
+def _gravar_ano(serie, fluxo, ano, quadros):
+    """
+    Grava os meses de um ano numa pasta temporária e a troca pela do ano de uma vez:
+    uma leitura nunca encontra um ano pela metade.
+    """
+    destino = _diretorio_ano(serie, fluxo, ano)
+    pai, nome = os.path.split(destino)
+    # Pastas de trabalho começam com ponto: ficam fora de anos_consolidados e do pyarrow
+    temporario = os.path.join(pai, f".{nome}.{os.getpid()}.tmp")
+    antigo = os.path.join(pai, f".{nome}.{os.getpid()}.old")
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    try:
+        for mes, df in quadros.items():
+            df.to_parquet(os.path.join(temporario, f"{mes:02d}.parquet"), index=False,
+                          row_group_size=LINHAS_POR_GRUPO)
+        manifesto = {"meses": sorted(quadros), "linhas": {str(mes): len(df) for mes, df in sorted(quadros.items())},
+                     "consolidado_em": datetime.now().isoformat(timespec='seconds')}
+        with open(os.path.join(temporario, NOME_MANIFESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f)
+        if os.path.exists(destino):
+            os.replace(destino, antigo)
+        os.replace(temporario, destino)
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+        shutil.rmtree(antigo, ignore_errors=True)
+
+
+def consolidar_ano(fluxo, ano, series=tuple(SERIES), refazer=False, descartar_brutos=False):
+    """
+    Grava no histórico os meses de `ano` das `series` pedidas e retorna {série: meses gravados}.
+    Séries com o ano já completo são puladas, salvo refazer=True. As séries que saem do
+    mesmo arquivo (o cubo NCM) são reduzidas da mesma leitura. Com descartar_brutos, o
+    CSV baixado é apagado depois (os anos fechados não precisam mais dele).
+    """
+    pendentes = [serie for serie in series if refazer or len(meses_consolidados(serie, fluxo, ano)) < 12]
+    por_pedido = {}
+    for serie in pendentes:
+        por_pedido.setdefault(SERIES[serie]["pedido"], []).append(serie)
+
+    gravados = {}
+    for montar_pedido, series_do_pedido in por_pedido.items():
+        pedido = montar_pedido(fluxo, ano)
+        quadros = carregar_particoes(pedido)
+        for serie in series_do_pedido:
+            _gravar_ano(serie, fluxo, ano, {mes: _reduzir(df, serie) for mes, df in quadros.items()})
+            gravados[serie] = sorted(quadros)
+        if descartar_brutos:
+            descartar_bruto(pedido["url"])
+    return gravados
+
+
+# --- CONSULTA ---
+def _valores(valores):
+    lista = list(valores) if isinstance(valores, (list, tuple, set)) else [valores]
+    return [v.item() if hasattr(v, "item") else v for v in lista]
+
+
+def _expressao(filtros, produtos):
+    """Filtro do pyarrow: cada coluna de `filtros` nos valores pedidos e, com `produtos`, o SH2/SH4/SH6."""
+    condicoes = [ds.field(coluna).isin(_valores(valores)) for coluna, valores in (filtros or {}).items()]
+    if produtos is not None:
+        codigos = [ds.field(coluna).isin(_valores(lista))
+                   for coluna, lista in zip(('SH2', 'SH4', 'SH6'), produtos) if len(lista)]
+        condicoes.append(reduce(lambda a, b: a | b, codigos) if codigos else ds.scalar(False))
+    return reduce(lambda a, b: a & b, condicoes) if condicoes else None
+
+
+def somar_por_ano(serie, fluxo, anos, chaves=(), filtros=None, produtos=None):
+    """
+    Soma de VL_FOB por ano (e por `chaves`) nos `anos` que estão no histórico da série.
+    `filtros` ({coluna: valores}) e `produtos` ((códigos SH2, SH4, SH6), na série de
+    produtos) são aplicados na leitura. Retorna uma Series indexada por ANO (e pelas
+    chaves); anos fora do histórico não aparecem.
+    """
+    arquivos = []
+    for ano in anos:
+        diretorio = _diretorio_ano(serie, fluxo, ano)
+        arquivos += [os.path.join(diretorio, f"{mes:02d}.parquet") for mes in meses_consolidados(serie, fluxo, ano)]
+    indice = ['ANO'] + list(chaves)
+    if not arquivos:
+        return pd.DataFrame(columns=indice + ['VL_FOB']).astype({'VL_FOB': 'int64'}).set_index(indice)['VL_FOB']
+
+    # O ano não está nos arquivos: vem do nome da pasta (ano=2015, partição no estilo Hive)
+    dataset = ds.dataset(arquivos, format="parquet", partitioning="hive",
+                         partition_base_dir=os.path.join(DIRETORIO_HISTORICO, serie))
+    tabela = dataset.to_table(columns=['ano', 'VL_FOB'] + list(chaves), filter=_expressao(filtros, produtos))
+    somas = tabela.group_by(['ano'] + list(chaves)).aggregate([('VL_FOB', 'sum')]).to_pandas()
+    somas = somas.rename(columns={'ano': 'ANO', 'VL_FOB_sum': 'VL_FOB'})
+    return somas.sort_values(indice, ignore_index=True).set_index(indice)['VL_FOB']
+
+
+# --- TENDÊNCIA ---
+# Consultas e frases das seções de evolução, iguais nos briefings de país, município
+# e produto; cada página entra só com a própria formatação de valores.
+def anos_da_tendencia(serie, ano_final, quantidade):
+    """
+    Os até `quantidade` anos completos (nos dois fluxos) mais recentes do histórico que
+    vão até `ano_final`. Um ano_final ainda em curso fica de fora: a série termina no
+    último ano fechado.
+    """
+    completos = set(anos_consolidados(serie, FLUXOS[0]))
+    for fluxo in FLUXOS[1:]:
+        completos &= set(anos_consolidados(serie, fluxo))
+    elegiveis = sorted(ano for ano in completos if ano <= ano_final)
+    if not elegiveis:
+        return []
+    return [ano for ano in elegiveis if ano > elegiveis[-1] - quantidade]
+
+
+def cagr(valor_inicial, valor_final, periodos):
+    """Taxa média de crescimento anual (%), ou None se a série começa ou termina em zero."""
+    if periodos <= 0 or valor_inicial <= 0 or valor_final <= 0:
+        return None
+    return ((valor_final / valor_inicial) ** (1 / periodos) - 1) * 100
+
+
+def valores_por_codigo(serie, coluna, codigos, anos, filtros=None):
+    """
+    Valores anuais de cada código de `coluna` (ex.: cada CO_PAIS da série "paises") nos
+    `anos`, com os `filtros` aplicados, numa consulta por fluxo.
+    Retorna {fluxo: DataFrame ano x código}, com uma coluna por código pedido.
+    """
+    colunas = list(dict.fromkeys(codigos))
+    tendencias = {}
+    for fluxo in FLUXOS:
+        valores = somar_por_ano(serie, fluxo, anos, chaves=[coluna], filtros=dict(filtros or {}, **{coluna: colunas}))
+        tendencias[fluxo] = valores.unstack(fill_value=0).reindex(index=anos, columns=colunas, fill_value=0)
+    return tendencias
+
+
+def resumir_tendencia(valores, anos):
+    """
+    Números de uma série anual para o texto do briefing. `valores` é uma Series por ano
+    (anos sem comércio podem faltar e contam como zero).
+    Retorna {inicio, fim, valor_inicial, valor_final, cagr, ano_pico, valor_pico, valores}.
+    """
+    valores = valores.reindex(anos, fill_value=0)
+    inicio, fim = anos[0], anos[-1]
+    return {
+        "inicio": inicio,
+        "fim": fim,
+        "valor_inicial": valores[inicio],
+        "valor_final": valores[fim],
+        "cagr": cagr(valores[inicio], valores[fim], fim - inicio),
+        "ano_pico": valores.idxmax(),
+        "valor_pico": valores.max(),
+        "valores": valores,
+    }
+
+
+def texto_cagr(resumo):
+    """Trecho com a variação média anual (CAGR), com uma casa decimal; vazio se não há CAGR."""
+    if resumo["cagr"] is None:
+        return ""
+    return f", uma variação média anual (CAGR) de {resumo['cagr']:.1f}%"
+
+
+def texto_evolucao(resumo, descricao, formatar_valor):
+    """
+    Frase da evolução de um fluxo no período do `resumo` (ver resumir_tendencia), ex.:
+    descricao="as exportações mineiras para a China". `formatar_valor` é o da página.
+    """
+    if resumo["valor_pico"] == 0:
+        return f"Entre {resumo['inicio']} e {resumo['fim']}, não foram registradas {descricao}."
+    return (f"Entre {resumo['inicio']} e {resumo['fim']}, {descricao} passaram de {formatar_valor(resumo['valor_inicial'])} "
+            f"para {formatar_valor(resumo['valor_final'])}{texto_cagr(resumo)}. "
+            f"O maior valor da série foi registrado em {resumo['ano_pico']} ({formatar_valor(resumo['valor_pico'])}).")
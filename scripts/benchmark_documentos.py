@@ -0,0 +1,169 @@
+"""
+Compara a montagem dos briefings em .docx: o DocumentoApp anterior (python-docx, um
+Document() em branco e o cabeçalho refeito a cada relatório) x documento.DocumentoBriefing
+(pacote-modelo montado uma vez por processo e corpo escrito direto em OOXML).
+
+Os dois montam os mesmos documentos, com o texto de um briefing de país; no fim, o
+corpo (word/document.xml) dos arquivos é conferido.
+
+Uso (na raiz do repositório):
+    python scripts/benchmark_documentos.py [--documentos 100] [--rodadas 3]
+"""
+import argparse
+import io
+import logging
+import os
+import re
+import sys
+import time
+import zipfile
+
+from docx import Document
+from docx.shared import Cm, Pt
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Fora do servidor, o st.cache_resource avisa a cada chamada
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import documento  # noqa: E402
+
+LOGO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "LogoMinasGerais.png")
+
+
+def sanitize_filename(filename):
+    return re.sub(r'[\\/*?:"<>|]', "_", filename)
+
+
+class DocumentoLegado:
+    """O DocumentoApp da página de país antes do documento.py, como referência."""
+
+    def __init__(self, logo_path):
+        self.doc = Document()
+        self.secao_atual = 0
+        self.subsecao_atual = 0
+        self.titulo_doc = ""
+        self.logo_path = logo_path
+
+    def set_titulo(self, titulo):
+        self.titulo_doc = sanitize_filename(titulo)
+        self.criar_cabecalho()
+        p = self.doc.add_paragraph()
+        run = p.add_run(self.titulo_doc)
+        run.font.name = 'Times New Roman'
+        run.font.size = Pt(14)
+        run.bold = True
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self.doc.add_paragraph()
+
+    def adicionar_paragrafo(self, texto):
+        p = self.doc.add_paragraph()
+        p.paragraph_format.first_line_indent = Cm(1.25)
+        run = p.add_run(texto)
+        run.font.name = 'Times New Roman'
+        run.font.size = Pt(12)
+        p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+    def adicionar_titulo(self, texto):
+        self.doc.add_paragraph()
+        p = self.doc.add_paragraph()
+        run = p.add_run(f"{self.secao_atual}. {texto}")
+        run.font.name = 'Times New Roman'
+        run.font.size = Pt(12)
+        run.bold = True
+        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    def nova_secao(self):
+        self.secao_atual += 1
+        self.subsecao_atual = 0
+
+    def criar_cabecalho(self):
+        section = self.doc.sections[0]
+        section.top_margin = Cm(1.27)
+        table = section.header.add_table(rows=1, cols=2, width=Cm(16.0))
+        table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        table.columns[0].width = Cm(4.0)
+        table.columns[1].width = Cm(12.0)
+        paragraph_imagem = table.cell(0, 0).paragraphs[0]
+        paragraph_imagem.paragraph_format.space_before = Pt(0)
+        paragraph_imagem.paragraph_format.space_after = Pt(0)
+        if self.logo_path and os.path.exists(self.logo_path):
+            paragraph_imagem.add_run().add_picture(self.logo_path, width=Cm(3.5), height=Cm(3.42))
+        paragraph_imagem.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        cell_texto = table.cell(0, 1)
+        for i, texto in enumerate(documento.TEXTOS_CABECALHO):
+            p = cell_texto.paragraphs[0] if i == 0 else cell_texto.add_paragraph()
+            p.paragraph_format.space_before = Pt(0)
+            p.paragraph_format.space_after = Pt(0)
+            p.paragraph_format.line_spacing_rule = WD_LINE_SPACING.EXACTLY
+            p.paragraph_format.line_spacing = Pt(11)
+            p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+            run = p.add_run(texto)
+            run.font.name = 'Times New Roman'
+            run.font.size = Pt(11)
+            run.bold = (i < 2)
+
+    def finalizar_documento(self):
+        file_stream = io.BytesIO()
+        self.doc.save(file_stream)
+        return file_stream.getvalue(), sanitize_filename(f"{self.titulo_doc}.docx")
+
+
+class DocumentoPais(documento.DocumentoBriefing):
+    TAMANHO_TITULO = 14
+    ESPACAR_TITULOS = True
+
+
+def montar(classe, indice):
+    """Um briefing de país com as seções e o volume de texto de um relatório real."""
+    pais = f"País {indice:03d}"
+    app = classe(logo_path=LOGO)
+    app.set_titulo(f"Briefing - {pais} - 2024")
+    for secao in ("Fluxo Comercial", "Exportações", "Importações"):
+        app.nova_secao()
+        app.adicionar_titulo(secao)
+        for n in range(4):
+            app.adicionar_paragrafo(
+                f"Em 2024, Minas Gerais e {pais} tiveram um fluxo comercial de US$ {indice + n},{n}7 milhões, "
+                f"representando acréscimo de {n + 1},5% em comparação a 2023. Os principais produtos foram: "
+                + "; ".join(f"Produto {k} ({k + n},2%)" for k in range(5)) + "."
+            )
+    return app.finalizar_documento()
+
+
+def corpo(dados):
+    xml = zipfile.ZipFile(io.BytesIO(dados)).read("word/document.xml").decode("utf-8")
+    return xml[xml.index("<w:body>"):xml.rindex("<w:sectPr")]
+
+
+def medir(classe, documentos, rodadas):
+    tempos = []
+    arquivos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        arquivos = [montar(classe, i) for i in range(documentos)]
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documentos", type=int, default=100, help="briefings montados por rodada")
+    parser.add_argument("--rodadas", type=int, default=3, help="medições por implementação")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome, classe in (("python-docx", DocumentoLegado), ("modelo", DocumentoPais)):
+        tempos, arquivos = medir(classe, args.documentos, args.rodadas)
+        resultados[nome] = arquivos
+        melhor = min(tempos)
+        print(f"{nome:>11}: melhor {melhor:.2f}s ({1000 * melhor / args.documentos:.1f} ms por documento), "
+              f"média {sum(tempos) / len(tempos):.2f}s, {sum(len(b) for b, _ in arquivos) / len(arquivos) / 1024:.0f} KB por arquivo")
+
+    for (legado, nome_legado), (novo, nome_novo) in zip(resultados["python-docx"], resultados["modelo"]):
+        assert nome_legado == nome_novo and corpo(legado) == corpo(novo), nome_legado
+    print("As duas implementações produziram o mesmo corpo em todos os documentos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compara os leitores de CSV do dados_comex (pandas x arrow) num arquivo anual sintético
+no formato da Comex Stat (EXP_AAAA.csv, latin-1, ';').
+
+O arquivo é servido por um servidor HTTP local, então o caminho medido é o mesmo das
+páginas: ler_dados_csv_online -> CSV bruto no cache em disco -> leitura -> Parquet.
+O download é feito uma vez antes das medições; cada rodada apaga tudo o que foi derivado
+do CSV (partições mensais .meses, Parquets e espelhos Arrow), para medir a interpretação.
+
+Uso (na raiz do repositório):
+    python scripts/benchmark_leitura_csv.py [--linhas 1500000] [--rodadas 3]
+"""
+import argparse
+import csv
+import functools
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+DIRETORIO_TRABALHO = tempfile.mkdtemp(prefix="benchmark_csv_")
+os.environ["BRIEFINGS_CACHE_DIR"] = os.path.join(DIRETORIO_TRABALHO, "cache")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dados_comex  # noqa: E402
+
+UFS = ["MG", "SP", "RJ", "PR", "RS", "SC", "BA", "GO", "ES", "PA", "MT", "MS", "AM", "PE", "CE"]
+
+
+def gerar_arquivo_anual(caminho, linhas, ano=2024, semente=0):
+    """Gera um EXP_AAAA.csv com as colunas e a formatação do arquivo real."""
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        "CO_ANO": ano,
+        "CO_MES": [f"{m:02d}" for m in rng.integers(1, 13, linhas)],
+        "CO_NCM": [f"{n:08d}" for n in rng.integers(1_000_000, 97_000_000, linhas)],
+        "CO_UNID": rng.integers(10, 20, linhas),
+        "CO_PAIS": [f"{p:03d}" for p in rng.integers(1, 900, linhas)],
+        "SG_UF_NCM": rng.choice(UFS, linhas),
+        "CO_VIA": rng.integers(1, 10, linhas),
+        "CO_URF": [f"{u:07d}" for u in rng.integers(100_000, 1_000_000, linhas)],
+        "QT_ESTAT": rng.integers(0, 1_000_000, linhas),
+        "KG_LIQUIDO": rng.integers(0, 10_000_000, linhas),
+        "VL_FOB": rng.integers(1, 50_000_000, linhas),
+    })
+    df.to_csv(caminho, sep=";", index=False, encoding="latin-1", quoting=csv.QUOTE_NONNUMERIC)
+
+
+class ManipuladorSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servir(diretorio):
+    """Sobe um servidor HTTP local em segundo plano e devolve a URL base."""
+    manipulador = functools.partial(ManipuladorSilencioso, directory=diretorio)
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def medir(leitor, url, rodadas):
+    """Tempo de ler_dados_csv_online sem Parquet em cache, com o leitor dado."""
+    dados_comex.LEITOR_CSV = leitor
+    tempos = []
+    df = None
+    for _ in range(rodadas):
+        for caminho in glob.glob(os.path.join(dados_comex.DIRETORIO_CACHE, "*.meses")):
+            shutil.rmtree(caminho)
+        for padrao in ("*.parquet", "*.arrow"):
+            for caminho in glob.glob(os.path.join(dados_comex.DIRETORIO_CACHE, padrao)):
+                os.remove(caminho)
+        dados_comex._ler_csv_em_cache.clear()
+        inicio = time.perf_counter()
+        df = dados_comex.ler_dados_csv_online(url, dados_comex.COLUNAS_NCM, dados_comex.DTYPES_NCM)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=1_500_000, help="linhas do arquivo sintético")
+    parser.add_argument("--rodadas", type=int, default=3, help="medições por leitor")
+    args = parser.parse_args()
+
+    diretorio_ncm = os.path.join(DIRETORIO_TRABALHO, "servidor", "ncm")
+    os.makedirs(diretorio_ncm)
+    caminho_csv = os.path.join(diretorio_ncm, "EXP_2024.csv")
+    print(f"Gerando {args.linhas:,} linhas em {caminho_csv}...")
+    gerar_arquivo_anual(caminho_csv, args.linhas)
+    print(f"Arquivo com {os.path.getsize(caminho_csv) / 1024 ** 2:.1f} MB; {os.cpu_count()} CPUs.")
+
+    url = f"{servir(os.path.dirname(diretorio_ncm))}/ncm/EXP_2024.csv"
+    # Primeiro acesso: baixa o CSV bruto para o cache em disco, fora das medições
+    dados_comex.ler_dados_csv_online(url, dados_comex.COLUNAS_NCM, dados_comex.DTYPES_NCM)
+
+    resultados = {}
+    for leitor in ("pandas", "arrow"):
+        tempos, df = medir(leitor, url, args.rodadas)
+        resultados[leitor] = df
+        print(f"{leitor:>6}: melhor {min(tempos):.2f}s, média {sum(tempos) / len(tempos):.2f}s "
+              f"({len(df):,} linhas)")
+
+    pd.testing.assert_frame_equal(resultados["pandas"], resultados["arrow"], check_like=True)
+    print("Os dois leitores produziram o mesmo DataFrame.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Carga inicial do histórico consolidado (ver historico.py): baixa os arquivos anuais de
+EXP/IMP da Comex Stat, reduz cada ano às séries das seções de tendência e grava o
+resultado particionado por fluxo, ano e mês. Anos já completos no histórico são pulados,
+então o script pode ser rodado de novo para acrescentar os anos que fecharem.
+
+Uso (na raiz do repositório):
+    python scripts/carregar_historico.py [--desde 1997] [--ate 2024] [--series paises produtos municipios]
+                                         [--fluxos EXP IMP] [--refazer] [--descartar-brutos] [--paralelo 2]
+
+Os CSV brutos de um ano somam centenas de MB; com --descartar-brutos eles são apagados
+assim que o ano é consolidado (o histórico em si ocupa poucos MB por ano).
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Fora do servidor, o st.cache_resource avisa a cada chamada
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import historico  # noqa: E402
+
+
+def consolidar(fluxo, ano, args):
+    inicio = time.perf_counter()
+    gravados = historico.consolidar_ano(fluxo, ano, series=args.series, refazer=args.refazer,
+                                        descartar_brutos=args.descartar_brutos)
+    return gravados, time.perf_counter() - inicio
+
+
+def main():
+    ano_atual = datetime.now().year
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--desde", type=int, default=historico.PRIMEIRO_ANO, help="primeiro ano carregado")
+    parser.add_argument("--ate", type=int, default=ano_atual - 1,
+                        help="último ano carregado (padrão: o último fechado; o ano corrente entra incompleto)")
+    parser.add_argument("--series", nargs="+", choices=list(historico.SERIES), default=list(historico.SERIES))
+    parser.add_argument("--fluxos", nargs="+", choices=list(historico.FLUXOS), default=list(historico.FLUXOS))
+    parser.add_argument("--refazer", action="store_true", help="regrava também os anos já completos")
+    parser.add_argument("--descartar-brutos", action="store_true", help="apaga cada CSV bruto depois de consolidado")
+    parser.add_argument("--paralelo", type=int, default=2, help="anos preparados ao mesmo tempo")
+    args = parser.parse_args()
+
+    trabalhos = [(fluxo, ano) for ano in range(args.desde, args.ate + 1) for fluxo in args.fluxos]
+    print(f"Histórico em {historico.DIRETORIO_HISTORICO}: {len(trabalhos)} arquivos anuais "
+          f"({args.desde}-{args.ate}, {', '.join(args.fluxos)}).")
+
+    falhas = []
+    # Downloads e leituras já respeitam o limite de conexões e as travas do cache (ver dados_comex)
+    with ThreadPoolExecutor(max_workers=max(args.paralelo, 1)) as executor:
+        futuros = {executor.submit(consolidar, fluxo, ano, args): (fluxo, ano) for fluxo, ano in trabalhos}
+        for futuro in as_completed(futuros):
+            fluxo, ano = futuros[futuro]
+            try:
+                gravados, duracao = futuro.result()
+            except Exception as e:
+                falhas.append((fluxo, ano))
+                print(f"{fluxo} {ano}: falhou ({e})")
+                continue
+            if not gravados:
+                print(f"{fluxo} {ano}: já consolidado.")
+                continue
+            descricao = ", ".join(f"{serie} ({len(meses)} meses)" for serie, meses in sorted(gravados.items()))
+            print(f"{fluxo} {ano}: {descricao} em {duracao:.1f}s.")
+
+    for serie in args.series:
+        for fluxo in args.fluxos:
+            anos = historico.anos_consolidados(serie, fluxo)
+            cobertura = f"{anos[0]}-{anos[-1]} ({len(anos)} anos completos)" if anos else "vazio"
+            print(f"{serie:>10} {fluxo}: {cobertura}")
+    if falhas:
+        print(f"{len(falhas)} arquivos não foram consolidados; rode o script de novo para tentar outra vez.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import streamlit as st
+import os
+import json
+import logging
+import time
+import uuid
+import threading
+import multiprocessing
+import multiprocessing.util
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import artefatos
+from dados_comex import DIRETORIO_CACHE
+
+# --- FILA DE GERAÇÃO EM SEGUNDO PLANO ---
+# A geração dos briefings roda em processos separados do servidor do Streamlit:
+# a sessão só submete a tarefa e guarda o id em st.session_state, e a página
+# acompanha o progresso sem ficar presa num st.spinner. Um lote grande ocupa um
+# processo da fila e não disputa o GIL com as outras sessões; como o id e o
+# resultado não dependem da execução do script, a tarefa sobrevive aos reruns.
+# Os processos são reaproveitados entre tarefas e mantêm seus próprios caches
+# (os quadros vêm do armazém compartilhado em disco, ver dados_comex).
+PROCESSOS_GERACAO = int(os.environ.get("BRIEFINGS_PROCESSOS_GERACAO", max(1, (os.cpu_count() or 2) - 1)))
+# Prioridade dos processos de geração (os.nice): o servidor, que atende as interações, vem primeiro
+PRIORIDADE_GERACAO = int(os.environ.get("BRIEFINGS_PRIORIDADE_GERACAO", "5"))
+DIRETORIO_TAREFAS = os.path.join(DIRETORIO_CACHE, "tarefas")
+INTERVALO_ATUALIZACAO = 1.0
+# Tarefas concluídas e não recolhidas (ex.: aba fechada) saem do registro após este tempo
+TEMPO_RETENCAO_TAREFAS = 3600
+# Processos que montam os .docx de uma geração "separados" (ver renderizar_documentos).
+# Com o pacote-modelo do documento.py um briefing sai em cerca de 1 ms, menos que o custo
+# de mandá-lo a outro processo: o padrão é montar no próprio processo de geração
+PROCESSOS_RENDERIZACAO = int(os.environ.get("BRIEFINGS_PROCESSOS_RENDERIZACAO", "1"))
+
+_trava_registro = threading.Lock()
+
+
+class ErroTarefa(Exception):
+    """Falha prevista da geração (entrada inválida, dados indisponíveis): vira uma mensagem de erro na página."""
+
+
+class Relato:
+    """
+    Saída de uma tarefa: os arquivos gerados e o que a página deve exibir, na ordem.
+    Imita a parte da API do st usada pelas gerações, para ser montado no processo de
+    geração e exibido depois na sessão (ver exibir_relato). O progresso vai para um
+    arquivo lido pela página enquanto a tarefa roda. Os arquivos são gravados no lote
+    da tarefa (ver artefatos) e só os artefatos voltam para o servidor.
+    """
+
+    def __init__(self, caminho_progresso, lote):
+        self.caminho_progresso = caminho_progresso
+        self.lote = lote
+        self.itens = []
+        self.arquivos = []
+        # ZIP com todos os arquivos, no mesmo lote, quando a tarefa gera mais de um
+        self.pacote = None
+        self._destino = self.itens
+
+    def etapa(self, descricao, concluidas=None, total=None):
+        if not self.caminho_progresso:
+            return
+        temporario = f"{self.caminho_progresso}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"etapa": descricao, "concluidas": concluidas, "total": total}, f)
+        os.replace(temporario, self.caminho_progresso)
+
+    def anexar(self, nome, dados):
+        self.arquivos.append(artefatos.gravar(self.lote, nome, dados))
+
+    def _registrar(self, tipo, *args, **kwargs):
+        self._destino.append((tipo, args, kwargs))
+
+    def header(self, texto):
+        self._registrar("header", texto)
+
+    def subheader(self, texto):
+        self._registrar("subheader", texto)
+
+    def write(self, texto):
+        self._registrar("write", texto)
+
+    def info(self, texto):
+        self._registrar("info", texto)
+
+    def success(self, texto):
+        self._registrar("success", texto)
+
+    def warning(self, texto):
+        self._registrar("warning", texto)
+
+    def error(self, texto):
+        self._registrar("error", texto)
+
+    def dataframe(self, df, **kwargs):
+        self._registrar("dataframe", df, **kwargs)
+
+    @contextmanager
+    def expander(self, rotulo):
+        filhos = []
+        self._registrar("expander", rotulo, filhos)
+        anterior, self._destino = self._destino, filhos
+        try:
+            yield
+        finally:
+            self._destino = anterior
+
+
+def exibir_relato(itens):
+    """Reproduz na página os itens registrados num Relato."""
+    for tipo, args, kwargs in itens:
+        if tipo == "expander":
+            rotulo, filhos = args
+            with st.expander(rotulo):
+                exibir_relato(filhos)
+        else:
+            getattr(st, tipo)(*args, **kwargs)
+
+
+class Tarefa:
+    def __init__(self, id_tarefa, descricao, futuro, caminho_progresso, lote):
+        self.id = id_tarefa
+        self.descricao = descricao
+        self.futuro = futuro
+        self.caminho_progresso = caminho_progresso
+        self.lote = lote
+        self.inicio = time.time()
+        self.fim = None
+        futuro.add_done_callback(self._concluir)
+
+    def _concluir(self, _):
+        self.fim = time.time()
+
+    def progresso(self):
+        """Última etapa informada pelo processo de geração, ou None se a tarefa ainda não começou."""
+        try:
+            with open(self.caminho_progresso, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _silenciar_avisos():
+    # Sem sessão no processo de geração, os caches do st avisam a cada chamada; os avisos não se aplicam
+    for nome in ("streamlit.runtime.scriptrunner_utils.script_run_context",
+                 "streamlit.runtime.caching.cache_data_api"):
+        logging.getLogger(nome).setLevel(logging.ERROR)
+
+
+def _inicializar_processo():
+    if PRIORIDADE_GERACAO and hasattr(os, "nice"):
+        os.nice(PRIORIDADE_GERACAO)
+    _silenciar_avisos()
+
+
+def _contexto_processos():
+    # forkserver/spawn: um fork do servidor, com as threads do Streamlit no meio, não é seguro
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(metodo)
+
+
+@st.cache_resource(show_spinner=False)
+def _executor():
+    """Processos de geração compartilhados por todas as sessões do servidor."""
+    return ProcessPoolExecutor(max_workers=PROCESSOS_GERACAO,
+                               mp_context=_contexto_processos(),
+                               initializer=_inicializar_processo)
+
+
+@st.cache_resource(show_spinner=False)
+def _registro():
+    """{id da tarefa: Tarefa} do servidor; as sessões guardam só o id."""
+    return {}
+
+
+def _executar(funcao, parametros, caminho_progresso, lote):
+    """Roda no processo de geração: funcao(parametros, relato) e devolve o Relato."""
+    relato = Relato(caminho_progresso, lote)
+    try:
+        funcao(parametros, relato)
+    except ErroTarefa as e:
+        relato.error(str(e))
+    except BaseException:
+        artefatos.remover_lote(lote)
+        raise
+    if len(relato.arquivos) > 1:
+        relato.etapa("Empacotando os relatórios")
+        relato.pacote = artefatos.empacotar(lote, relato.arquivos)
+    artefatos.concluir_lote(lote)
+    return relato
+
+
+def _remover_progresso(tarefa):
+    try:
+        os.remove(tarefa.caminho_progresso)
+    except OSError:
+        pass
+
+
+def _podar_registro(registro):
+    agora = time.time()
+    for id_tarefa, tarefa in list(registro.items()):
+        if tarefa.fim is not None and agora - tarefa.fim > TEMPO_RETENCAO_TAREFAS:
+            del registro[id_tarefa]
+            _remover_progresso(tarefa)
+
+
+def submeter(funcao, parametros, descricao):
+    """
+    Enfileira funcao(parametros, relato) num processo de geração e devolve o id da tarefa.
+    funcao precisa ser de um módulo importável (não de uma página) e parametros, serializável.
+    Os arquivos vão para um lote do usuário logado, que conta na cota dele.
+    """
+    os.makedirs(DIRETORIO_TAREFAS, exist_ok=True)
+    id_tarefa = uuid.uuid4().hex
+    caminho_progresso = os.path.join(DIRETORIO_TAREFAS, f"{id_tarefa}.json")
+    lote = artefatos.novo_lote(st.session_state.get("user_name"), id_tarefa)
+    try:
+        futuro = _executor().submit(_executar, funcao, parametros, caminho_progresso, lote)
+    except BrokenProcessPool:
+        # Um processo de geração morreu (ex.: falta de memória) e inutilizou o pool: recria
+        _executor.clear()
+        futuro = _executor().submit(_executar, funcao, parametros, caminho_progresso, lote)
+    with _trava_registro:
+        registro = _registro()
+        _podar_registro(registro)
+        registro[id_tarefa] = Tarefa(id_tarefa, descricao, futuro, caminho_progresso, lote)
+    # Fora da trava: a varredura dos lotes de todos os usuários não pode segurar o
+    # obter_tarefa dos painéis de progresso abertos (podar tolera chamadas simultâneas)
+    artefatos.podar()
+    return id_tarefa
+
+
+def obter_tarefa(id_tarefa):
+    with _trava_registro:
+        return _registro().get(id_tarefa)
+
+
+def descartar(id_tarefa):
+    """
+    Retira a tarefa do registro; se ainda estiver na fila, ela nem chega a rodar. Uma
+    tarefa abandonada antes do fim tem o lote apagado assim que terminar.
+    """
+    with _trava_registro:
+        tarefa = _registro().pop(id_tarefa, None)
+    if tarefa is not None:
+        if not tarefa.futuro.done():
+            tarefa.futuro.add_done_callback(lambda _: artefatos.remover_lote(tarefa.lote))
+        tarefa.futuro.cancel()
+        _remover_progresso(tarefa)
+
+
+# --- RENDERIZAÇÃO PARALELA DOS DOCUMENTOS ---
+# Numa geração "separados", os números de todas as entidades saem de poucos
+# agrupamentos e o resto é montar um .docx por entidade, que é CPU pura. O laço
+# da geração só registra as chamadas ao DocumentoApp (RoteiroDocumento) e a
+# montagem pode ser dividida entre processos (BRIEFINGS_PROCESSOS_RENDERIZACAO),
+# útil se a montagem voltar a pesar. Os processos de renderização são filhos do
+# processo de geração e herdam a prioridade dele.
+
+class RoteiroDocumento:
+    """
+    Faz as vezes de um DocumentoApp no laço da geração: guarda as chamadas
+    (set_titulo, adicionar_paragrafo...) para o documento ser montado depois.
+    """
+
+    def __init__(self, classe, **kwargs):
+        self.classe = classe
+        self.kwargs = kwargs
+        self.chamadas = []
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+
+        def registrar(*args, **kwargs):
+            self.chamadas.append((nome, args, kwargs))
+        return registrar
+
+
+def _montar_documento(roteiro):
+    """Roda no processo de renderização: refaz as chamadas num DocumentoApp e devolve (bytes, nome)."""
+    app = roteiro.classe(**roteiro.kwargs)
+    for nome, args, kwargs in roteiro.chamadas:
+        getattr(app, nome)(*args, **kwargs)
+    return app.finalizar_documento()
+
+
+@st.cache_resource(show_spinner=False)
+def _executor_renderizacao():
+    """Processos de renderização do processo de geração atual, reaproveitados entre tarefas."""
+    executor = ProcessPoolExecutor(max_workers=PROCESSOS_RENDERIZACAO,
+                                   mp_context=_contexto_processos(),
+                                   initializer=_silenciar_avisos)
+    # Os processos do pool não são daemon: na saída do processo de geração, o multiprocessing
+    # esperaria por eles sem nunca encerrar o pool. O Finalize o encerra antes dessa espera e
+    # antes das filas do pool serem fechadas (exitpriority 10), senão o aviso de saída não chega
+    multiprocessing.util.Finalize(executor, executor.shutdown, exitpriority=100)
+    return executor
+
+
+def renderizar_documentos(roteiros, relato):
+    """
+    Monta os documentos dos roteiros e devolve (bytes, nome) de cada um, na ordem da lista,
+    à medida que ficam prontos. Com um documento só (ou uma CPU) monta no próprio processo.
+    """
+    total = len(roteiros)
+    relato.etapa("Gerando os documentos", 0, total)
+    if total < 2 or PROCESSOS_RENDERIZACAO < 2:
+        resultados = map(_montar_documento, roteiros)
+    else:
+        resultados = _executor_renderizacao().map(_montar_documento, roteiros)
+    try:
+        for concluidos, resultado in enumerate(resultados, start=1):
+            relato.etapa("Gerando os documentos", concluidos, total)
+            yield resultado
+    except BrokenProcessPool:
+        _executor_renderizacao.clear()
+        raise
+
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def _painel_progresso(id_tarefa):
+    tarefa = obter_tarefa(id_tarefa)
+    if tarefa is None or tarefa.futuro.done():
+        # Rerun da página inteira: acompanhar_tarefa recolhe o resultado
+        st.rerun()
+    decorrido = int(time.time() - tarefa.inicio)
+    progresso = tarefa.progresso()
+    if progresso is None:
+        st.progress(0.0, text=f"{tarefa.descricao}: aguardando um processo livre... ({decorrido}s)")
+        return
+    concluidas, total = progresso.get("concluidas"), progresso.get("total")
+    fracao = min(concluidas / total, 1.0) if concluidas is not None and total else 0.0
+    contagem = f" ({concluidas}/{total})" if concluidas is not None and total else ""
+    st.progress(fracao, text=f"{tarefa.descricao}: {progresso['etapa']}{contagem} ({decorrido}s)")
+
+
+def acompanhar_tarefa(chave):
+    """
+    Acompanha a tarefa cujo id está em st.session_state[chave]. Enquanto ela roda, mostra
+    o progresso (atualizado sem rerodar a página) e devolve None; ao terminar, tira a
+    tarefa do registro e devolve o Relato. Exceções da geração são relançadas aqui.
+    """
+    id_tarefa = st.session_state.get(chave)
+    if id_tarefa is None:
+        return None
+    tarefa = obter_tarefa(id_tarefa)
+    if tarefa is None:
+        # Servidor reiniciado ou tarefa expirada
+        st.session_state[chave] = None
+        st.warning("A geração anterior não está mais disponível. Inicie a geração novamente.")
+        return None
+    if not tarefa.futuro.done():
+        _painel_progresso(id_tarefa)
+        return None
+    st.session_state[chave] = None
+    descartar(id_tarefa)
+    return tarefa.futuro.result()